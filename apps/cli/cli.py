@@ -1,294 +1,157 @@
 import typer
 from core import parser as core_parser
-from engines.contract import generator as contract_gen
+from engines.contract.case_space import CaseSpace
+from engines.contract.fanout import generate_all, generate_json, generate_jsonl
+from config.constants import DEFAULT_PAYLOADS_FILE, DEFAULT_PAYLOADS_JSONL_FILE, DEFAULT_REPORTS_DIR
+from engines.contract.overlay import materialize, overlay_mutations
+from engines.contract.covering import plan_combinations
+from engines.contract.feedback import FeedbackScheduler
+from core.operations import get_index
+from core.schema_ir import compile_operation, get_compiler
+from engines.contract.compiled import compile_generator
+import re
 from apps.runner.http_runner import send_request
-from apps.reporting.renderers.datafuzz import render_report
+from apps.reporting.renderers.datafuzz import ReportTotals, render_report
 import json
 import pathlib
 import asyncio
+import functools
+import itertools
 
 # persistence
 from storage.db import init_db
-from storage.repository import create_run, save_result, get_latest_run, get_results_for_run
+from storage.repository import create_run, save_result, get_latest_run, get_results_for_run, get_run
+from storage.export import EXPORT_FORMATS, EXTENSIONS, export_run
+from storage.writer import ResultWriter
 
 # async runner
-from apps.runner.async_runner import run_concurrent
+from apps.runner.async_runner import stream_concurrent, RunStats, Case, parse_rate
+from apps.runner.sharded import run_sharded
+from apps.runner.scheduler import Target, stream_targets
+from apps.runner.transport import TransportConfig, build_client
+from apps.runner.retry import RetryPolicy
+from apps.runner.adaptive import AdaptiveLimiter
+from apps.runner.capture import BodyCapture, CAPTURE_MODES, HEAD, NONE as CAPTURE_NONE, SIZE
 
 app = typer.Typer()
 
-@app.command()
-def gen(
-    spec: str = typer.Option(..., "--spec", "-s", help="Path to OpenAPI spec"),
-    endpoint: str = typer.Option(..., "--endpoint", "-e", help="API endpoint (e.g. /users)"),
-    n: int = typer.Option(10, "--n", help="Number of samples"),
-    base_url: str = typer.Option("http://localhost:4010", "--base-url", help="Base URL for mock")
-):
-    # TODO: agregar soporte para generar payloads para múltiples endpoints en paralelo
-    init_db()
-    spec_obj = core_parser.load_spec(spec)
-    schema = core_parser.get_schema_for_path(spec_obj, endpoint, "post")
-    samples = [contract_gen.gen_valid_payload(schema) for _ in range(n)]
-    out = pathlib.Path("reports/samples").resolve()
-    out.mkdir(parents=True, exist_ok=True)
-    with open(out / "payloads.json", "w", encoding="utf-8") as f:
-        json.dump(samples, f, ensure_ascii=False, indent=2)
-    print(f"generated {len(samples)} payloads -> {out / 'payloads.json'}")
-
-@app.command()
-def run(
-    spec: str = typer.Option(..., "--spec", "-s", help="Path to OpenAPI spec"),
-    endpoint: str = typer.Option(..., "--endpoint", "-e", help="API endpoint (e.g. /users)"),
-    method: str = typer.Option("post", "--method", "-m", help="HTTP method"),
-    base_url: str = typer.Option("http://localhost:4010", "--base-url", help="Base URL for mock"),
-    run_name: str | None = typer.Option(None, "--name", "-n", help="Optional run name")
-):
-    # FIXME: el manejo de errores de conexión necesita mejoras
-    init_db()
-    spec_obj = core_parser.load_spec(spec)
-    schema = core_parser.get_schema_for_path(spec_obj, endpoint, method)
-
-    # generate valid payload + invalid mutations from generator
-    valid = contract_gen.gen_valid_payload(schema)
-    muts = contract_gen.gen_invalid_mutations(schema)  # list of (name, payload)
-
-    cases = [("valid", valid)] + muts
-    url = base_url.rstrip("/") + endpoint
-
-    run_obj = create_run(name=run_name)
-    items = []
-
-    for idx, (case_name, payload) in enumerate(cases, start=1):
-        resp = send_request(method, url, json_body=payload)
-        # persist
-        save_result(
-            run_id=run_obj.id,
-            endpoint=endpoint,
-            method=method,
-            payload=payload,
-            status_code=resp.get("status_code"),
-            latency=resp.get("latency"),
-            error=resp.get("error"),
-        )
-
-        # map result/result string
-        status = resp.get("status_code")
-        latency_ms = None if resp.get("latency") is None else round(resp["latency"] * 1000, 1)
-
-        if case_name == "valid":
-            payload_type = "valid"
-            if status and 200 <= status < 300:
-                result_str = "OK"
-            elif status:
-                result_str = "FALLO"
-            else:
-                result_str = "ERROR"
-            note = ""
-        else:
-            payload_type = "invalid"
-            # tag invalid subtype in note/mutation
-            mutation_name = case_name
-            if status and 200 <= status < 300:
-                # server accepted an invalid payload
-                result_str = f"ACEPTADO (invalido:{mutation_name})"
-            elif status and status >= 400:
-                # server rejected invalid payload (expected)
-                result_str = f"RECHAZADO (invalido:{mutation_name})"
-            else:
-                result_str = f"ERROR (invalido:{mutation_name})"
-            note = mutation_name
-
-        items.append({
-            "id": idx,
-            "payload_type": payload_type,
-            "mutation": (None if case_name == "valid" else case_name),
-            "status": str(status) if status is not None else "error",
-            "latency_ms": latency_ms,
-            "result": result_str,
-            "note": note,
-        })
-
-    render_report(
-        items=items,
-        output_path="reports/samples/report.html",
-        endpoint=endpoint,
-        run_name=run_name,
-        created_at=None
-    )
-    print(f"run complete (run_id={run_obj.id})")
-
-@app.command()
-def run_parallel(
-    spec: str = typer.Option(..., "--spec", "-s", help="Path to OpenAPI spec"),
-    endpoint: str = typer.Option(..., "--endpoint", "-e", help="API endpoint (e.g. /users)"),
-    method: str = typer.Option("post", "--method", "-m", help="HTTP method"),
-    base_url: str = typer.Option("http://localhost:4010", "--base-url", help="Base URL for mock"),
-    n: int = typer.Option(10, "--n", help="Number of requests to send"),
-    concurrency: int = typer.Option(5, "--concurrency", "-c", help="Concurrency level"),
-    timeout: float = typer.Option(5.0, "--timeout", help="Per-request timeout"),
-    retries: int = typer.Option(1, "--retries", help="Retries per request"),
-    run_name: str | None = typer.Option(None, "--name", "-n", help="Optional run name")
-):
-    # TODO: refactorizar esto, está medio repetitivo en algunos comandos
-    init_db()
-    spec_obj = core_parser.load_spec(spec)
-    schema = core_parser.get_schema_for_path(spec_obj, endpoint, method)
 
-    # build payload set mixing valid and invalid cases
-    valid = contract_gen.gen_valid_payload(schema)
-    muts = contract_gen.gen_invalid_mutations(schema)  # list of (name, payload)
-
-    # create a list of payloads: prefer a mix (e.g., 60% valid, rest invalid cycles)
-    payloads = []
-    mutation_meta = []  # parallel list with metadata: ("valid", None) or ("invalid", mutation_name)
+def _iter_cases(valid, muts, n: int):
+    """Yield the n cases of a parallel run, tagged with payload type and mutation."""
     for i in range(n):
         if muts and (i % 4 == 0):  # every 4th request use an invalid mutation (heuristic)
             name, p = muts[(i // 4) % len(muts)]
-            payloads.append(p)
-            mutation_meta.append(("invalid", name))
+            yield Case(i, p, "invalid", name)
         else:
-            payloads.append(valid)
-            mutation_meta.append(("valid", None))
+            yield Case(i, valid, "valid", None)
 
-    url = base_url.rstrip("/") + endpoint
-    run_obj = create_run(name=run_name)
 
-    res = asyncio.run(run_concurrent(method, url, payloads, concurrency=concurrency, timeout=timeout, retries=retries))
+def _shard_cases(valid, muts, n: int, shard: int, workers: int):
+    """Round-robin slice of _iter_cases for one worker process of a sharded run."""
+    return itertools.islice(_iter_cases(valid, muts, n), shard, None, workers)
 
-    items = []
-    for idx, (meta, payload, r) in enumerate(zip(mutation_meta, payloads, res["results"]), start=1):
-        payload_type, mutation_name = meta
-        save_result(
-            run_id=run_obj.id,
-            endpoint=endpoint,
-            method=method,
-            payload=payload,
-            status_code=r.get("status_code"),
-            latency=r.get("latency"),
-            error=r.get("error"),
-        )
 
-        status = r.get("status_code")
-        latency_ms = None if r.get("latency") is None else round(r["latency"] * 1000, 1)
+def _seeded_shard_cases(schema, seed: int, n: int, shard: int, workers: int):
+    """Contiguous index range of a seeded CaseSpace for one worker.
 
-        if payload_type == "valid":
-            if status and 200 <= status < 300:
-                result_str = "OK"
-            elif status:
-                result_str = "FALLO"
-            else:
-                result_str = "ERROR"
-            note = ""
-        else:
-            if status and 200 <= status < 300:
-                result_str = f"ACEPTADO (invalido:{mutation_name})"
-            elif status and status >= 400:
-                result_str = f"RECHAZADO (invalido:{mutation_name})"
-            else:
-                result_str = f"ERROR (invalido:{mutation_name})"
-            note = mutation_name
+    Case i only depends on (seed, i), so workers never overlap and never
+    need to talk to each other.
+    """
+    space = CaseSpace(schema, seed=seed)
+    for i, (payload_type, mutation, payload) in space.cases(shard * n // workers, (shard + 1) * n // workers):
+        yield Case(i, payload, payload_type, mutation)
 
-        items.append({
-            "id": idx,
-            "payload_type": payload_type,
-            "mutation": mutation_name,
-            "status": str(status) if status is not None else "error",
-            "latency_ms": latency_ms,
-            "result": result_str,
-            "note": note,
-        })
 
-    render_report(
-        items=items,
-        output_path="reports/samples/report.html",
-        endpoint=endpoint,
-        run_name=run_name,
-        created_at=None
+def _feedback_cases(scheduler, n: int, shard: int, workers: int):
+    """Cases picked one at a time by a FeedbackScheduler (single worker only)."""
+    for i, (payload_type, mutation, payload) in enumerate(scheduler.cases(n)):
+        yield Case(i, payload, payload_type, mutation)
+
+
+def _transport_config(concurrency: int, max_connections, keepalive, keepalive_expiry: float, http2: bool) -> TransportConfig:
+    """Pool settings from CLI options; unset sizes default to one connection per worker."""
+    pool = max_connections or concurrency
+    return TransportConfig(
+        max_connections=pool,
+        max_keepalive_connections=keepalive if keepalive is not None else pool,
+        keepalive_expiry=keepalive_expiry,
+        http2=http2,
     )
-    print("run-parallel complete")
-    print(json.dumps(res["summary"], indent=2, ensure_ascii=False))
 
-@app.command()
-def report(
-    name: str | None = typer.Option(None, "--name", "-n", help="Optional run name to filter latest run"),
-    out: str = typer.Option("reports/samples/report.html", "--out", help="Output HTML path"),
-    slow_ms: int = typer.Option(900, "--slow-ms", help="Threshold for 'slow' classification in ms"),
-):
-    init_db()
-    run_obj = get_latest_run(name=name)
-    if not run_obj:
-        typer.echo("No runs found. Execute a run first.")
-        raise typer.Exit(code=1)
 
-    results = get_results_for_run(run_obj.id)
-    if not results:
-        typer.echo("Selected run has no results.")
-        raise typer.Exit(code=1)
+def _operation_schema(spec_obj: dict, endpoint: str, method: str):
+    """Request body of an operation, compiled once for the whole run (None when there is none).
 
-    # Transform DB rows to items expected by render_report
-    items = []
-    for idx, r in enumerate(results, start=1):
-        status = r.status_code
-        latency_ms = None if r.latency is None else round(r.latency * 1000, 1)
-        payload_type = "valid"  # default; we don't persist mutation type yet
-        # We keep 'note' with error text or blank
-        items.append({
-            "id": idx,
-            "payload_type": payload_type,
-            "mutation": None,
-            "status": str(status) if status is not None else "error",
-            "latency_ms": latency_ms,
-            "result": "",  # will be recomputed by renderer normalization
-            "note": r.error or "",
-        })
+    Generators, mutations and case spaces all take the compiled node, so
+    ``$ref``s are resolved a single time and shared schemas are one node.
+    """
+    operation = compile_operation(spec_obj, endpoint, method)
+    return operation.schema if operation is not None else None
 
-    render_report(
-        items=items,
-        output_path=out,
-        endpoint=results[0].endpoint,
-        run_name=run_obj.name,
-        created_at=str(run_obj.created_at),
-        thresholds={"slow_ms": slow_ms},
-    )
-    typer.echo(f"report written -> {out}")
 
-if __name__ == "__main__":
-    app()
-import typer
-from core import parser as core_parser
-from engines.contract import generator as contract_gen
-from apps.runner.http_runner import send_request
-from apps.reporting.renderers.datafuzz import render_report
-import json
-import pathlib
-import typer
-import asyncio
+def _report_item(idx: int, payload_type: str, mutation_name, r) -> dict:
+    """Map a runner result to the row format expected by render_report."""
+    status = r.get("status_code")
+    latency_ms = None if r.get("latency") is None else round(r["latency"] * 1000, 1)
 
-# persistence
-from storage.db import init_db
-from storage.repository import create_run, save_result, get_latest_run, get_results_for_run
+    if payload_type == "valid":
+        if status and 200 <= status < 300:
+            result_str = "OK"
+        elif status:
+            result_str = "FALLO"
+        else:
+            result_str = "ERROR"
+        note = ""
+    else:
+        if status and 200 <= status < 300:
+            result_str = f"ACEPTADO (invalido:{mutation_name})"
+        elif status and status >= 400:
+            result_str = f"RECHAZADO (invalido:{mutation_name})"
+        else:
+            result_str = f"ERROR (invalido:{mutation_name})"
+        note = mutation_name
 
-# async runner
-from apps.runner.async_runner import run_concurrent
+    return {
+        "id": idx,
+        "payload_type": payload_type,
+        "mutation": mutation_name,
+        "status": str(status) if status is not None else "error",
+        "latency_ms": latency_ms,
+        "result": result_str,
+        "note": note,
+    }
 
-app = typer.Typer()
 
 @app.command()
 def gen(
     spec: str = typer.Option(..., "--spec", "-s", help="Path to OpenAPI spec"),
-    endpoint: str = typer.Option(..., "--endpoint", "-e", help="API endpoint (e.g. /users)"),
-    n: int = typer.Option(10, "--n", help="Number of samples"),
+    endpoint: str | None = typer.Option(None, "--endpoint", "-e", help="API endpoint (e.g. /users)"),
+    method: str = typer.Option("post", "--method", "-m", help="HTTP method"),
+    n: int = typer.Option(10, "--n", help="Number of samples (per endpoint with --all-endpoints)"),
+    all_endpoints: bool = typer.Option(False, "--all-endpoints", help="Generate every operation with a JSON body, one JSONL shard each"),
+    workers: int | None = typer.Option(None, "--workers", help="Processes for --all-endpoints (default: one per core)"),
+    jsonl: bool = typer.Option(False, "--jsonl", help=f"Write JSON Lines ({DEFAULT_PAYLOADS_JSONL_FILE}) instead of one JSON array ({DEFAULT_PAYLOADS_FILE})"),
+    out_dir: str = typer.Option(DEFAULT_REPORTS_DIR, "--out", help="Output directory"),
     base_url: str = typer.Option("http://localhost:4010", "--base-url", help="Base URL for mock")
 ):
-    # TODO: agregar soporte para generar payloads para múltiples endpoints en paralelo
     init_db()
+    out = pathlib.Path(out_dir).resolve()
+    if all_endpoints:
+        for shard in generate_all(spec, n, out, workers=workers):
+            print(f"{shard['method'].upper()} {shard['endpoint']}: {shard['count']} payloads -> {shard['path']}")
+        return
+    if endpoint is None:
+        raise typer.BadParameter("required unless --all-endpoints is given", param_hint="--endpoint")
     spec_obj = core_parser.load_spec(spec)
-    schema = core_parser.get_schema_for_path(spec_obj, endpoint, "post")
-    samples = [contract_gen.gen_valid_payload(schema) for _ in range(n)]
-    out = pathlib.Path("reports/samples").resolve()
-    out.mkdir(parents=True, exist_ok=True)
-    with open(out / "payloads.json", "w", encoding="utf-8") as f:
-        json.dump(samples, f, ensure_ascii=False, indent=2)
-    print(f"generated {len(samples)} payloads -> {out / 'payloads.json'}")
+    schema = _operation_schema(spec_obj, endpoint, method)
+    # streamed item by item: memory does not grow with n
+    if jsonl:
+        path = out / DEFAULT_PAYLOADS_JSONL_FILE
+        count = generate_jsonl(schema, n, path)
+    else:
+        path = out / DEFAULT_PAYLOADS_FILE
+        count = generate_json(schema, n, path)
+    print(f"generated {count} payloads -> {path}")
 
 @app.command()
 def run(
@@ -296,72 +159,83 @@ def run(
     endpoint: str = typer.Option(..., "--endpoint", "-e", help="API endpoint (e.g. /users)"),
     method: str = typer.Option("post", "--method", "-m", help="HTTP method"),
     base_url: str = typer.Option("http://localhost:4010", "--base-url", help="Base URL for mock"),
-    run_name: str | None = typer.Option(None, "--name", "-n", help="Optional run name")
+    run_name: str | None = typer.Option(None, "--name", "-n", help="Optional run name"),
+    max_connections: int | None = typer.Option(None, "--max-connections", help="Max open connections (default: one per worker)"),
+    keepalive: int | None = typer.Option(None, "--keepalive", help="Idle keep-alive connections kept in the pool"),
+    keepalive_expiry: float = typer.Option(5.0, "--keepalive-expiry", help="Seconds before an idle connection is closed"),
+    http2: bool = typer.Option(False, "--http2", help="Use HTTP/2 (requires the h2 package)"),
 ):
     # FIXME: el manejo de errores de conexión necesita mejoras
     init_db()
     spec_obj = core_parser.load_spec(spec)
-    schema = core_parser.get_schema_for_path(spec_obj, endpoint, method)
+    schema = _operation_schema(spec_obj, endpoint, method)
 
-    # generate valid payload + invalid mutations from generator
-    valid = contract_gen.gen_valid_payload(schema)
-    muts = contract_gen.gen_invalid_mutations(schema)  # list of (name, payload)
+    # generate valid payload + invalid mutations (same catalog as run-parallel)
+    valid = compile_generator(schema)()
+    muts = [(name, overlay.materialize()) for name, overlay in overlay_mutations(schema, base=valid)]
 
     cases = [("valid", valid)] + muts
     url = base_url.rstrip("/") + endpoint
 
     run_obj = create_run(name=run_name)
     items = []
-
-    for idx, (case_name, payload) in enumerate(cases, start=1):
-        resp = send_request(method, url, json_body=payload)
-        # persist
-        save_result(
-            run_id=run_obj.id,
-            endpoint=endpoint,
-            method=method,
-            payload=payload,
-            status_code=resp.get("status_code"),
-            latency=resp.get("latency"),
-            error=resp.get("error"),
-        )
-
-        # map result/result string
-        status = resp.get("status_code")
-        latency_ms = None if resp.get("latency") is None else round(resp["latency"] * 1000, 1)
-
-        if case_name == "valid":
-            payload_type = "valid"
-            if status and 200 <= status < 300:
-                result_str = "OK"
-            elif status:
-                result_str = "FALLO"
+    new_connections = 0
+    # one pooled client for the whole run so requests reuse the connection
+    # (closed by the with block, also when the run fails halfway)
+    with build_client(_transport_config(1, max_connections, keepalive, keepalive_expiry, http2)) as client:
+        for idx, (case_name, payload) in enumerate(cases, start=1):
+            resp = send_request(method, url, json_body=payload, client=client, capture=BodyCapture(SIZE))
+            new_connections += bool(resp.get("new_connection"))
+            # persist
+            save_result(
+                run_id=run_obj.id,
+                endpoint=endpoint,
+                method=method,
+                payload=payload,
+                status_code=resp.get("status_code"),
+                latency=resp.get("latency"),
+                error=resp.get("error"),
+                case_id=idx - 1,
+                payload_type="valid" if case_name == "valid" else "invalid",
+                mutation=None if case_name == "valid" else case_name,
+            )
+
+            # map result/result string
+            status = resp.get("status_code")
+            latency_ms = None if resp.get("latency") is None else round(resp["latency"] * 1000, 1)
+
+            if case_name == "valid":
+                payload_type = "valid"
+                if status and 200 <= status < 300:
+                    result_str = "OK"
+                elif status:
+                    result_str = "FALLO"
+                else:
+                    result_str = "ERROR"
+                note = ""
             else:
-                result_str = "ERROR"
-            note = ""
-        else:
-            payload_type = "invalid"
-            # tag invalid subtype in note/mutation
-            mutation_name = case_name
-            if status and 200 <= status < 300:
-                # server accepted an invalid payload
-                result_str = f"ACEPTADO (invalido:{mutation_name})"
-            elif status and status >= 400:
-                # server rejected invalid payload (expected)
-                result_str = f"RECHAZADO (invalido:{mutation_name})"
-            else:
-                result_str = f"ERROR (invalido:{mutation_name})"
-            note = mutation_name
-
-        items.append({
-            "id": idx,
-            "payload_type": payload_type,
-            "mutation": (None if case_name == "valid" else case_name),
-            "status": str(status) if status is not None else "error",
-            "latency_ms": latency_ms,
-            "result": result_str,
-            "note": note,
-        })
+                payload_type = "invalid"
+                # tag invalid subtype in note/mutation
+                mutation_name = case_name
+                if status and 200 <= status < 300:
+                    # server accepted an invalid payload
+                    result_str = f"ACEPTADO (invalido:{mutation_name})"
+                elif status and status >= 400:
+                    # server rejected invalid payload (expected)
+                    result_str = f"RECHAZADO (invalido:{mutation_name})"
+                else:
+                    result_str = f"ERROR (invalido:{mutation_name})"
+                note = mutation_name
+
+            items.append({
+                "id": idx,
+                "payload_type": payload_type,
+                "mutation": (None if case_name == "valid" else case_name),
+                "status": str(status) if status is not None else "error",
+                "latency_ms": latency_ms,
+                "result": result_str,
+                "note": note,
+            })
 
     render_report(
         items=items,
@@ -370,7 +244,7 @@ def run(
         run_name=run_name,
         created_at=None
     )
-    print(f"run complete (run_id={run_obj.id})")
+    print(f"run complete (run_id={run_obj.id}, new connections: {new_connections}/{len(cases)})")
 
 @app.command()
 def run_parallel(
@@ -382,86 +256,253 @@ def run_parallel(
     concurrency: int = typer.Option(5, "--concurrency", "-c", help="Concurrency level"),
     timeout: float = typer.Option(5.0, "--timeout", help="Per-request timeout"),
     retries: int = typer.Option(1, "--retries", help="Retries per request"),
-    run_name: str | None = typer.Option(None, "--name", "-n", help="Optional run name")
+    run_name: str | None = typer.Option(None, "--name", "-n", help="Optional run name"),
+    rate: str | None = typer.Option(None, "--rate", help="Open-loop arrival rate (e.g. 500/s); --concurrency caps in-flight requests"),
+    workers: int = typer.Option(1, "--workers", "-w", help="Worker processes to shard the run across (concurrency/rate are split between them)"),
+    backoff: float = typer.Option(0.05, "--backoff", help="Base retry backoff in seconds (exponential, with jitter)"),
+    retry_budget: float = typer.Option(0.2, "--retry-budget", help="Max retries as a fraction of requests sent"),
+    adaptive: bool = typer.Option(False, "--adaptive", help="Adjust concurrency during the run (AIMD) and report the saturation knee"),
+    target_p99_ms: float | None = typer.Option(None, "--target-p99-ms", help="Adaptive mode: p99 latency ceiling in ms"),
+    max_error_rate: float = typer.Option(0.01, "--max-error-rate", help="Adaptive mode: ceiling for transport errors + 5xx"),
+    max_concurrency: int = typer.Option(256, "--max-concurrency", help="Adaptive mode: upper bound for the in-flight limit"),
+    capture: str = typer.Option(SIZE, "--capture", help=f"Response body capture: {', '.join(CAPTURE_MODES)}"),
+    capture_bytes: int = typer.Option(1024, "--capture-bytes", help="Bytes kept per body with --capture head"),
+    max_connections: int | None = typer.Option(None, "--max-connections", help="Max open connections (default: one per worker)"),
+    keepalive: int | None = typer.Option(None, "--keepalive", help="Idle keep-alive connections kept in the pool"),
+    keepalive_expiry: float = typer.Option(5.0, "--keepalive-expiry", help="Seconds before an idle connection is closed"),
+    http2: bool = typer.Option(False, "--http2", help="Use HTTP/2 (requires the h2 package)"),
+    seed: int | None = typer.Option(None, "--seed", help="Draw cases from a seeded case space (replayable with `replay`)"),
+    strength: int = typer.Option(1, "--strength", help="Combine mutations t-wise with a covering array (2 = pairwise); 1 mutates one field per request"),
+    feedback: bool = typer.Option(False, "--feedback", help="Spend the budget on mutations that produce new responses (captures body heads)"),
+    batch_size: int = typer.Option(1000, "--batch-size", help="Results per database write"),
 ):
     # TODO: refactorizar esto, está medio repetitivo en algunos comandos
+    try:
+        arrival_rate = parse_rate(rate)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--rate")
+    try:
+        body_capture = BodyCapture(capture, head_bytes=capture_bytes)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--capture")
+    if adaptive and workers > 1:
+        raise typer.BadParameter("adaptive mode runs in a single worker process", param_hint="--adaptive")
+    if feedback and (workers > 1 or seed is not None):
+        raise typer.BadParameter("feedback mode runs in a single worker process, without --seed", param_hint="--feedback")
+    if strength > 1 and seed is not None:
+        raise typer.BadParameter("combined mutations are planned up front, without --seed", param_hint="--strength")
+    if feedback and body_capture.mode in (CAPTURE_NONE, SIZE):
+        # the body shape is part of the response fingerprint
+        body_capture = BodyCapture(HEAD, head_bytes=capture_bytes)
     init_db()
     spec_obj = core_parser.load_spec(spec)
-    schema = core_parser.get_schema_for_path(spec_obj, endpoint, method)
-
-    # build payload set mixing valid and invalid cases
-    valid = contract_gen.gen_valid_payload(schema)
-    muts = contract_gen.gen_invalid_mutations(schema)  # list of (name, payload)
-
-    # create a list of payloads: prefer a mix (e.g., 60% valid, rest invalid cycles)
-    payloads = []
-    mutation_meta = []  # parallel list with metadata: ("valid", None) or ("invalid", mutation_name)
-    for i in range(n):
-        if muts and (i % 4 == 0):  # every 4th request use an invalid mutation (heuristic)
-            name, p = muts[(i // 4) % len(muts)]
-            payloads.append(p)
-            mutation_meta.append(("invalid", name))
+    schema = _operation_schema(spec_obj, endpoint, method)
+
+    if seed is not None:
+        # random valid/invalid cases, case i computed from (seed, i)
+        case_source = functools.partial(_seeded_shard_cases, schema, seed, n)
+    else:
+        # build payload set mixing valid and invalid cases
+        valid = compile_generator(schema)()
+        # nested mutations as copy-on-write overlays on the shared valid payload
+        if strength > 1:
+            muts = plan_combinations(schema, base=valid, strength=strength)
         else:
-            payloads.append(valid)
-            mutation_meta.append(("valid", None))
+            muts = overlay_mutations(schema, base=valid)  # list of (name, Overlay)
+        case_source = functools.partial(_shard_cases, valid, muts, n)
+        if feedback:
+            scheduler = FeedbackScheduler(valid, muts)
+            case_source = functools.partial(_feedback_cases, scheduler, n)
 
     url = base_url.rstrip("/") + endpoint
     run_obj = create_run(name=run_name)
 
-    res = asyncio.run(run_concurrent(method, url, payloads, concurrency=concurrency, timeout=timeout, retries=retries))
+    # cases are generated lazily and each result is persisted as it arrives,
+    # attributed through the case it carries (completion order != send order);
+    # the report keeps counters and a bounded sample, not every row
+    report = ReportTotals()
 
-    items = []
-    for idx, (meta, payload, r) in enumerate(zip(mutation_meta, payloads, res["results"]), start=1):
-        payload_type, mutation_name = meta
-        save_result(
-            run_id=run_obj.id,
+    def _persist(case, r):
+        writer.add(
             endpoint=endpoint,
             method=method,
-            payload=payload,
+            payload=materialize(case.payload),
             status_code=r.get("status_code"),
             latency=r.get("latency"),
             error=r.get("error"),
+            case_id=case.case_id,
+            payload_type=case.payload_type,
+            mutation=case.mutation,
         )
+        report.add(_report_item(case.case_id + 1, case.payload_type, case.mutation, r))
+
+    per_worker = max(1, -(-concurrency // max(1, workers)))
+    transport_config = _transport_config(per_worker, max_connections, keepalive, keepalive_expiry, http2)
+    retry_policy = RetryPolicy(max_retries=retries, backoff_base=backoff, budget_ratio=retry_budget)
+
+    # results are written in batches by a background thread while the run goes on
+    with ResultWriter(run_obj.id, batch_size=batch_size) as writer:
+        if workers > 1:
+            # each process runs its own loop + client; results come back to be persisted here
+            stats = run_sharded(
+                method, url, case_source, workers,
+                on_result=_persist, concurrency=concurrency, rate=arrival_rate,
+                timeout=timeout, transport_config=transport_config, retry_policy=retry_policy,
+                capture=body_capture,
+            )
+        else:
+            stats = RunStats()
+            limiter = None
+            if adaptive:
+                # --concurrency is the starting point, the controller moves it from there
+                limiter = AdaptiveLimiter(
+                    target_p99=None if target_p99_ms is None else target_p99_ms / 1000.0,
+                    max_error_rate=max_error_rate,
+                    initial=concurrency,
+                    max_limit=max_concurrency,
+                )
+                transport_config = _transport_config(max_concurrency, max_connections, keepalive, keepalive_expiry, http2)
+
+            async def _drain():
+                cases = case_source(0, 1)
+                async for case, r in stream_concurrent(method, url, cases, concurrency=concurrency, timeout=timeout, rate=arrival_rate, transport_config=transport_config, retry_policy=retry_policy, limiter=limiter, capture=body_capture):
+                    stats.add(r)
+                    if feedback:
+                        scheduler.observe(case.mutation, r)
+                    _persist(case, r)
+
+            asyncio.run(_drain())
+
+    report.render(
+        "reports/samples/report.html",
+        endpoint=endpoint,
+        run_name=run_name,
+        created_at=None
+    )
+    summary = stats.summary()
+    if adaptive:
+        summary["adaptive"] = limiter.report()
+    if feedback:
+        summary["feedback"] = scheduler.report()
+    print("run-parallel complete")
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
 
-        status = r.get("status_code")
-        latency_ms = None if r.get("latency") is None else round(r["latency"] * 1000, 1)
+def _concrete_path(template: str) -> str:
+    # path parameters get a placeholder value: the body is what is being fuzzed
+    return re.sub(r"\{[^{}/]+\}", "1", template)
 
-        if payload_type == "valid":
-            if status and 200 <= status < 300:
-                result_str = "OK"
-            elif status:
-                result_str = "FALLO"
-            else:
-                result_str = "ERROR"
-            note = ""
-        else:
-            if status and 200 <= status < 300:
-                result_str = f"ACEPTADO (invalido:{mutation_name})"
-            elif status and status >= 400:
-                result_str = f"RECHAZADO (invalido:{mutation_name})"
-            else:
-                result_str = f"ERROR (invalido:{mutation_name})"
-            note = mutation_name
 
-        items.append({
-            "id": idx,
-            "payload_type": payload_type,
-            "mutation": mutation_name,
-            "status": str(status) if status is not None else "error",
-            "latency_ms": latency_ms,
-            "result": result_str,
-            "note": note,
-        })
+@app.command("run-spec")
+def run_spec(
+    spec: str = typer.Option(..., "--spec", "-s", help="Path to OpenAPI spec"),
+    base_url: str = typer.Option("http://localhost:4010", "--base-url", help="Base URL for mock"),
+    n: int = typer.Option(20, "--n", help="Requests per operation"),
+    concurrency: int = typer.Option(50, "--concurrency", help="Max in-flight requests across all operations"),
+    per_endpoint: int = typer.Option(8, "--per-endpoint", help="Max in-flight requests of a single operation"),
+    timeout: float = typer.Option(5.0, "--timeout", help="Per-request timeout"),
+    retries: int = typer.Option(2, "--retries", help="Retries per request"),
+    run_name: str | None = typer.Option(None, "--name", help="Optional run name"),
+    capture: str = typer.Option(SIZE, "--capture", help=f"Response body capture: {', '.join(CAPTURE_MODES)}"),
+    capture_bytes: int = typer.Option(1024, "--capture-bytes", help="Bytes kept per body with --capture head"),
+    batch_size: int = typer.Option(1000, "--batch-size", help="Results per database write"),
+):
+    """Run every operation of the spec through one client, sharing one concurrency limit."""
+    try:
+        body_capture = BodyCapture(capture, head_bytes=capture_bytes)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--capture")
+    init_db()
+    spec_obj = core_parser.load_spec(spec)
 
-    render_report(
-        items=items,
-        output_path="reports/samples/report.html",
-        endpoint=endpoint,
+    targets = []
+    templates = {}
+    compiler = get_compiler(spec_obj)  # one compiler: operations share their component nodes
+    for op in get_index(spec_obj):
+        raw_schema = op.schema("application/json")
+        if raw_schema:
+            schema = compiler.compile(raw_schema)
+            valid = compile_generator(schema)()
+            cases = _iter_cases(valid, overlay_mutations(schema, base=valid), n)
+        else:
+            cases = _iter_cases(None, [], n)  # no JSON body: n plain requests
+        url = base_url.rstrip("/") + _concrete_path(op.template)
+        key = f"{op.method.upper()} {op.template}"
+        templates[key] = op.template
+        targets.append(Target(key, op.method, url, cases))
+    if not targets:
+        typer.echo("No operations found in the spec.")
+        raise typer.Exit(code=1)
+
+    run_obj = create_run(name=run_name)
+    stats = RunStats()
+    per_target = {t.key: RunStats() for t in targets}
+    report = ReportTotals()
+
+    async def _drain():
+        async for target, case, r in stream_targets(
+            targets,
+            concurrency=concurrency,
+            per_target=per_endpoint,
+            timeout=timeout,
+            retry_policy=RetryPolicy(max_retries=retries),
+            capture=body_capture,
+        ):
+            stats.add(r)
+            per_target[target.key].add(r)
+            writer.add(
+                endpoint=templates[target.key],
+                method=target.method,
+                payload=materialize(case.payload),
+                status_code=r.get("status_code"),
+                latency=r.get("latency"),
+                error=r.get("error"),
+                case_id=case.case_id,
+                payload_type=case.payload_type,
+                mutation=case.mutation,
+            )
+            report.add(_report_item(report.total + 1, case.payload_type, case.mutation, r))
+
+    with ResultWriter(run_obj.id, batch_size=batch_size) as writer:
+        asyncio.run(_drain())
+
+    report.render(
+        "reports/samples/report.html",
+        endpoint=f"{len(targets)} operations",
         run_name=run_name,
         created_at=None
     )
-    print("run-parallel complete")
-    print(json.dumps(res["summary"], indent=2, ensure_ascii=False))
+    summary = stats.summary()
+    summary["operations"] = {
+        key: {k: v for k, v in s.summary().items() if k in ("total", "successful", "errors", "statuses", "percentiles")}
+        for key, s in per_target.items()
+    }
+    print("run-spec complete")
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+@app.command()
+def replay(
+    spec: str = typer.Option(..., "--spec", "-s", help="Path to OpenAPI spec"),
+    endpoint: str = typer.Option(..., "--endpoint", "-e", help="API endpoint (e.g. /users)"),
+    method: str = typer.Option("post", "--method", "-m", help="HTTP method"),
+    base_url: str = typer.Option("http://localhost:4010", "--base-url", help="Base URL for mock"),
+    seed: int = typer.Option(..., "--seed", help="Seed of the original run-parallel --seed run"),
+    case_id: int = typer.Option(..., "--case", help="Case id to replay"),
+):
+    """Re-send one case of a seeded run, rebuilt from (seed, case id)."""
+    spec_obj = core_parser.load_spec(spec)
+    schema = _operation_schema(spec_obj, endpoint, method)
+    payload_type, mutation, payload = CaseSpace(schema, seed=seed).case(case_id)
+    resp = send_request(method, base_url.rstrip("/") + endpoint, json_body=payload)
+    print(json.dumps({
+        "case_id": case_id,
+        "payload_type": payload_type,
+        "mutation": mutation,
+        "payload": payload,
+        "status_code": resp.get("status_code"),
+        "latency": resp.get("latency"),
+        "error": resp.get("error"),
+        "body": resp.get("body"),
+    }, indent=2, ensure_ascii=False))
 
 @app.command()
 def report(
@@ -475,7 +516,7 @@ def report(
         typer.echo("No runs found. Execute a run first.")
         raise typer.Exit(code=1)
 
-    results = get_results_for_run(run_obj.id)
+    results = get_results_for_run(run_obj.id, with_payload=False)
     if not results:
         typer.echo("Selected run has no results.")
         raise typer.Exit(code=1)
@@ -485,12 +526,13 @@ def report(
     for idx, r in enumerate(results, start=1):
         status = r.status_code
         latency_ms = None if r.latency is None else round(r.latency * 1000, 1)
-        payload_type = "valid"  # default; we don't persist mutation type yet
+        # rows written before case metadata was persisted count as valid
+        payload_type = r.payload_type or "valid"
         # We keep 'note' with error text or blank
         items.append({
             "id": idx,
             "payload_type": payload_type,
-            "mutation": None,
+            "mutation": r.mutation,
             "status": str(status) if status is not None else "error",
             "latency_ms": latency_ms,
             "result": "",  # will be recomputed by renderer normalization
@@ -507,5 +549,26 @@ def report(
     )
     typer.echo(f"report written -> {out}")
 
+@app.command()
+def export(
+    name: str | None = typer.Option(None, "--name", "-n", help="Optional run name to filter latest run"),
+    run_id: int | None = typer.Option(None, "--run-id", help="Export this run instead of the latest one"),
+    fmt: str = typer.Option("jsonl", "--format", "-f", help=f"Output format: {', '.join(EXPORT_FORMATS)}"),
+    out: str | None = typer.Option(None, "--out", help="Output path (default: reports/samples/run-<id>.<ext>)"),
+    chunk_size: int = typer.Option(1000, "--chunk-size", help="Rows fetched from the database at a time"),
+):
+    """Stream every result of a run to a JSONL, CSV or columnar file."""
+    if fmt not in EXPORT_FORMATS:
+        raise typer.BadParameter(f"expected one of {', '.join(EXPORT_FORMATS)}", param_hint="--format")
+    init_db()
+    run_obj = get_run(run_id) if run_id is not None else get_latest_run(name=name)
+    if not run_obj:
+        typer.echo("No runs found. Execute a run first.")
+        raise typer.Exit(code=1)
+
+    out = out or f"reports/samples/run-{run_obj.id}{EXTENSIONS[fmt]}"
+    count = export_run(run_obj.id, out, fmt=fmt, chunk_size=chunk_size)
+    typer.echo(f"exported {count} results of run {run_obj.id} -> {out}")
+
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    app()
@@ -1,3 +1,4 @@
+import heapq
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Any, Optional
@@ -34,60 +35,103 @@ def _classify_result(payload_type: str, status: Optional[int], latency_ms: Optio
         return "LENTO"
     return "OK"
 
-def _normalize_items(items: List[Dict[str, Any]], slow_ms: int) -> List[Dict[str, Any]]:
-    norm = []
-    for it in items:
-        payload_type = "valid" if str(it.get("payload_type", "")).lower().startswith("val") else "invalid"
-
-        raw_status = it.get("status")
-        # admitir "error" como fallo sin código
-        status = None
-        if raw_status is not None and str(raw_status).lower() != "error":
-            status = _safe_int(raw_status, default=None)
-
-        latency_ms = _safe_float(it.get("latency_ms"), default=None)
-
-        result = _classify_result(payload_type, status, latency_ms, slow_ms)
-
-        norm.append({
-            "id": it.get("id"),
-            "payload_type": payload_type,
-            "status": status if status is not None else "error",
-            "latency_ms": None if latency_ms is None else int(latency_ms),
-            "result": result,
-            "note": it.get("note") or "",
-        })
-    return norm
-# -------------------------------------------------------------------
+def _normalize_item(it: Dict[str, Any], slow_ms: int) -> Dict[str, Any]:
+    payload_type = "valid" if str(it.get("payload_type", "")).lower().startswith("val") else "invalid"
 
-def _compute_totals(items: List[Dict[str, Any]], thresholds: Dict[str, int]) -> Dict[str, Any]:
-    total = len(items)
-    valid_ok = sum(1 for it in items if it.get("payload_type") == "valid" and it.get("result") == "OK")
-    invalid_expected_ok = sum(1 for it in items if it.get("payload_type") == "invalid" and "OK" in str(it.get("result")))
-    accepted_invalid = sum(1 for it in items if it.get("payload_type") == "invalid" and it.get("result") == "FALLO")
-
-    numeric_latencies = [float(it.get("latency_ms")) for it in items if isinstance(it.get("latency_ms"), (int, float))]
-    slow_threshold = int(thresholds.get("slow_ms", 900))
-    slow = sum(1 for v in numeric_latencies if v >= slow_threshold)
-
-    # if there are no numeric latencies, set avg to None and mark has_latency=False
-    if numeric_latencies:
-        avg_latency = round(sum(numeric_latencies) / len(numeric_latencies), 1)
-        has_latency = True
-    else:
-        avg_latency = None
-        has_latency = False
+    raw_status = it.get("status")
+    # admitir "error" como fallo sin código
+    status = None
+    if raw_status is not None and str(raw_status).lower() != "error":
+        status = _safe_int(raw_status, default=None)
+
+    latency_ms = _safe_float(it.get("latency_ms"), default=None)
+
+    result = _classify_result(payload_type, status, latency_ms, slow_ms)
 
     return {
-        "total": total,
-        "valid_ok": valid_ok,
-        "invalid_expected_ok": invalid_expected_ok,
-        "accepted_invalid": accepted_invalid,
-        "slow": slow,
-        "avg_latency_ms": avg_latency,
-        "has_latency": has_latency,
+        "id": it.get("id"),
+        "payload_type": payload_type,
+        "status": status if status is not None else "error",
+        "latency_ms": None if latency_ms is None else int(latency_ms),
+        "result": result,
+        "note": it.get("note") or "",
     }
 
+def _normalize_items(items: List[Dict[str, Any]], slow_ms: int) -> List[Dict[str, Any]]:
+    return [_normalize_item(it, slow_ms) for it in items]
+# -------------------------------------------------------------------
+
+class ReportTotals:
+    """Report KPIs accumulated one item at a time, plus a bounded sample of rows.
+
+    Long runs can't keep every row around just to render the report: the
+    totals are counters and only the ``max_rows`` items with the lowest ids
+    are kept for the table.
+    """
+
+    def __init__(self, thresholds: Optional[Dict[str, int]] = None, max_rows: int = 1000):
+        self.thresholds = thresholds or {"slow_ms": 900}
+        self.slow_ms = int(self.thresholds.get("slow_ms", 900))
+        self.max_rows = max_rows
+        self.total = 0
+        self.valid_ok = 0
+        self.invalid_expected_ok = 0
+        self.accepted_invalid = 0
+        self.slow = 0
+        self._latency_sum = 0.0
+        self._latency_count = 0
+        self._sample: List[Any] = []  # max-heap on id: (-id, seq, item)
+
+    def add(self, item: Dict[str, Any], normalized: bool = False):
+        it = item if normalized else _normalize_item(item, self.slow_ms)
+        self.total += 1
+        if it.get("payload_type") == "valid" and it.get("result") == "OK":
+            self.valid_ok += 1
+        if it.get("payload_type") == "invalid" and "OK" in str(it.get("result")):
+            self.invalid_expected_ok += 1
+        if it.get("payload_type") == "invalid" and it.get("result") == "FALLO":
+            self.accepted_invalid += 1
+        latency = it.get("latency_ms")
+        if isinstance(latency, (int, float)):
+            self._latency_sum += float(latency)
+            self._latency_count += 1
+            if latency >= self.slow_ms:
+                self.slow += 1
+        entry = (-(it.get("id") or 0), self.total, it)
+        if len(self._sample) < self.max_rows:
+            heapq.heappush(self._sample, entry)
+        elif self._sample and entry > self._sample[0]:
+            heapq.heapreplace(self._sample, entry)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        return [it for _, _, it in sorted(self._sample, reverse=True)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        # if there are no numeric latencies, set avg to None and mark has_latency=False
+        has_latency = self._latency_count > 0
+        return {
+            "total": self.total,
+            "valid_ok": self.valid_ok,
+            "invalid_expected_ok": self.invalid_expected_ok,
+            "accepted_invalid": self.accepted_invalid,
+            "slow": self.slow,
+            "avg_latency_ms": round(self._latency_sum / self._latency_count, 1) if has_latency else None,
+            "has_latency": has_latency,
+        }
+
+    def render(self, output_path: str, **kwargs) -> str:
+        """Write the report (same options as render_report); notes when the table is a sample."""
+        rows = self.rows()
+        if len(rows) < self.total and "footer_note" not in kwargs:
+            kwargs["footer_note"] = f"Reporte generado por Datafuzz-ai — tabla con los primeros {len(rows)} de {self.total} resultados"
+        return _write_report(rows, self.to_dict(), output_path, self.thresholds, **kwargs)
+
+def _compute_totals(items: List[Dict[str, Any]], thresholds: Dict[str, int]) -> Dict[str, Any]:
+    totals = ReportTotals(thresholds, max_rows=0)
+    for it in items:
+        totals.add(it, normalized=True)
+    return totals.to_dict()
+
 def render_report(
     items: List[Dict[str, Any]],
     output_path: str,
@@ -107,7 +151,26 @@ def render_report(
     # normalizamos y clasificamos antes de computar totales
     normalized_items = _normalize_items(items, slow_ms)
     totals = _compute_totals(normalized_items, thresholds)
+    return _write_report(
+        normalized_items, totals, output_path, thresholds,
+        endpoint=endpoint, run_name=run_name, created_at=created_at, title=title, header=header,
+        template_dir=template_dir, template_name=template_name, footer_note=footer_note,
+    )
 
+def _write_report(
+    normalized_items: List[Dict[str, Any]],
+    totals: Dict[str, Any],
+    output_path: str,
+    thresholds: Dict[str, int],
+    endpoint: str = "/users",
+    run_name: Optional[str] = None,
+    created_at: Optional[str] = None,
+    title: str = "Datafuzz-ai — Reporte",
+    header: str = "Reporte — Datafuzz-ai",
+    template_dir: Optional[str] = None,
+    template_name: str = TEMPLATE_NAME,
+    footer_note: Optional[str] = "Reporte generado por Datafuzz-ai"
+) -> str:
     # default template dir: apps/reporting/templates (dos niveles arriba)
     if template_dir:
         templates_path = Path(template_dir)
@@ -137,4 +200,4 @@ def render_report(
         out.parent.rename(out.parent.with_name(out.parent.name + ".bak"))
     out.parent.mkdir(parents=True, exist_ok=True)
     out.write_text(html, encoding="utf-8")
-    return str(out)
\ No newline at end of file
+    return str(out)
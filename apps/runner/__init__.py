@@ -1,2 +1,2 @@
 """apps.runner package"""
-__all__ = ["http_runner"]
\ No newline at end of file
+__all__ = ["http_runner", "async_runner", "adaptive", "capture", "histogram", "plan", "retry", "scheduler", "sharded", "transport"]
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""Adaptive concurrency: find the throughput knee while the run is going."""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from apps.runner.histogram import LatencyHistogram
+
+
+class AdaptiveLimiter:
+    """AIMD controller for the number of requests in flight.
+
+    Completed requests are grouped in windows (at least ``min_window``
+    samples, or twice the current limit). At the end of each window the
+    controller compares the window's p99 latency and error rate against the
+    targets: while both hold, the limit grows by one (additive increase); as
+    soon as one is breached it is cut by ``decrease`` (multiplicative
+    decrease). Errors are transport failures and 5xx responses; 4xx are the
+    expected answer to invalid payloads and do not count.
+
+    ``report()`` returns the knee (the limit of the healthy window with the
+    highest throughput) and the limit at which the target first saturated.
+    """
+
+    def __init__(
+        self,
+        target_p99: Optional[float] = None,
+        max_error_rate: float = 0.01,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        min_window: int = 20,
+        decrease: float = 0.5,
+        history_size: int = 500,
+    ):
+        self.target_p99 = target_p99
+        self.max_error_rate = max_error_rate
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial, self.min_limit), self.max_limit)
+        self.min_window = min_window
+        self.decrease = decrease
+        self.inflight = 0
+        # last windows only, so a soak run does not grow it without bound
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self.windows = 0
+        self.knee: Optional[Dict[str, Any]] = None
+        self.saturated_at: Optional[int] = None
+        self._cond: Optional[asyncio.Condition] = None
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window = LatencyHistogram()
+        self._window_errors = 0
+        self._window_start = time.perf_counter()
+
+    async def acquire(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.inflight < self.limit)
+            self.inflight += 1
+
+    async def release(self, result: Dict[str, Any]):
+        self.inflight -= 1
+        self.observe(result)
+        async with self._cond:
+            self._cond.notify_all()
+
+    def observe(self, result: Dict[str, Any]):
+        status = result.get("status_code")
+        if status is None or status >= 500:
+            self._window_errors += 1
+        self._window.record(result["latency"] if result.get("latency") is not None else 0.0)
+        if self._window.count >= max(self.min_window, 2 * self.limit):
+            self._adjust()
+
+    def _adjust(self):
+        elapsed = max(time.perf_counter() - self._window_start, 1e-9)
+        count = self._window.count
+        p99 = self._window.percentile(99)
+        error_rate = self._window_errors / count
+        healthy = error_rate <= self.max_error_rate and (self.target_p99 is None or p99 <= self.target_p99)
+        entry = {
+            "limit": self.limit,
+            "throughput": count / elapsed,
+            "p99": p99,
+            "error_rate": error_rate,
+            "healthy": healthy,
+        }
+        self.history.append(entry)
+        self.windows += 1
+        if healthy:
+            if self.knee is None or entry["throughput"] > self.knee["throughput"]:
+                self.knee = entry
+            self.limit = min(self.limit + 1, self.max_limit)
+        else:
+            if self.saturated_at is None:
+                self.saturated_at = self.limit
+            self.limit = max(int(self.limit * self.decrease), self.min_limit)
+        self._reset_window()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "knee": None if self.knee is None else {
+                "concurrency": self.knee["limit"],
+                "throughput": self.knee["throughput"],
+                "p99": self.knee["p99"],
+                "error_rate": self.knee["error_rate"],
+            },
+            "saturated_at": self.saturated_at,
+            "windows": self.windows,
+            "history": list(self.history),
+        }
@@ -1,142 +1,359 @@
 import asyncio
 import time
-import math
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, AsyncIterable, Iterable, NamedTuple, Optional, Tuple, Union
 import httpx
 
-async def _send_single(client: httpx.AsyncClient, method: str, url: str, json_body, timeout: float, retries: int):
-    attempt = 0
-    last_exc = None
+from apps.runner.adaptive import AdaptiveLimiter
+from apps.runner.capture import BodyCapture, aread_body
+from apps.runner.histogram import LatencyHistogram
+from apps.runner.plan import PlanCache
+from apps.runner.retry import STATUS, RetryBudget, RetryPolicy, attempt_record, classify_error
+from apps.runner.transport import ConnectionTrace, TransportConfig, build_async_client
+
+# sentinel pushed through the queues to tell workers / the consumer to stop
+_DONE = object()
+
+
+class Case(NamedTuple):
+    """A single request to send, identified by ``case_id``.
+
+    The case travels through the pipeline with its result, so consumers can
+    attribute each response to its payload/mutation no matter the order in
+    which responses complete.
+    """
+    case_id: int
+    payload: Any
+    payload_type: str = "valid"
+    mutation: Optional[str] = None
+
+
+async def send_single(client: httpx.AsyncClient, method: str, url: str, payload: Any, plans: PlanCache, timeout: float, policy: RetryPolicy, budget: RetryBudget, capture: BodyCapture):
+    """Send one payload with retries; shared by stream_concurrent and ``scheduler.stream_targets``.
+
+    Never raises for a failed request: errors (an unserializable payload
+    included) come back as a result with ``status_code`` None. Every attempt
+    is listed in ``result["attempts"]``.
+    """
     method = method.upper()
-    while attempt <= retries:
+    tracer = ConnectionTrace()
+    attempts = []
+    budget.record_request()
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        response = None
+        t0 = time.perf_counter()
         try:
-            t0 = time.perf_counter()
-            r = await client.request(method, url, json=json_body, timeout=timeout)
+            # encoded here so an unserializable payload (a set, NaN) ends up as an error result
+            content, headers = plans.get(payload) or (None, None)
+            async with client.stream(method, url, content=content, headers=headers, timeout=timeout, extensions={"trace": tracer.atrace}) as response:
+                body = await aread_body(response, capture)
             latency = time.perf_counter() - t0
-            return {"status_code": r.status_code, "latency": latency, "body": r.text}
+            res = {"status_code": response.status_code, "latency": latency, **body, "new_connection": tracer.new_connection}
+            kind = STATUS
         except Exception as e:
-            last_exc = e
-            attempt += 1
-    return {"status_code": None, "latency": None, "error": str(last_exc)}
+            latency = time.perf_counter() - t0
+            kind = classify_error(e)
+            res = {"status_code": None, "latency": None, "error": str(e), "error_kind": kind}
+        attempts.append(attempt_record(res, latency))
+        if not policy.should_retry(attempt, kind, res["status_code"]) or not budget.try_acquire():
+            break
+        await asyncio.sleep(policy.backoff(attempt, response))
+        attempt += 1
+    res["attempts"] = attempts
+    res["total_latency"] = time.perf_counter() - started
+    return res
 
-async def _worker(semaphore: asyncio.Semaphore, client: httpx.AsyncClient, method: str, url: str, payload, timeout: float, retries: int):
-    async with semaphore:
-        return await _send_single(client, method, url, payload, timeout, retries)
 
-def _percentile(sorted_vals: List[float], p: float):
-    if not sorted_vals:
+def parse_rate(value: str | float | None) -> Optional[float]:
+    """Parse an arrival rate like ``"500/s"``, ``"1200/m"`` or ``"50"`` into requests per second."""
+    if value is None or value == "":
         return None
-    k = (len(sorted_vals) - 1) * (p / 100.0)
-    f = math.floor(k)
-    c = math.ceil(k)
-    if f == c:
-        return sorted_vals[int(k)]
-    d = k - f
-    return sorted_vals[f] + (sorted_vals[c] - sorted_vals[f]) * d
-
-async def run_concurrent(method: str, url: str, payloads: List[Dict[str, Any]], concurrency: int = 10, timeout: float = 5.0, retries: int = 2):
-    # manda todo en paralelo con semaforo para no saturar
-    semaphore = asyncio.Semaphore(concurrency)
-    results = []
-    async with httpx.AsyncClient() as client:
-        tasks = [
-            asyncio.create_task(_worker(semaphore, client, method, url, payload, timeout, retries))
-            for payload in payloads
-        ]
-        for task in asyncio.as_completed(tasks):
-            res = await task
-            results.append(res)
-
-    # metrics
-    latencies = [r["latency"] for r in results if r.get("latency") is not None]
-    sorted_lat = sorted(latencies)
-    summary = {
-        "total": len(results),
-        "successful": sum(1 for r in results if r.get("status_code") and 200 <= r.get("status_code") < 300),
-        "errors": sum(1 for r in results if not r.get("status_code")),
-        "statuses": {},
-        "percentiles": {
-            "p50": _percentile(sorted_lat, 50),
-            "p95": _percentile(sorted_lat, 95),
-            "p99": _percentile(sorted_lat, 99),
-        },
-    }
-    # status counts
-    for r in results:
-        sc = r.get("status_code")
+    if isinstance(value, (int, float)):
+        rate = float(value)
+    else:
+        text = value.strip().lower()
+        per = 1.0
+        if "/" in text:
+            text, unit = text.split("/", 1)
+            units = {"s": 1.0, "sec": 1.0, "m": 60.0, "min": 60.0, "h": 3600.0}
+            if unit not in units:
+                raise ValueError(f"unknown rate unit: {unit!r}")
+            per = units[unit]
+        rate = float(text) / per
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    return rate
+
+
+class RunStats:
+    """Incremental summary of a run, fed one result at a time.
+
+    Keeps counters instead of the results themselves so the summary can be
+    built while results are streamed to storage. Latencies go into
+    fixed-size histograms (``precision`` is their relative error), so memory
+    does not grow with the run and stats from several workers can be merged.
+    Results from an open-loop run also carry ``corrected_latency`` (measured
+    from the intended start), reported as ``corrected_percentiles`` next to
+    the raw ones.
+    """
+
+    def __init__(self, precision: float = 0.01):
+        self.total = 0
+        self.successful = 0
+        self.errors = 0
+        self.statuses: Dict[str, int] = {}
+        self.latencies = LatencyHistogram(precision=precision)
+        self.corrected = LatencyHistogram(precision=precision)
+        self.max_start_delay = 0.0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.retries = 0
+
+    def add(self, result: Dict[str, Any]):
+        self.total += 1
+        sc = result.get("status_code")
+        if sc and 200 <= sc < 300:
+            self.successful += 1
+        if not sc:
+            self.errors += 1
         key = str(sc) if sc is not None else "error"
-        summary["statuses"].setdefault(key, 0)
-        summary["statuses"][key] += 1
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if result.get("latency") is not None:
+            self.latencies.record(result["latency"])
+        if result.get("corrected_latency") is not None:
+            self.corrected.record(result["corrected_latency"])
+            self.max_start_delay = max(self.max_start_delay, result["actual_start"] - result["intended_start"])
+        if result.get("attempts"):
+            self.retries += len(result["attempts"]) - 1
+        if "new_connection" in result:
+            if result["new_connection"]:
+                self.new_connections += 1
+            else:
+                self.reused_connections += 1
 
-    return {"summary": summary, "results": results}
-import asyncio
-import time
-import math
-from typing import List, Dict, Any
-import httpx
+    def merge(self, other: "RunStats") -> "RunStats":
+        """Fold the stats of another worker into this one (in place)."""
+        self.total += other.total
+        self.successful += other.successful
+        self.errors += other.errors
+        for key, count in other.statuses.items():
+            self.statuses[key] = self.statuses.get(key, 0) + count
+        self.latencies.merge(other.latencies)
+        self.corrected.merge(other.corrected)
+        self.max_start_delay = max(self.max_start_delay, other.max_start_delay)
+        self.new_connections += other.new_connections
+        self.reused_connections += other.reused_connections
+        self.retries += other.retries
+        return self
 
-async def _send_single(client: httpx.AsyncClient, method: str, url: str, json_body, timeout: float, retries: int):
-    attempt = 0
-    last_exc = None
-    method = method.upper()
-    while attempt <= retries:
-        try:
-            t0 = time.perf_counter()
-            r = await client.request(method, url, json=json_body, timeout=timeout)
-            latency = time.perf_counter() - t0
-            return {"status_code": r.status_code, "latency": latency, "body": r.text}
-        except Exception as e:
-            last_exc = e
-            attempt += 1
-    return {"status_code": None, "latency": None, "error": str(last_exc)}
+    def to_dict(self) -> Dict[str, Any]:
+        """Picklable/JSON form used to ship stats between processes."""
+        return {
+            "total": self.total,
+            "successful": self.successful,
+            "errors": self.errors,
+            "statuses": dict(self.statuses),
+            "latencies": self.latencies.to_dict(),
+            "corrected": self.corrected.to_dict(),
+            "max_start_delay": self.max_start_delay,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "retries": self.retries,
+        }
 
-async def _worker(semaphore: asyncio.Semaphore, client: httpx.AsyncClient, method: str, url: str, payload, timeout: float, retries: int):
-    async with semaphore:
-        return await _send_single(client, method, url, payload, timeout, retries)
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunStats":
+        stats = cls(precision=data["latencies"]["precision"])
+        stats.total = data["total"]
+        stats.successful = data["successful"]
+        stats.errors = data["errors"]
+        stats.statuses = dict(data["statuses"])
+        stats.latencies = LatencyHistogram.from_dict(data["latencies"])
+        stats.corrected = LatencyHistogram.from_dict(data["corrected"])
+        stats.max_start_delay = data["max_start_delay"]
+        stats.new_connections = data.get("new_connections", 0)
+        stats.reused_connections = data.get("reused_connections", 0)
+        stats.retries = data.get("retries", 0)
+        return stats
 
-def _percentile(sorted_vals: List[float], p: float):
-    if not sorted_vals:
-        return None
-    k = (len(sorted_vals) - 1) * (p / 100.0)
-    f = math.floor(k)
-    c = math.ceil(k)
-    if f == c:
-        return sorted_vals[int(k)]
-    d = k - f
-    return sorted_vals[f] + (sorted_vals[c] - sorted_vals[f]) * d
-
-async def run_concurrent(method: str, url: str, payloads: List[Dict[str, Any]], concurrency: int = 10, timeout: float = 5.0, retries: int = 2):
-    # manda todo en paralelo con semaforo para no saturar
-    semaphore = asyncio.Semaphore(concurrency)
-    results = []
-    async with httpx.AsyncClient() as client:
-        tasks = [
-            asyncio.create_task(_worker(semaphore, client, method, url, payload, timeout, retries))
-            for payload in payloads
+    def summary(self) -> Dict[str, Any]:
+        summary = {
+            "total": self.total,
+            "successful": self.successful,
+            "errors": self.errors,
+            "statuses": dict(self.statuses),
+            "percentiles": self.latencies.percentiles(),
+            "connections": {"new": self.new_connections, "reused": self.reused_connections},
+            "retries": self.retries,
+        }
+        if self.corrected.count:
+            summary["corrected_percentiles"] = self.corrected.percentiles()
+            summary["max_start_delay"] = self.max_start_delay
+        return summary
+
+
+def as_case(idx: int, item) -> Case:
+    """``item`` itself if it is a Case, else a Case with id ``idx`` sending it as payload."""
+    return item if isinstance(item, Case) else Case(idx, item)
+
+
+async def _produce(payloads: Union[Iterable, AsyncIterable], queue: asyncio.Queue, workers: int, rate: Optional[float], t0: float):
+    async def put(idx, item):
+        intended = None
+        if rate:
+            # open loop: case idx is due at a fixed point of the arrival timeline,
+            # whether or not earlier requests have completed
+            intended = t0 + idx / rate
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await queue.put((as_case(idx, item), intended))
+
+    error = None
+    try:
+        idx = 0
+        if hasattr(payloads, "__aiter__"):
+            async for item in payloads:
+                await put(idx, item)
+                idx += 1
+        else:
+            for item in payloads:
+                await put(idx, item)
+                idx += 1
+    except Exception as e:
+        # stop the workers anyway; the error is re-raised to the consumer
+        error = e
+    for _ in range(workers):
+        await queue.put(_DONE)
+    if error is not None:
+        raise error
+
+
+async def _consume(client: httpx.AsyncClient, method: str, url: str, inbox: asyncio.Queue, outbox: asyncio.Queue, plans: PlanCache, timeout: float, policy: RetryPolicy, budget: RetryBudget, capture: BodyCapture, t0: float, limiter: Optional[AdaptiveLimiter]):
+    try:
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                break
+            case, intended = item
+            if limiter is not None:
+                await limiter.acquire()
+            started = time.perf_counter()
+            res = await send_single(client, method, url, case.payload, plans, timeout, policy, budget, capture)
+            if limiter is not None:
+                await limiter.release(res)
+            res["case_id"] = case.case_id
+            if intended is not None:
+                res["intended_start"] = intended - t0
+                res["actual_start"] = started - t0
+                if res.get("latency") is not None:
+                    # coordinated-omission correction: charge the time the request
+                    # waited for a free worker to its latency
+                    res["corrected_latency"] = time.perf_counter() - intended
+            await outbox.put((case, res))
+    except Exception:
+        await outbox.put(_DONE)  # don't leave the consumer waiting for this worker
+        raise
+    await outbox.put(_DONE)
+
+
+async def stream_concurrent(
+    method: str,
+    url: str,
+    payloads: Union[Iterable[Any], AsyncIterable[Any]],
+    concurrency: int = 10,
+    timeout: float = 5.0,
+    retries: int = 2,
+    queue_size: int | None = None,
+    rate: Optional[float] = None,
+    transport_config: Optional[TransportConfig] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    capture: Optional[BodyCapture] = None,
+) -> AsyncIterator[Tuple[Case, Dict[str, Any]]]:
+    """Send payloads with a fixed pool of workers and yield results as they complete.
+
+    Payloads are pulled lazily from ``payloads`` (sync or async iterable) into a
+    bounded queue, so neither the inputs nor the results are ever fully
+    materialized: memory depends on ``concurrency`` and ``queue_size``, not on
+    the number of requests. Each distinct payload object is JSON-encoded
+    once (see ``plan.PlanCache``) and its bytes reused for every request
+    that sends it.
+
+    Results are yielded in completion order as ``(case, result)`` pairs, and
+    ``result["case_id"]`` matches ``case.case_id``. Items that are not already
+    a ``Case`` are wrapped with their position in the stream as case id.
+
+    By default the load is closed-loop: a worker sends its next request when
+    the previous one completes. With ``rate`` set the run is open-loop: case
+    ``i`` is scheduled at ``i / rate`` seconds from the start and ``concurrency``
+    only caps the requests in flight. Results then also carry
+    ``intended_start``/``actual_start`` (seconds from the start of the run)
+    and ``corrected_latency``, measured from the intended start.
+
+    Args:
+        method: HTTP method
+        url: Target URL
+        payloads: ``Case`` objects or plain JSON bodies to send
+        concurrency: Number of workers (max in-flight requests)
+        timeout: Per-request timeout
+        retries: Retries per request (ignored when ``retry_policy`` is given)
+        queue_size: Bound for the input and output queues (default: 2 * concurrency)
+        rate: Open-loop arrival rate in requests per second (see ``parse_rate``)
+        transport_config: Connection pool settings (default: one kept-alive
+            connection per worker)
+        retry_policy: Backoff/classification/budget rules for retries; the
+            retry budget is shared by all the workers of the stream
+        limiter: Adaptive in-flight limit; the pool is sized to
+            ``limiter.max_limit`` and ``concurrency`` is ignored
+        capture: How much of each response body to keep (default: full text)
+    """
+    if limiter is not None:
+        concurrency = limiter.max_limit
+    concurrency = max(1, concurrency)
+    queue_size = queue_size or 2 * concurrency
+    inbox: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    transport_config = transport_config or TransportConfig.for_concurrency(concurrency)
+    policy = retry_policy or RetryPolicy(max_retries=retries)
+    budget = policy.new_budget()
+    capture = capture or BodyCapture()
+    plans = PlanCache()
+    async with build_async_client(transport_config) as client:
+        t0 = time.perf_counter()
+        tasks = [asyncio.create_task(_produce(payloads, inbox, concurrency, rate, t0))]
+        tasks += [
+            asyncio.create_task(_consume(client, method, url, inbox, outbox, plans, timeout, policy, budget, capture, t0, limiter))
+            for _ in range(concurrency)
         ]
-        for task in asyncio.as_completed(tasks):
-            res = await task
-            results.append(res)
-
-    # metrics
-    latencies = [r["latency"] for r in results if r.get("latency") is not None]
-    sorted_lat = sorted(latencies)
-    summary = {
-        "total": len(results),
-        "successful": sum(1 for r in results if r.get("status_code") and 200 <= r.get("status_code") < 300),
-        "errors": sum(1 for r in results if not r.get("status_code")),
-        "statuses": {},
-        "percentiles": {
-            "p50": _percentile(sorted_lat, 50),
-            "p95": _percentile(sorted_lat, 95),
-            "p99": _percentile(sorted_lat, 99),
-        },
-    }
-    # status counts
-    for r in results:
-        sc = r.get("status_code")
-        key = str(sc) if sc is not None else "error"
-        summary["statuses"].setdefault(key, 0)
-        summary["statuses"][key] += 1
+        try:
+            running = concurrency
+            while running:
+                res = await outbox.get()
+                if res is _DONE:
+                    running -= 1
+                    continue
+                yield res
+            # surface worker errors, then producer errors (e.g. a failing payload
+            # iterator); if a worker crashed the producer may be stuck on a full
+            # inbox, and is cancelled below
+            await asyncio.gather(*tasks[1:])
+            await tasks[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
-    return {"summary": summary, "results": results}
\ No newline at end of file
+
+async def run_concurrent(method: str, url: str, payloads: List[Dict[str, Any]], concurrency: int = 10, timeout: float = 5.0, retries: int = 2, rate: Optional[float] = None, transport_config: Optional[TransportConfig] = None, retry_policy: Optional[RetryPolicy] = None, capture: Optional[BodyCapture] = None):
+    # manda todo en paralelo con un pool fijo de workers para no saturar
+    stats = RunStats()
+    results = []
+    async for _, res in stream_concurrent(method, url, payloads, concurrency=concurrency, timeout=timeout, retries=retries, rate=rate, transport_config=transport_config, retry_policy=retry_policy, capture=capture):
+        stats.add(res)
+        results.append(res)
+    # this API buffers anyway: keep results[i] aligned with payloads[i]
+    results.sort(key=lambda r: r["case_id"])
+    return {"summary": stats.summary(), "results": results}
@@ -0,0 +1,82 @@
+"""Response body capture modes for the runners."""
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict
+
+import httpx
+
+NONE = "none"    # drain the body, keep nothing
+SIZE = "size"    # body_size only (bytes on the wire)
+HASH = "hash"    # body_size + body_hash of the decoded content
+HEAD = "head"    # body_size + first head_bytes decoded into body
+FULL = "full"    # whole decoded text in body (the original behaviour)
+CAPTURE_MODES = (NONE, SIZE, HASH, HEAD, FULL)
+
+
+@dataclass(frozen=True)
+class BodyCapture:
+    """How much of each response body a runner keeps.
+
+    Bodies are read as a stream, so apart from ``full`` they are never
+    buffered whole nor decoded to text. Bodies are always drained so the
+    connection can go back to the pool.
+    """
+    mode: str = FULL
+    head_bytes: int = 1024
+
+    def __post_init__(self):
+        if self.mode not in CAPTURE_MODES:
+            raise ValueError(f"unknown capture mode {self.mode!r} (expected one of {', '.join(CAPTURE_MODES)})")
+
+
+class _Collector:
+    def __init__(self, capture: BodyCapture):
+        self.capture = capture
+        self.size = 0
+        self.hasher = hashlib.blake2b(digest_size=16) if capture.mode == HASH else None
+        self.head = bytearray()
+
+    def feed(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.hasher is not None:
+            self.hasher.update(chunk)
+        elif self.capture.mode == HEAD and len(self.head) < self.capture.head_bytes:
+            self.head += chunk[: self.capture.head_bytes - len(self.head)]
+
+    def result(self, response: httpx.Response) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"body_size": self.size}
+        if self.hasher is not None:
+            out["body_hash"] = self.hasher.hexdigest()
+        if self.capture.mode == HEAD:
+            out["body"] = bytes(self.head).decode(response.encoding or "utf-8", errors="replace")
+        return out
+
+
+def _raw(capture: BodyCapture, response: httpx.Response) -> bool:
+    # none/size don't look at the content: skip content-encoding decompression
+    # (unless the transport handed us an already loaded body)
+    return capture.mode in (NONE, SIZE) and not response.is_stream_consumed
+
+
+async def aread_body(response: httpx.Response, capture: BodyCapture) -> Dict[str, Any]:
+    """Consume a streamed async response according to ``capture``."""
+    if capture.mode == FULL:
+        await response.aread()
+        return {"body": response.text}
+    collector = _Collector(capture)
+    chunks = response.aiter_raw() if _raw(capture, response) else response.aiter_bytes()
+    async for chunk in chunks:
+        collector.feed(chunk)
+    return {} if capture.mode == NONE else collector.result(response)
+
+
+def read_body(response: httpx.Response, capture: BodyCapture) -> Dict[str, Any]:
+    """Consume a streamed sync response according to ``capture``."""
+    if capture.mode == FULL:
+        response.read()
+        return {"body": response.text}
+    collector = _Collector(capture)
+    chunks = response.iter_raw() if _raw(capture, response) else response.iter_bytes()
+    for chunk in chunks:
+        collector.feed(chunk)
+    return {} if capture.mode == NONE else collector.result(response)
@@ -0,0 +1,113 @@
+"""Fixed-memory, mergeable latency histogram."""
+import math
+from typing import Dict, Optional
+
+
+class LatencyHistogram:
+    """Log-bucketed (HDR-style) histogram of latencies in seconds.
+
+    Bucket boundaries grow geometrically, so every value between ``lowest`` and
+    ``highest`` is reported with a relative error of at most ``precision``.
+    Memory is fixed by the configuration (about 1100 buckets for the default
+    1% precision over 1µs..1h), not by the number of values recorded.
+    Recording is O(1); merging and percentile queries walk the buckets once.
+    Values outside the range are clamped into the first/last bucket, while
+    the exact min/max are tracked separately.
+    """
+
+    def __init__(self, precision: float = 0.01, lowest: float = 1e-6, highest: float = 3600.0):
+        if not 0 < precision < 1:
+            raise ValueError("precision must be between 0 and 1")
+        if not 0 < lowest < highest:
+            raise ValueError("expected 0 < lowest < highest")
+        self.precision = precision
+        self.lowest = lowest
+        self.highest = highest
+        # reporting the geometric midpoint of [b^k, b^(k+1)) is off by at most sqrt(b) - 1
+        self._log_base = 2 * math.log1p(precision)
+        self._counts = [0] * (self._index(highest) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _index(self, value: float) -> int:
+        if value <= self.lowest:
+            return 0
+        return int(math.log(value / self.lowest) / self._log_base)
+
+    def _value_at(self, idx: int) -> float:
+        return self.lowest * math.exp((idx + 0.5) * self._log_base)
+
+    def record(self, value: float, count: int = 1):
+        idx = min(self._index(value), len(self._counts) - 1)
+        self._counts[idx] += count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def _check_compatible(self, other: "LatencyHistogram"):
+        if (self.precision, self.lowest, self.highest) != (other.precision, other.lowest, other.highest):
+            raise ValueError("cannot merge histograms with different precision/range")
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """Add the counts of ``other`` into this histogram (in place)."""
+        self._check_compatible(other)
+        for idx, c in enumerate(other._counts):
+            if c:
+                self._counts[idx] += c
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.count:
+            return None
+        if p <= 0:
+            return self.min
+        if p >= 100:
+            return self.max
+        rank = math.ceil(self.count * p / 100.0)
+        seen = 0
+        for idx, c in enumerate(self._counts):
+            seen += c
+            if seen >= rank:
+                return min(max(self._value_at(idx), self.min), self.max)
+        return self.max
+
+    def percentiles(self, ps=(50, 95, 99)) -> Dict[str, Optional[float]]:
+        return {f"p{p:g}": self.percentile(p) for p in ps}
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def to_dict(self) -> dict:
+        """Compact, JSON-serializable form (only non-empty buckets)."""
+        return {
+            "precision": self.precision,
+            "lowest": self.lowest,
+            "highest": self.highest,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "buckets": {str(idx): c for idx, c in enumerate(self._counts) if c},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LatencyHistogram":
+        hist = cls(precision=data["precision"], lowest=data["lowest"], highest=data["highest"])
+        for idx, c in data.get("buckets", {}).items():
+            hist._counts[int(idx)] = c
+        hist.count = data.get("count", 0)
+        hist.total = data.get("total", 0.0)
+        hist.min = data.get("min")
+        hist.max = data.get("max")
+        return hist
@@ -1,17 +1,76 @@
 import time
 import httpx
 
-def send_request(method: str, url: str, json_body=None, timeout: float = 5.0, retries: int = 2):
-    attempt = 0
-    last_exc = None
+from apps.runner.capture import BodyCapture, read_body
+from apps.runner.plan import RequestPlan, encode_json
+from apps.runner.retry import STATUS, RetryBudget, RetryPolicy, attempt_record, classify_error
+from apps.runner.transport import ConnectionTrace, build_client
+
+# lazily created pooled client for callers that don't bring their own
+_shared_client: httpx.Client | None = None
+
+
+def _default_client() -> httpx.Client:
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        _shared_client = build_client()
+    return _shared_client
+
+
+def send_request(
+    method: str,
+    url: str,
+    json_body=None,
+    timeout: float = 5.0,
+    retries: int = 2,
+    client: httpx.Client | None = None,
+    policy: RetryPolicy | None = None,
+    budget: RetryBudget | None = None,
+    capture: BodyCapture | None = None,
+    plan: RequestPlan | None = None,
+):
+    """Send one request through a pooled client (keep-alive across calls).
+
+    Pass ``client`` (see ``transport.build_client``) to control pool settings;
+    otherwise a module-level shared client is used. Retries follow ``policy``
+    (default: ``RetryPolicy(max_retries=retries)``); share a ``budget`` across
+    the calls of a run to cap its total retries. Every attempt is listed in
+    ``result["attempts"]`` with its own latency. ``capture`` selects how much
+    of the response body is kept (default: the full text). Pass a pre-built
+    ``plan`` (see ``plan.PlanCache``) to skip encoding ``json_body`` again.
+    """
+    client = client or _default_client()
+    policy = policy or RetryPolicy(max_retries=retries)
+    budget = budget or policy.new_budget()
+    capture = capture or BodyCapture()
     method = method.upper()
-    while attempt <= retries:
+    tracer = ConnectionTrace()
+    attempts = []
+    budget.record_request()
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        response = None
+        t0 = time.perf_counter()
         try:
-            t0 = time.time()
-            r = httpx.request(method, url, json=json_body, timeout=timeout)
-            latency = time.time() - t0
-            return {"status_code": r.status_code, "latency": latency, "body": r.text}
+            # encoded here so an unserializable body (a set, NaN) ends up as an error result
+            if plan is None and json_body is not None:
+                plan = encode_json(json_body)
+            content, headers = plan if plan is not None else (None, None)
+            with client.stream(method, url, content=content, headers=headers, timeout=timeout, extensions={"trace": tracer}) as response:
+                body = read_body(response, capture)
+            latency = time.perf_counter() - t0
+            res = {"status_code": response.status_code, "latency": latency, **body, "new_connection": tracer.new_connection}
+            kind = STATUS
         except Exception as e:
-            last_exc = e
-            attempt += 1
-    return {"status_code": None, "latency": None, "error": str(last_exc)}
\ No newline at end of file
+            latency = time.perf_counter() - t0
+            kind = classify_error(e)
+            res = {"status_code": None, "latency": None, "error": str(e), "error_kind": kind}
+        attempts.append(attempt_record(res, latency))
+        if not policy.should_retry(attempt, kind, res["status_code"]) or not budget.try_acquire():
+            break
+        time.sleep(policy.backoff(attempt, response))
+        attempt += 1
+    res["attempts"] = attempts
+    res["total_latency"] = time.perf_counter() - started
+    return res
@@ -0,0 +1,55 @@
+"""Request plans: request bodies encoded once and reused across requests."""
+import json
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from engines.contract.overlay import Overlay
+
+
+class RequestPlan(NamedTuple):
+    """Pre-built body of a request: encoded bytes plus the headers describing them."""
+    content: bytes
+    headers: Dict[str, str]
+
+
+def encode_json(payload: Any) -> RequestPlan:
+    """Encode a JSON payload the way httpx does for ``json=`` (compact, UTF-8).
+
+    Overlays are serialized straight from their base and patches, never built.
+    """
+    if isinstance(payload, Overlay):
+        content = payload.encode().encode("utf-8")
+    else:
+        content = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+    return RequestPlan(content, {"Content-Type": "application/json", "Content-Length": str(len(content))})
+
+
+class PlanCache:
+    """Encodes each distinct payload object once per run.
+
+    Runs send the same payload objects over and over (the valid payload and a
+    handful of mutations), so plans are keyed by object identity: no hashing
+    or re-serialization of the payload on a hit. Each entry keeps a reference
+    to its payload so the id cannot be reused while cached; the oldest entries
+    are evicted past ``max_entries`` to keep memory bounded when every case
+    is a fresh object.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._plans: Dict[int, Tuple[Any, RequestPlan]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, payload: Any) -> Optional[RequestPlan]:
+        if payload is None:
+            return None
+        entry = self._plans.get(id(payload))
+        if entry is not None and entry[0] is payload:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        plan = encode_json(payload)
+        if len(self._plans) >= self.max_entries:
+            self._plans.pop(next(iter(self._plans)))
+        self._plans[id(payload)] = (payload, plan)
+        return plan
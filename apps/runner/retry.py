@@ -0,0 +1,120 @@
+"""Retry policy shared by the sync and async runners."""
+import random
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
+
+import httpx
+
+# error kinds returned by classify_error
+CONNECT = "connect"
+READ_TIMEOUT = "read_timeout"
+TIMEOUT = "timeout"
+NETWORK = "network"
+STATUS = "status"
+OTHER = "other"
+
+
+def classify_error(exc: BaseException) -> str:
+    """Map a request exception to a retry kind.
+
+    Connect failures never reached the server and are always safe to retry;
+    read timeouts may have been processed by the server already.
+    """
+    if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout)):
+        return CONNECT
+    if isinstance(exc, httpx.ReadTimeout):
+        return READ_TIMEOUT
+    if isinstance(exc, httpx.TimeoutException):
+        return TIMEOUT
+    if isinstance(exc, httpx.TransportError):
+        return NETWORK
+    return OTHER
+
+
+def attempt_record(result: dict, latency: float) -> dict:
+    """Per-attempt entry kept in ``result["attempts"]`` (latency even for failures)."""
+    rec = {"status_code": result.get("status_code"), "latency": latency}
+    if result.get("error") is not None:
+        rec["error"] = result["error"]
+        rec["error_kind"] = result.get("error_kind")
+    return rec
+
+
+def _retry_after(response: Optional[httpx.Response]) -> Optional[float]:
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None  # HTTP-date form is not worth parsing here
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """When and how long to wait before retrying a request.
+
+    Args:
+        max_retries: Retries after the first attempt
+        backoff_base: Delay cap of the first retry (seconds)
+        backoff_max: Upper bound of any delay (seconds)
+        multiplier: Exponential growth of the delay cap per retry
+        jitter: Full jitter (uniform in [0, cap]) instead of the exact cap
+        retry_on: Error kinds (see classify_error) that are retried
+        retry_statuses: HTTP statuses that are retried
+        budget_ratio: Retries allowed as a fraction of requests sent (None: unlimited)
+        budget_min: Retries always allowed, so small runs can still retry
+    """
+    max_retries: int = 2
+    backoff_base: float = 0.05
+    backoff_max: float = 2.0
+    multiplier: float = 2.0
+    jitter: bool = True
+    retry_on: FrozenSet[str] = frozenset({CONNECT, READ_TIMEOUT, TIMEOUT, NETWORK})
+    retry_statuses: FrozenSet[int] = frozenset({429, 502, 503, 504})
+    budget_ratio: Optional[float] = 0.2
+    budget_min: int = 10
+
+    def should_retry(self, attempt: int, kind: str, status_code: Optional[int] = None) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if kind == STATUS:
+            return status_code in self.retry_statuses
+        return kind in self.retry_on
+
+    def backoff(self, attempt: int, response: Optional[httpx.Response] = None, rng=random) -> float:
+        """Delay before retry number ``attempt + 1`` (exponential, with jitter)."""
+        cap = min(self.backoff_max, self.backoff_base * (self.multiplier ** attempt))
+        delay = rng.uniform(0, cap) if self.jitter else cap
+        retry_after = _retry_after(response)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def new_budget(self) -> "RetryBudget":
+        return RetryBudget(self.budget_ratio, self.budget_min)
+
+
+class RetryBudget:
+    """Run-wide cap on retries, as a fraction of the requests sent.
+
+    Keeps retries from multiplying the load on a target that is already
+    failing: once the budget is spent, failures are reported as they are.
+    """
+
+    def __init__(self, ratio: Optional[float] = 0.2, min_retries: int = 10):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self.denied = 0
+
+    def record_request(self):
+        self.requests += 1
+
+    def try_acquire(self) -> bool:
+        if self.ratio is not None and self.retries >= self.min_retries + self.ratio * self.requests:
+            self.denied += 1
+            return False
+        self.retries += 1
+        return True
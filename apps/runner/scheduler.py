@@ -0,0 +1,151 @@
+"""Fair scheduling of many operations over one client and one concurrency limit."""
+import asyncio
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from apps.runner.async_runner import Case, as_case, send_single
+from apps.runner.capture import BodyCapture
+from apps.runner.plan import PlanCache
+from apps.runner.retry import RetryPolicy
+from apps.runner.transport import TransportConfig, build_async_client
+
+_DONE = object()
+
+
+class Target(NamedTuple):
+    """One operation of a whole-spec run: where to send and what."""
+    key: str            # e.g. "POST /users/{id}"
+    method: str
+    url: str
+    cases: Iterable[Any]
+
+
+class FairScheduler:
+    """Hands out the next case to send, round-robin over targets.
+
+    A target is skipped while it has ``per_target`` requests in flight, so a
+    slow endpoint holds at most that many of the global slots and the others
+    keep getting their turn. ``next`` waits when every remaining target is
+    at its cap, and returns None once every target is exhausted.
+    """
+
+    def __init__(self, targets: List[Target], per_target: int):
+        self.targets = targets
+        self.per_target = max(1, per_target)
+        self.in_flight = [0] * len(targets)
+        self.sent = [0] * len(targets)
+        self._iters: List[Optional[Iterator]] = [iter(t.cases) for t in targets]
+        self._cursor = 0
+        self._cond: Optional[asyncio.Condition] = None
+
+    def _pull(self) -> Optional[Tuple[int, Case]]:
+        n = len(self.targets)
+        for step in range(n):
+            i = (self._cursor + step) % n
+            it = self._iters[i]
+            if it is None or self.in_flight[i] >= self.per_target:
+                continue
+            try:
+                item = next(it)
+            except StopIteration:
+                self._iters[i] = None
+                continue
+            self._cursor = (i + 1) % n
+            self.in_flight[i] += 1
+            case = as_case(self.sent[i], item)
+            self.sent[i] += 1
+            return i, case
+        return None
+
+    def exhausted(self) -> bool:
+        return all(it is None for it in self._iters)
+
+    async def next(self) -> Optional[Tuple[int, Case]]:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            while True:
+                picked = self._pull()
+                if picked is not None or self.exhausted():
+                    return picked
+                await self._cond.wait()
+
+    async def release(self, index: int):
+        self.in_flight[index] -= 1
+        async with self._cond:
+            self._cond.notify_all()
+
+
+async def _worker(client, scheduler: FairScheduler, outbox: asyncio.Queue, plans: PlanCache, timeout: float,
+                  policy: RetryPolicy, budget, capture: BodyCapture):
+    try:
+        while True:
+            picked = await scheduler.next()
+            if picked is None:
+                break
+            index, case = picked
+            target = scheduler.targets[index]
+            try:
+                res = await send_single(client, target.method, target.url, case.payload, plans, timeout, policy, budget, capture)
+            finally:
+                await scheduler.release(index)
+            res["case_id"] = case.case_id
+            await outbox.put((target, case, res))
+    except Exception:
+        await outbox.put(_DONE)  # don't leave the consumer waiting for this worker
+        raise
+    await outbox.put(_DONE)
+
+
+async def stream_targets(
+    targets: List[Target],
+    concurrency: int = 50,
+    per_target: int = 8,
+    timeout: float = 5.0,
+    transport_config: Optional[TransportConfig] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    capture: Optional[BodyCapture] = None,
+) -> AsyncIterator[Tuple[Target, Case, Dict[str, Any]]]:
+    """Send the cases of many targets through one client and yield results as they complete.
+
+    ``concurrency`` caps the requests in flight across all targets and
+    ``per_target`` the ones of any single target; targets take turns (see
+    FairScheduler). Cases are pulled lazily and case ids are per target.
+
+    Args:
+        targets: Operations to run, each with its own case iterable
+        concurrency: Global in-flight limit (number of workers)
+        per_target: In-flight limit of each target
+        timeout: Per-request timeout
+        transport_config: Connection pool settings (default: one connection per worker)
+        retry_policy: Retry rules; the retry budget is shared by every target
+        capture: How much of each response body to keep (default: full text)
+
+    Yields:
+        (target, case, result) tuples
+    """
+    concurrency = max(1, concurrency)
+    scheduler = FairScheduler(targets, per_target)
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=2 * concurrency)
+    policy = retry_policy or RetryPolicy()
+    budget = policy.new_budget()
+    capture = capture or BodyCapture()
+    plans = PlanCache()
+    async with build_async_client(transport_config or TransportConfig.for_concurrency(concurrency)) as client:
+        tasks = [
+            asyncio.create_task(_worker(client, scheduler, outbox, plans, timeout, policy, budget, capture))
+            for _ in range(concurrency)
+        ]
+        try:
+            running = concurrency
+            while running:
+                item = await outbox.get()
+                if item is _DONE:
+                    running -= 1
+                    continue
+                yield item
+            # surface worker errors (e.g. a failing case iterator)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
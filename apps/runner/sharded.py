@@ -0,0 +1,106 @@
+"""Multi-process runner: shards the case stream across worker processes."""
+import asyncio
+import math
+import multiprocessing
+import queue as queue_mod
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from apps.runner.async_runner import Case, RunStats, stream_concurrent
+
+# case_source(shard, workers) -> the cases that worker `shard` must send
+CaseSource = Callable[[int, int], Iterable[Case]]
+
+
+def _shard_main(shard: int, workers: int, method: str, url: str, case_source: CaseSource, runner_kwargs: Dict[str, Any], out, batch_size: int):
+    """Entry point of a worker process: own event loop, own client, own stats."""
+
+    async def main():
+        stats = RunStats()
+        batch = []
+        async for case, res in stream_concurrent(method, url, case_source(shard, workers), **runner_kwargs):
+            stats.add(res)
+            batch.append((case, res))
+            if len(batch) >= batch_size:
+                out.put(("results", shard, batch))
+                batch = []
+        if batch:
+            out.put(("results", shard, batch))
+        out.put(("done", shard, stats.to_dict()))
+
+    try:
+        asyncio.run(main())
+    except BaseException as e:
+        out.put(("error", shard, repr(e)))
+        raise
+
+
+def run_sharded(
+    method: str,
+    url: str,
+    case_source: CaseSource,
+    workers: int,
+    on_result: Optional[Callable[[Case, Dict[str, Any]], None]] = None,
+    concurrency: int = 10,
+    rate: Optional[float] = None,
+    batch_size: int = 256,
+    **runner_kwargs,
+) -> RunStats:
+    """Run ``stream_concurrent`` in ``workers`` processes and merge their stats.
+
+    Each process calls ``case_source(shard, workers)`` to get its own disjoint
+    slice of the cases (``case_source`` must be picklable, e.g. a module-level
+    function or a ``functools.partial`` of one). ``concurrency`` and ``rate``
+    are totals for the whole run and are split evenly between the processes.
+
+    Results are sent back to the coordinator in batches and handed to
+    ``on_result`` in the parent process, so persistence stays in one place.
+
+    Returns:
+        The merged RunStats of all workers
+    """
+    workers = max(1, workers)
+    runner_kwargs = dict(runner_kwargs)
+    runner_kwargs["concurrency"] = max(1, math.ceil(concurrency / workers))
+    runner_kwargs["rate"] = rate / workers if rate else None
+
+    ctx = multiprocessing.get_context("spawn")
+    # bounded so fast workers block instead of piling results up in the parent
+    out = ctx.Queue(maxsize=4 * workers)
+    procs = [
+        ctx.Process(
+            target=_shard_main,
+            args=(shard, workers, method, url, case_source, runner_kwargs, out, batch_size),
+            daemon=True,
+        )
+        for shard in range(workers)
+    ]
+    for p in procs:
+        p.start()
+
+    stats = RunStats()
+    pending = set(range(workers))
+    try:
+        while pending:
+            try:
+                kind, shard, data = out.get(timeout=1.0)
+            except queue_mod.Empty:
+                dead = [s for s in pending if procs[s].exitcode is not None]
+                if dead:
+                    raise RuntimeError(f"worker {dead[0]} exited without reporting (exit code {procs[dead[0]].exitcode})")
+                continue
+            if kind == "results":
+                if on_result is not None:
+                    for case, res in data:
+                        on_result(case, res)
+            elif kind == "done":
+                stats.merge(RunStats.from_dict(data))
+                pending.discard(shard)
+            else:
+                raise RuntimeError(f"worker {shard} failed: {data}")
+    finally:
+        for p in procs:
+            if p.is_alive() and pending:
+                p.terminate()
+            p.join()
+    return stats
+
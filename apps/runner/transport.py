@@ -0,0 +1,71 @@
+"""Shared HTTP transport settings for the sync and async runners."""
+from dataclasses import dataclass
+from typing import Any, Dict
+
+import httpx
+
+# httpcore trace event emitted once a new TCP connection is established
+_CONNECT_EVENT = "connection.connect_tcp.complete"
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    """Connection pool settings applied to every client built by the runners.
+
+    Args:
+        max_connections: Max open connections in the pool
+        max_keepalive_connections: Idle connections kept alive for reuse
+        keepalive_expiry: Seconds an idle connection is kept before closing
+        http2: Negotiate HTTP/2 (needs the optional ``h2`` package)
+    """
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 5.0
+    http2: bool = False
+
+    @classmethod
+    def for_concurrency(cls, concurrency: int, **overrides) -> "TransportConfig":
+        """Pool sized so each of ``concurrency`` workers keeps its connection alive."""
+        size = max(1, concurrency)
+        return cls(**{"max_connections": size, "max_keepalive_connections": size, **overrides})
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def client_kwargs(self) -> Dict[str, Any]:
+        return {"limits": self.limits(), "http2": self.http2}
+
+
+def build_client(config: TransportConfig | None = None, **kwargs) -> httpx.Client:
+    """Pooled sync client; reuse it across requests to keep connections warm."""
+    config = config or TransportConfig()
+    return httpx.Client(**config.client_kwargs(), **kwargs)
+
+
+def build_async_client(config: TransportConfig | None = None, **kwargs) -> httpx.AsyncClient:
+    """Pooled async client; reuse it across requests to keep connections warm."""
+    config = config or TransportConfig()
+    return httpx.AsyncClient(**config.client_kwargs(), **kwargs)
+
+
+class ConnectionTrace:
+    """Per-request httpcore trace hook recording whether a new connection was opened.
+
+    Pass ``{"trace": tracer}`` (sync clients) or ``{"trace": tracer.atrace}``
+    (async clients) as request extensions, then read ``new_connection``.
+    """
+    __slots__ = ("new_connection",)
+
+    def __init__(self):
+        self.new_connection = False
+
+    def __call__(self, event_name: str, info: dict):
+        if event_name == _CONNECT_EVENT:
+            self.new_connection = True
+
+    async def atrace(self, event_name: str, info: dict):
+        self(event_name, info)
@@ -0,0 +1,107 @@
+"""Micro-benchmark: result inserts on SQLite, default pragmas vs the tuned profile.
+
+    python -m benchmarks.bench_sqlite --n 200000
+
+Each profile writes to a fresh database file: ``--commits`` results with one
+commit each (how ``repository.save_result`` writes) and ``--n`` results
+through ``ResultWriter`` batches, while a reader thread keeps counting rows.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from storage import models
+from storage.db import SqliteTuning, build_engine
+from storage.migrations import migrate
+from storage.payloads import insert_missing, payload_hash
+from storage.writer import ResultWriter
+
+PROFILES = {
+    "default": None,  # rollback journal, synchronous=FULL (SQLite's own defaults)
+    "tuned": SqliteTuning(),
+}
+
+
+def _payload(i: int) -> dict:
+    return {"name": f"user-{i % 500}", "role": ["admin", "user", "guest"][i % 3], "age": i % 90}
+
+
+def _new_run(engine) -> int:
+    with engine.begin() as conn:
+        return conn.execute(models.Run.__table__.insert().values(name="bench", created_at=datetime.utcnow())).inserted_primary_key[0]
+
+
+def _row(run_id: int, key: str) -> dict:
+    return {"run_id": run_id, "endpoint": "/users", "method": "post", "payload_hash": key,
+            "status_code": 201, "latency": 0.01, "error": None, "created_at": datetime.utcnow()}
+
+
+def _per_commit(engine, run_id: int, n: int):
+    for i in range(n):
+        payload = _payload(i)
+        key = payload_hash(payload)
+        with engine.begin() as conn:
+            insert_missing(conn, models.Payload.__table__, [{"hash": key, "body": payload}])
+            conn.execute(models.Result.__table__.insert(), [_row(run_id, key)])
+
+
+def _batched(engine, run_id: int, n: int, batch_size: int):
+    with ResultWriter(run_id, batch_size=batch_size, engine=engine) as writer:
+        for i in range(n):
+            writer.add("/users", "post", _payload(i), 201, 0.01, None)
+
+
+def _reader(engine, stop: threading.Event, reads: list):
+    table = models.Result.__table__
+    while not stop.is_set():
+        with engine.connect() as conn:
+            conn.execute(select(func.count()).select_from(table)).scalar()
+        reads[0] += 1
+
+
+def _time(label: str, fn, n: int, reader_engine) -> float:
+    stop, reads = threading.Event(), [0]
+    reader = threading.Thread(target=_reader, args=(reader_engine, stop, reads), daemon=True)
+    reader.start()
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    reader.join()
+    print(f"{label:<24} {n:>9} rows  {elapsed:8.3f}s  {n / elapsed:>12,.0f}/s  ({reads[0]} reads)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=200_000, help="results written through ResultWriter")
+    parser.add_argument("--commits", type=int, default=2_000, help="results written one commit each")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, tuning in PROFILES.items():
+            url = f"sqlite:///{os.path.join(tmp, name + '.db')}"
+            writer = build_engine(url, tuning, writer=tuning is not None)
+            reader = build_engine(url, tuning)
+            migrate(writer)
+            run_id = _new_run(writer)
+            timings[name] = (
+                _time(f"{name} per-commit", lambda: _per_commit(writer, run_id, args.commits), args.commits, reader),
+                _time(f"{name} batched", lambda: _batched(writer, run_id, args.n, args.batch_size), args.n, reader),
+            )
+            writer.dispose()
+            reader.dispose()
+
+    base, tuned = timings["default"], timings["tuned"]
+    print(f"speedup: per-commit {base[0] / tuned[0]:.1f}x, batched {base[1] / tuned[1]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
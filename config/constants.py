@@ -24,9 +24,10 @@ DEFAULT_DATABASE_URL = "sqlite:///datafuzz.db"
 DEFAULT_REPORTS_DIR = "reports/samples"
 DEFAULT_REPORT_FILE = "report.html"
 DEFAULT_PAYLOADS_FILE = "payloads.json"
+DEFAULT_PAYLOADS_JSONL_FILE = "payloads.jsonl"
 
-# HTTP methods
-HTTP_METHODS = ["GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"]
+# HTTP methods (the operations of an OpenAPI path item, in spec order)
+HTTP_METHODS = ["GET", "PUT", "POST", "DELETE", "OPTIONS", "HEAD", "PATCH", "TRACE"]
 
 # Status code ranges
 SUCCESS_STATUS_RANGE = (200, 300)
@@ -1,2 +1,2 @@
 """core package"""
-__all__ = ["parser"]
\ No newline at end of file
+__all__ = ["memo", "parser", "schema_ir", "operations"]
\ No newline at end of file
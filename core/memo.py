@@ -0,0 +1,39 @@
+"""Small per-object caches for the structures built once per loaded spec."""
+from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class IdentityCache(Generic[V]):
+    """Values keyed by the identity of an object (a spec dict, a resolver...).
+
+    Specs are unhashable dicts, so entries are keyed by ``id()`` and keep a
+    reference to their key object: the id cannot be reused by another object
+    while the entry lives. A run only has a handful of specs loaded, so past
+    ``maxsize`` entries the oldest one is dropped.
+
+    Args:
+        maxsize: Entries kept
+    """
+
+    def __init__(self, maxsize: int = 8):
+        self.maxsize = maxsize
+        self._entries: Dict[int, Tuple[Any, V]] = {}
+
+    def get(self, key: Any) -> Optional[V]:
+        entry = self._entries.get(id(key))
+        if entry is not None and entry[0] is key:
+            return entry[1]
+        return None
+
+    def put(self, key: Any, value: V) -> V:
+        self._entries.pop(id(key), None)
+        if len(self._entries) >= self.maxsize:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[id(key)] = (key, value)
+        return value
+
+    def get_or_build(self, key: Any, build: Callable[[Any], V]) -> V:
+        """Cached value of ``key``, or ``build(key)`` stored for next time."""
+        value = self.get(key)
+        return value if value is not None else self.put(key, build(key))
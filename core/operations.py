@@ -0,0 +1,181 @@
+"""Index of the operations of a spec, built once per spec.
+
+Lookups by (method, template), by operationId and by request content type
+are dict hits; concrete paths like ``/users/42`` are matched to their
+template (``/users/{id}``) by walking a trie of path segments, so the cost
+depends on the depth of the path, not on the size of the spec.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config.constants import HTTP_METHODS
+from core.memo import IdentityCache
+from core.parser import get_resolver
+
+# operation keys of a path item are lowercase
+_METHOD_KEYS = tuple(method.lower() for method in HTTP_METHODS)
+
+_PARAM = re.compile(r"\{([^{}/]+)\}")
+
+
+@dataclass(frozen=True, eq=False)
+class Operation:
+    """One operation of the spec with its request bodies already dereferenced."""
+    method: str
+    template: str
+    operation_id: Optional[str]
+    request_schemas: Dict[str, Any] = field(default_factory=dict, repr=False)
+    param_names: Tuple[str, ...] = ()
+    raw: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @property
+    def content_types(self) -> Tuple[str, ...]:
+        return tuple(self.request_schemas)
+
+    def schema(self, content_type: str = "application/json"):
+        """Request body schema for a content type (None if the operation does not accept it)."""
+        return self.request_schemas.get(_media_type(content_type))
+
+
+def _media_type(content_type: str) -> str:
+    # "application/json; charset=utf-8" -> "application/json"
+    return content_type.split(";", 1)[0].strip().lower()
+
+
+def _segments(path: str) -> List[str]:
+    path = path.split("?", 1)[0].split("#", 1)[0]
+    return [s for s in path.split("/") if s]
+
+
+class _Node:
+    __slots__ = ("literals", "patterns", "param", "operations")
+
+    def __init__(self):
+        self.literals: Dict[str, "_Node"] = {}
+        self.patterns: List[Tuple[re.Pattern, "_Node"]] = []  # segments like "{name}.json"
+        self.param: Optional["_Node"] = None                  # whole-segment "{id}"
+        self.operations: Dict[str, Operation] = {}
+
+    def child(self, segment: str) -> "_Node":
+        if not _PARAM.search(segment):
+            return self.literals.setdefault(segment, _Node())
+        if _PARAM.fullmatch(segment):
+            if self.param is None:
+                self.param = _Node()
+            return self.param
+        regex = re.compile("".join(
+            "([^/]+?)" if i % 2 else re.escape(part)
+            for i, part in enumerate(_PARAM.split(segment))
+        ) + "$")
+        for existing, node in self.patterns:
+            if existing.pattern == regex.pattern:
+                return node
+        node = _Node()
+        self.patterns.append((regex, node))
+        return node
+
+
+class OperationIndex:
+    """All operations of a spec, indexed for the lookups runners need.
+
+    Args:
+        spec: Loaded OpenAPI spec
+    """
+
+    def __init__(self, spec: dict):
+        self._by_key: Dict[Tuple[str, str], Operation] = {}
+        self._by_id: Dict[str, Operation] = {}
+        self._by_content_type: Dict[str, List[Operation]] = {}
+        self._root = _Node()
+        resolver = get_resolver(spec)
+
+        for template, path_item in (spec.get("paths") or {}).items():
+            if not isinstance(path_item, dict):
+                continue
+            for method in _METHOD_KEYS:
+                raw = path_item.get(method)
+                if not isinstance(raw, dict):
+                    continue
+                body = resolver.deref(raw.get("requestBody") or {})
+                schemas = {
+                    _media_type(ct): media.get("schema")
+                    for ct, media in (body.get("content") or {}).items()
+                    if isinstance(media, dict)
+                }
+                op = Operation(
+                    method=method,
+                    template=template,
+                    operation_id=raw.get("operationId"),
+                    request_schemas=schemas,
+                    param_names=tuple(_PARAM.findall(template)),
+                    raw=raw,
+                )
+                self._add(op)
+
+    def _add(self, op: Operation):
+        self._by_key[(op.method, op.template)] = op
+        if op.operation_id:
+            self._by_id[op.operation_id] = op
+        for ct in op.request_schemas:
+            self._by_content_type.setdefault(ct, []).append(op)
+        node = self._root
+        for segment in _segments(op.template):
+            node = node.child(segment)
+        node.operations[op.method] = op
+
+    def __iter__(self) -> Iterator[Operation]:
+        return iter(self._by_key.values())
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def get(self, method: str, template: str) -> Optional[Operation]:
+        return self._by_key.get((method.lower(), template))
+
+    def by_operation_id(self, operation_id: str) -> Optional[Operation]:
+        return self._by_id.get(operation_id)
+
+    def by_content_type(self, content_type: str) -> List[Operation]:
+        return list(self._by_content_type.get(_media_type(content_type), ()))
+
+    def match(self, method: str, path: str) -> Optional[Tuple[Operation, Dict[str, str]]]:
+        """Map a concrete path (``/users/42``) to its operation and path parameters.
+
+        Literal segments win over templated ones, as OpenAPI asks
+        (``/users/me`` before ``/users/{id}``). Returns None when nothing matches.
+        """
+        found = self._match(self._root, _segments(path), 0, [], method.lower())
+        if found is None:
+            return None
+        op, values = found
+        return op, dict(zip(op.param_names, values))
+
+    def _match(self, node: _Node, segments: List[str], i: int, values: List[str], method: str):
+        if i == len(segments):
+            op = node.operations.get(method)
+            return (op, list(values)) if op is not None else None
+        segment = segments[i]
+        literal = node.literals.get(segment)
+        if literal is not None:
+            found = self._match(literal, segments, i + 1, values, method)
+            if found is not None:
+                return found
+        for regex, child in node.patterns:
+            m = regex.match(segment)
+            if m:
+                found = self._match(child, segments, i + 1, values + list(m.groups()), method)
+                if found is not None:
+                    return found
+        if node.param is not None:
+            return self._match(node.param, segments, i + 1, values + [segment], method)
+        return None
+
+
+# one index per spec object, like the resolvers
+_INDEXES: IdentityCache[OperationIndex] = IdentityCache()
+
+
+def get_index(spec: dict) -> OperationIndex:
+    """Return the OperationIndex of a loaded spec, building it on first use."""
+    return _INDEXES.get_or_build(spec, OperationIndex)
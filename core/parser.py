@@ -1,8 +1,18 @@
 """OpenAPI specification parsing and schema resolution."""
 from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import hashlib
 import json
+import os
+import pickle
+import tempfile
 import yaml
 
+from core.memo import IdentityCache
+
+# libyaml's loader is an order of magnitude faster on big specs
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 try:
     from openapi_spec_validator import validate_spec
 except ImportError:
@@ -11,46 +21,191 @@ except ImportError:
         return None
 
 
-def load_spec(path: str):
+def _parse(path: Path, text: str):
+    # Detect format from file extension
+    if path.suffix in (".yml", ".yaml"):
+        return yaml.load(text, Loader=_YamlLoader)
+    return json.loads(text)
+
+
+# bump when the cached layout (or what "validated" means) changes
+_CACHE_VERSION = 1
+# specs kept in the cache; the least recently loaded ones are removed past this
+CACHE_MAX_ENTRIES = 64
+
+
+def spec_cache_dir() -> Path:
+    """Directory of the parsed-spec cache (``DATAFUZZ_CACHE_DIR`` overrides it)."""
+    base = os.getenv("DATAFUZZ_CACHE_DIR")
+    if base:
+        return Path(base)
+    return Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "datafuzz" / "specs"
+
+
+def _cache_key(raw: bytes) -> str:
+    h = hashlib.blake2b(raw, digest_size=20)
+    # a spec cached while the validator was missing must not count as validated
+    h.update(f"|v{_CACHE_VERSION}|{validate_spec.__module__}".encode())
+    return h.hexdigest()
+
+
+def _read_cache(path: Path) -> Optional[Tuple[dict, Dict[str, Any]]]:
+    try:
+        with open(path, "rb") as f:
+            data, memo = pickle.load(f)
+    except Exception:
+        return None  # missing, corrupt or from another version: parse again
+    try:
+        os.utime(path)  # recently used: keep it when the cache is pruned
+    except OSError:
+        pass
+    return data, memo
+
+
+def _prune_cache(directory: Path, keep: int):
+    """Remove all but the ``keep`` most recently used specs of the cache."""
+    try:
+        entries = sorted(directory.glob("*.pickle"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for stale in entries[keep:]:
+            stale.unlink()
+    except OSError:
+        pass  # another process pruned (or is using) the same cache
+
+
+def _write_cache(path: Path, data: dict, memo: Dict[str, Any]):
+    tmp = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            # spec and resolved refs in one pickle, so shared schemas stay shared
+            pickle.dump((data, memo), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except Exception:
+        # the cache is an optimization: a read-only home or a spec that does not
+        # pickle (e.g. too deep, RecursionError) is not an error
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        return
+    _prune_cache(path.parent, CACHE_MAX_ENTRIES)
+
+
+def load_spec(path: str, use_cache: bool = True):
     """Load OpenAPI specification from YAML or JSON file.
+
+    Parsed and validated specs are cached on disk keyed by a hash of the
+    file content, together with their dereferenced ``$ref``s: loading an
+    unchanged spec again skips parsing, validation and ref resolution. The
+    cache keeps the CACHE_MAX_ENTRIES most recently loaded specs.
     
     Args:
         path: Path to the spec file (.yaml, .yml, or .json)
+        use_cache: Read and write the on-disk cache (see spec_cache_dir)
     
     Returns:
         The parsed OpenAPI specification dict
     """
     file_path = Path(path)
-    text = file_path.read_text(encoding="utf-8")
-    # Detect format from file extension
-    if file_path.suffix in (".yml", ".yaml"):
-        data = yaml.safe_load(text)
-    else:
-        data = json.loads(text)
-    
+    raw = file_path.read_bytes()
+    cache_file = spec_cache_dir() / f"{_cache_key(raw)}.pickle" if use_cache else None
+    if cache_file is not None:
+        cached = _read_cache(cache_file)
+        if cached is not None:
+            data, memo = cached
+            _register_resolver(RefResolver(data, memo=memo))
+            return data
+
+    data = _parse(file_path, raw.decode("utf-8"))
     # Validate spec format
     validate_spec(data)
+    if cache_file is not None and isinstance(data, dict):
+        resolver = get_resolver(data)
+        resolver.deref(data.get("paths", {}))  # resolve every ref reachable from an operation
+        _write_cache(cache_file, data, resolver._memo)
     return data
 
 
+class RefResolver:
+    """Dereferences local ``$ref`` pointers of a spec, each one only once.
+
+    ``deref`` returns a copy of a schema with every ``$ref`` replaced by its
+    (recursively dereferenced) target. Targets are memoized per ref, so a
+    schema referenced from many places is resolved once and every use shares
+    the same interned dict.
+
+    Recursive references are detected: a ``$ref`` met again while it is still
+    being resolved is left in place as ``{"$ref": ...}`` (the back-edge), so
+    the result is always a finite tree. Schemas first resolved from inside a
+    cycle keep that back-edge one level earlier than strictly needed.
+    """
+
+    def __init__(self, spec: dict, memo: Optional[Dict[str, Any]] = None):
+        self.spec = spec
+        self._memo: Dict[str, Any] = memo if memo is not None else {}
+        self._in_progress = set()
+
+    def resolve_pointer(self, ref: str):
+        """Return the raw target of a local ref like ``#/components/schemas/User``."""
+        if not ref.startswith("#/"):
+            raise ValueError(f"only local refs are supported: {ref}")
+        node = self.spec
+        for part in ref[2:].split("/"):
+            part = part.replace("~1", "/").replace("~0", "~")
+            if isinstance(node, list):
+                node = node[int(part)]
+            elif isinstance(node, dict) and part in node:
+                node = node[part]
+            else:
+                raise KeyError(f"unresolvable $ref: {ref}")
+        return node
+
+    def deref(self, node):
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str):
+                if ref in self._memo:
+                    return self._memo[ref]
+                if ref in self._in_progress:
+                    return node  # recursive back-edge
+                self._in_progress.add(ref)
+                try:
+                    resolved = self.deref(self.resolve_pointer(ref))
+                finally:
+                    self._in_progress.discard(ref)
+                self._memo[ref] = resolved
+                return resolved
+            return {k: self.deref(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [self.deref(v) for v in node]
+        return node
+
+
+# resolvers are per spec object
+_RESOLVERS: IdentityCache[RefResolver] = IdentityCache()
+
+
+def get_resolver(spec: dict) -> RefResolver:
+    """Return the (memoizing) RefResolver of a loaded spec."""
+    return _RESOLVERS.get_or_build(spec, RefResolver)
+
+
+def _register_resolver(resolver: RefResolver) -> RefResolver:
+    return _RESOLVERS.put(resolver.spec, resolver)
+
+
 def get_schema_for_path(spec: dict, endpoint: str, method: str):
-    """Extract the request body schema for a specific endpoint and HTTP method."""
-    paths = spec.get("paths", {})
-    if endpoint not in paths:
-        return None
-    
-    path_item = paths[endpoint]
-    method_lower = method.lower()
-    
-    if method_lower not in path_item:
-        return None
-    
-    operation = path_item[method_lower]
-    request_body = operation.get("requestBody", {})
-    content = request_body.get("content", {})
-    json_content = content.get("application/json", {})
-    
-    return json_content.get("schema")
+    """Extract the request body schema for a specific endpoint and HTTP method.
+
+    ``$ref``s are dereferenced (see RefResolver), so the schema can be used
+    directly by the generators. Served from the spec's OperationIndex.
+    """
+    from core.operations import get_index  # the index module builds on this one
+
+    operation = get_index(spec).get(method, endpoint)
+    return operation.schema("application/json") if operation is not None else None
 
 
 def resolve_type(schema: dict):
@@ -0,0 +1,135 @@
+"""Immutable intermediate representation of request schemas.
+
+Schemas are inspected once, when compiled; generators and mutation engines
+then walk plain frozen nodes for the whole run instead of calling
+``resolve_type`` on raw dicts again and again.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterator, Optional, Tuple
+
+from core.memo import IdentityCache
+from core.operations import get_index
+from core.parser import RefResolver, get_resolver, resolve_type
+
+
+@dataclass(frozen=True, eq=False)
+class SchemaNode:
+    """One compiled schema.
+
+    ``kind`` follows ``resolve_type``: "string", "number", "boolean", "enum",
+    "object", "array" or any other declared type. A "ref" node stands for a
+    recursive back-reference (``ref`` holds the pointer) that was not inlined.
+    Nodes are compared by identity: compiled schemas are interned, so equal
+    refs share one node.
+    """
+    kind: str
+    properties: Tuple[Tuple[str, "SchemaNode"], ...] = ()
+    required: FrozenSet[str] = frozenset()
+    values: Tuple[Any, ...] = ()
+    items: Optional["SchemaNode"] = None
+    ref: Optional[str] = None
+    format: Optional[str] = None
+    _index: Dict[str, "SchemaNode"] = field(default_factory=dict, repr=False)
+
+    def property(self, name: str) -> Optional["SchemaNode"]:
+        return self._index.get(name)
+
+    def walk(self, prefix: Tuple[str, ...] = ()) -> Iterator[Tuple[Tuple[str, ...], "SchemaNode"]]:
+        """Yield ``(path, node)`` for every property nested under this node."""
+        for name, child in self.properties:
+            path = prefix + (name,)
+            yield path, child
+            yield from child.walk(path)
+
+
+class SchemaCompiler:
+    """Compiles dereferenced schemas into SchemaNodes, interning the results.
+
+    Dereferenced schemas share one dict per ``$ref`` target (see
+    RefResolver), so memoizing on the dict identity turns every use of a
+    component schema into the same node.
+    """
+
+    def __init__(self, resolver: Optional[RefResolver] = None):
+        self.resolver = resolver
+        self._nodes: Dict[int, Tuple[Any, SchemaNode]] = {}
+
+    def compile(self, schema) -> SchemaNode:
+        if not isinstance(schema, dict):
+            return SchemaNode("object")
+        cached = self._nodes.get(id(schema))
+        if cached is not None and cached[0] is schema:
+            return cached[1]
+        node = self._build(schema)
+        self._nodes[id(schema)] = (schema, node)
+        return node
+
+    def follow(self, node: SchemaNode) -> SchemaNode:
+        """Resolve a "ref" node to the node of its target (other nodes are returned as is)."""
+        if node.kind != "ref" or self.resolver is None:
+            return node
+        return self.compile(self.resolver.deref({"$ref": node.ref}))
+
+    def _build(self, schema: dict) -> SchemaNode:
+        ref = schema.get("$ref")
+        if isinstance(ref, str):
+            return SchemaNode("ref", ref=ref)
+        resolved = resolve_type(schema)
+        kind = resolved["type"]
+        if kind == "enum":
+            return SchemaNode("enum", values=tuple(resolved.get("values") or ()))
+        if kind == "object":
+            props = resolved.get("properties") or schema.get("properties") or {}
+            properties = tuple((name, self.compile(sub)) for name, sub in props.items()) if isinstance(props, dict) else ()
+            required = schema.get("required") or []
+            return SchemaNode(
+                "object",
+                properties=properties,
+                required=frozenset(required) if isinstance(required, list) else frozenset(),
+                _index=dict(properties),
+            )
+        if kind == "array":
+            return SchemaNode("array", items=self.compile(schema.get("items") or {}))
+        return SchemaNode(kind, format=schema.get("format"))
+
+
+@dataclass(frozen=True)
+class OperationIR:
+    """Compiled view of one operation's request body."""
+    method: str
+    path: str
+    content_type: Optional[str]
+    schema: Optional[SchemaNode]
+    operation_id: Optional[str] = None
+
+
+# one compiler per resolver, so every operation of a spec shares interned nodes
+_COMPILERS: IdentityCache[SchemaCompiler] = IdentityCache()
+
+
+def get_compiler(spec: dict) -> SchemaCompiler:
+    return _COMPILERS.get_or_build(get_resolver(spec), SchemaCompiler)
+
+
+def compile_schema(schema, spec: Optional[dict] = None) -> SchemaNode:
+    """Compile a schema; with ``spec`` its ``$ref``s are dereferenced first."""
+    if spec is None:
+        return SchemaCompiler().compile(schema)
+    compiler = get_compiler(spec)
+    return compiler.compile(compiler.resolver.deref(schema))
+
+
+def compile_operation(spec: dict, endpoint: str, method: str, content_type: str = "application/json") -> Optional[OperationIR]:
+    """Compile the request body schema of an operation (None if the operation is missing)."""
+    operation = get_index(spec).get(method, endpoint)
+    if operation is None:
+        return None
+    raw_schema = operation.schema(content_type)
+    schema = get_compiler(spec).compile(raw_schema) if raw_schema else None
+    return OperationIR(
+        method=operation.method,
+        path=endpoint,
+        content_type=content_type if content_type in operation.content_types else None,
+        schema=schema,
+        operation_id=operation.operation_id,
+    )
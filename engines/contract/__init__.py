@@ -1,3 +1,3 @@
 """engines.contract package"""
 from . import generator
-__all__ = ["generator"]
\ No newline at end of file
+__all__ = ["generator", "compiled", "case_space", "fanout", "overlay", "covering", "feedback"]
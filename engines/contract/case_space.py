@@ -0,0 +1,96 @@
+"""Seeded, random-access space of fuzz cases.
+
+Case ``i`` is a pure function of ``(seed, i)``: it can be computed directly,
+without generating cases ``0..i-1``. Workers can take disjoint index ranges
+with no coordination, and any failing case can be replayed from its index.
+"""
+import random
+from typing import Any, Iterator, List, Optional, Tuple
+
+from core.schema_ir import SchemaNode, compile_schema
+from engines.contract.compiled import compile_random_generator
+from engines.contract.overlay import DELETE, field_mutations, label
+
+_MASK64 = (1 << 64) - 1
+
+# (payload_type, mutation name or None, payload)
+CaseTuple = Tuple[str, Optional[str], Any]
+Path = Tuple[str, ...]
+
+
+def _mix(seed: int, index: int) -> int:
+    """splitmix64 of (seed, index): well-spread rng seeds for neighbouring indexes."""
+    z = (seed * 0x9E3779B97F4A7C15 + index + 1) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+def _parent(payload, path: Path):
+    """Container holding the last key of ``path`` (None if the payload lacks it)."""
+    node = payload
+    for key in path[:-1]:
+        if not isinstance(node, dict) or key not in node:
+            return None
+        node = node[key]
+    return node if isinstance(node, dict) else None
+
+
+def _mutations(root: SchemaNode) -> List[Tuple[str, Path, Any]]:
+    """``(label, path, value)`` for every mutation of the overlay catalog (see overlay.field_mutations)."""
+    return [
+        (label(kind, path), path, value)
+        for path, choices in field_mutations(root)
+        for kind, value in choices
+    ]
+
+
+def _apply(payload, path: Path, value):
+    parent = _parent(payload, path)
+    if parent is not None:
+        if value is DELETE:
+            parent.pop(path[-1], None)
+        else:
+            parent[path[-1]] = value
+    return payload
+
+
+class CaseSpace:
+    """Deterministic, indexable fuzz cases for one schema.
+
+    Each case draws a random valid payload; with probability
+    ``invalid_ratio`` one mutation of ``overlay.field_mutations`` (missing
+    required field, invalid enum, long string, odd unicode, wrong type; at
+    any nesting level) is applied to it, and the case is labelled like
+    unseeded runs label it (``kind:dotted.path``). Everything is drawn from
+    an rng seeded with ``(seed, index)``.
+
+    Args:
+        schema: JSON schema dict or compiled SchemaNode
+        seed: Seed of the whole space
+        invalid_ratio: Share of cases that carry a mutation
+        spec: Spec the schema belongs to, to dereference its ``$ref``s
+    """
+
+    def __init__(self, schema, seed: int = 0, invalid_ratio: float = 0.25, spec: Optional[dict] = None):
+        self.node = schema if isinstance(schema, SchemaNode) else compile_schema(schema, spec)
+        self.seed = seed
+        self.invalid_ratio = invalid_ratio
+        self._valid = compile_random_generator(self.node)
+        self._mutations = _mutations(self.node) if self.node.kind == "object" else []
+
+    def case(self, index: int) -> CaseTuple:
+        rng = random.Random(_mix(self.seed, index))
+        payload = self._valid(rng)
+        if self._mutations and rng.random() < self.invalid_ratio:
+            name, path, value = self._mutations[rng.randrange(len(self._mutations))]
+            # the payload was generated for this case only: mutate it in place
+            return ("invalid", name, _apply(payload, path, value))
+        return ("valid", None, payload)
+
+    def cases(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, CaseTuple]]:
+        """Yield ``(index, case)`` for ``start <= index < stop`` (endless without ``stop``)."""
+        index = start
+        while stop is None or index < stop:
+            yield index, self.case(index)
+            index += 1
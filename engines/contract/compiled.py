@@ -0,0 +1,111 @@
+"""Compiled payload generators.
+
+``gen_value_for_schema`` interprets the schema on every call: it resolves
+the type and looks up the properties at every level, for every payload.
+``compile_generator`` does that work once and returns a plain function;
+producing N payloads is then N calls of a specialized closure with no
+schema inspection. Output is the same as the interpreter's.
+"""
+import random
+import string
+from typing import Any, Callable, Optional, Tuple
+
+from core.schema_ir import SchemaNode, compile_schema
+
+Generator = Callable[[], Any]
+
+# value produced for each scalar kind (same defaults as gen_value_for_schema)
+_SCALARS = {"string": "ok", "number": 1, "boolean": True}
+
+
+def _constant(node: SchemaNode) -> Tuple[bool, Any]:
+    """(True, value) when the node always generates the same immutable value."""
+    if node.kind in _SCALARS:
+        return True, _SCALARS[node.kind]
+    if node.kind == "enum":
+        return True, node.values[0] if node.values else "INVALID"
+    if node.kind in ("object", "ref"):
+        return False, None
+    return True, None  # arrays and unknown types: the interpreter yields None
+
+
+def _plan(node: SchemaNode) -> Generator:
+    is_const, value = _constant(node)
+    if is_const:
+        return lambda: value
+    if node.kind == "ref":
+        # unresolved recursive ref: the interpreter sees an object without properties
+        return dict
+
+    # constant fields live in a template (also fixing the key order); only
+    # nested objects need a call per payload
+    template = {}
+    nested = []
+    for name, child in node.properties:
+        child_const, child_value = _constant(child)
+        template[name] = child_value
+        if not child_const:
+            nested.append((name, _plan(child)))
+    if not nested:
+        return template.copy
+    nested = tuple(nested)
+
+    def gen():
+        out = template.copy()
+        for name, fn in nested:
+            out[name] = fn()
+        return out
+
+    return gen
+
+
+def compile_generator(schema, spec: Optional[dict] = None) -> Generator:
+    """Compile a schema (raw dict or SchemaNode) into a zero-argument payload generator.
+
+    Args:
+        schema: JSON schema dict or an already compiled SchemaNode
+        spec: Spec the schema belongs to, to dereference its ``$ref``s
+
+    Returns:
+        A function returning a fresh valid payload on every call
+    """
+    node = schema if isinstance(schema, SchemaNode) else compile_schema(schema, spec)
+    return _plan(node)
+
+
+RandomGenerator = Callable[[random.Random], Any]
+
+_ALPHABET = string.ascii_letters + string.digits
+
+
+def _random_plan(node: SchemaNode) -> RandomGenerator:
+    kind = node.kind
+    if kind == "string":
+        return lambda rng: "".join(rng.choices(_ALPHABET, k=rng.randint(1, 12)))
+    if kind == "number":
+        # integers are valid for both "integer" and "number" schemas
+        return lambda rng: rng.randint(0, 1000)
+    if kind == "boolean":
+        return lambda rng: rng.random() < 0.5
+    if kind == "enum":
+        values = node.values or ("INVALID",)
+        return lambda rng: rng.choice(values)
+    if kind == "array":
+        item = _random_plan(node.items) if node.items is not None else (lambda rng: None)
+        return lambda rng: [item(rng) for _ in range(rng.randint(0, 3))]
+    if kind == "ref":
+        return lambda rng: {}
+    if kind == "object":
+        fields = tuple((name, _random_plan(child)) for name, child in node.properties)
+        return lambda rng: {name: fn(rng) for name, fn in fields}
+    return lambda rng: None
+
+
+def compile_random_generator(schema, spec: Optional[dict] = None) -> RandomGenerator:
+    """Like compile_generator, but values are drawn from the ``random.Random`` passed on each call.
+
+    The same rng state always yields the same payload, which is what makes
+    seeded case spaces reproducible.
+    """
+    node = schema if isinstance(schema, SchemaNode) else compile_schema(schema, spec)
+    return _random_plan(node)
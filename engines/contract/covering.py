@@ -0,0 +1,243 @@
+"""Combinatorial mutation planning with t-wise covering arrays.
+
+Every field of a schema is a factor whose levels are "keep the valid value"
+plus the mutations that apply to it (see ``overlay.field_mutations``). A
+covering array of strength t is a set of rows (one level per factor) where
+every combination of levels of any t factors shows up in some row. For
+pairwise coverage the number of rows grows with the log of the number of
+fields, instead of the product of all the levels.
+"""
+import itertools
+import math
+import operator
+import random
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from core.schema_ir import SchemaNode, compile_schema
+from engines.contract.compiled import compile_generator
+from engines.contract.overlay import Overlay, Path, field_mutations, label
+
+Row = Tuple[int, ...]
+
+
+# level evaluations allowed per row kept; bounds the number of candidate rows on wide schemas
+MAX_WORK_PER_ROW = 20_000
+# past this many level evaluations for a single candidate, rows are completed at random
+MAX_GREEDY_COST = 50_000
+# t-combinations of fields planned at strength t > 2; wider schemas are planned pairwise
+MAX_TUPLE_COMBOS = 5_000
+
+
+def _candidate_cost(levels: Sequence[int], t: int) -> int:
+    # level evaluations to build one candidate: every level of every factor,
+    # against each t-combination the factor belongs to
+    k = len(levels)
+    return max(1, sum(levels) * (math.comb(k - 1, t - 1) if k else 0))
+
+
+def candidates_per_row(levels: Sequence[int], strength: int, candidates: int, max_work: int = MAX_WORK_PER_ROW) -> int:
+    """How many candidate rows to try per row kept, at most ``candidates``.
+
+    The cost of one candidate grows with the number of fields to the power
+    t. Past ``max_work`` level evaluations per row, fewer candidates are
+    tried (down to one): the array gets a few more rows, but wide schemas
+    are planned in about a second instead of minutes.
+    """
+    t = max(1, min(strength, len(levels)))
+    return max(1, min(candidates, max_work // _candidate_cost(levels, t)))
+
+
+def effective_strength(n_fields: int, strength: int) -> int:
+    """``strength``, lowered to pairwise when the schema has too many t-combinations of fields."""
+    if strength > 2 and math.comb(n_fields, strength) > MAX_TUPLE_COMBOS:
+        return 2
+    return strength
+
+
+def covering_array(levels: Sequence[int], strength: int = 2, seed: int = 0, candidates: int = 10,
+                   max_work: int = MAX_WORK_PER_ROW, parents: Optional[Sequence[Optional[int]]] = None) -> List[Row]:
+    """Greedy (AETG-style) covering array.
+
+    Rows are built one at a time: each candidate row starts from a still
+    uncovered t-tuple and fills the remaining factors, in random order, with
+    the level covering the most uncovered t-tuples; the best of the
+    candidate rows is kept. Deterministic for a given ``seed``.
+
+    The search is bounded for wide inputs: fewer candidates per row past
+    ``max_work`` (see candidates_per_row) and, when even one greedy
+    candidate costs more than MAX_GREEDY_COST, the remaining factors get
+    random levels. Every t-tuple is still covered, with more rows.
+
+    With ``parents`` the factors form a tree and a factor off level 0
+    overrides its whole subtree: no row sets a factor and one of its
+    ancestors off level 0 at once, and the t-tuples that would need it are
+    not required (nor counted as covered).
+
+    Args:
+        levels: Number of levels of each factor
+        strength: t, the size of the factor combinations to cover
+        seed: Seed of the tie-breaking rng
+        candidates: Candidate rows tried for every row kept
+        max_work: Work budget per row kept, which caps ``candidates`` (see candidates_per_row)
+        parents: Index of the parent factor of each factor (None for top-level ones)
+
+    Returns:
+        Rows of level indexes, one per factor
+    """
+    k = len(levels)
+    if k == 0:
+        return []
+    t = max(1, min(strength, k))
+    tries = candidates_per_row(levels, t, candidates, max_work)
+    greedy = _candidate_cost(levels, t) <= MAX_GREEDY_COST
+    rng = random.Random(seed)
+    # ancestors and descendants of every factor: at most one of them can leave level 0
+    related: List[Set[int]] = [set() for _ in range(k)]
+    for f in range(k):
+        p = parents[f] if parents else None
+        while p is not None:
+            related[f].add(p)
+            related[p].add(f)
+            p = parents[p]
+
+    def realizable(combo: Tuple[int, ...], values: Tuple[int, ...]) -> bool:
+        return not any(values[i] and values[j] and combo[j] in related[combo[i]]
+                       for i, j in itertools.combinations(range(len(combo)), 2))
+
+    uncovered: Dict[Tuple[int, ...], Set[Tuple[int, ...]]] = {
+        combo: {values for values in itertools.product(*(range(levels[f]) for f in combo)) if realizable(combo, values)}
+        for combo in itertools.combinations(range(k), t)
+    }
+
+    def blocked(row: List[int], factor: int) -> bool:
+        # an ancestor or descendant is already off level 0: ``factor`` must stay at 0
+        return any(row[g] > 0 for g in related[factor])
+    # combos each factor belongs to, with the position of the factor in them,
+    # to score a level without scanning every combo
+    combos_of: Dict[int, List[Tuple[Tuple[int, ...], int]]] = {f: [] for f in range(k)}
+    for combo in uncovered:
+        for pos, f in enumerate(combo):
+            combos_of[f].append((combo, pos))
+
+    def scores(row: List[int], factor: int) -> List[int]:
+        # uncovered t-tuples each level of ``factor`` would cover, given the factors already set
+        out = [0] * levels[factor]
+        for combo, pos in combos_of[factor]:
+            missing = uncovered[combo]
+            if not missing:
+                continue
+            key = [row[f] for f in combo]
+            key[pos] = 0
+            if -1 in key:
+                continue
+            before, after = tuple(key[:pos]), tuple(key[pos + 1:])
+            for level in range(levels[factor]):
+                if before + (level,) + after in missing:
+                    out[level] += 1
+        return out
+
+    # reads a row's t-tuple for a combo
+    pick = {
+        combo: operator.itemgetter(*combo) if t > 1 else (lambda row, f=combo[0]: (row[f],))
+        for combo in uncovered
+    }
+
+    rows: List[Row] = []
+    open_combos = list(uncovered)
+    while open_combos:
+        best_row, best_score = None, -1
+        for _ in range(tries):
+            combo = rng.choice(open_combos)
+            values = rng.choice(sorted(uncovered[combo]))
+            row = [-1] * k
+            for f, v in zip(combo, values):
+                row[f] = v
+            rest = [f for f in range(k) if row[f] < 0]
+            if not greedy:
+                # too wide to score: random levels around the uncovered t-tuple
+                for factor in rest:
+                    row[factor] = 0 if blocked(row, factor) else rng.randrange(levels[factor])
+                best_row = tuple(row)
+                break
+            rng.shuffle(rest)
+            # every combo is counted once, when its last factor is set (the seed combo up front)
+            score = 1
+            for factor in rest:
+                gains = scores(row, factor)
+                if blocked(row, factor):
+                    level = 0
+                else:
+                    top = max(gains)
+                    level = rng.choice([lvl for lvl, g in enumerate(gains) if g == top])
+                row[factor] = level
+                score += gains[level]
+            if score > best_score:
+                best_row, best_score = tuple(row), score
+        rows.append(best_row)
+        still_open = []
+        for combo in open_combos:
+            missing = uncovered[combo]
+            missing.discard(pick[combo](best_row))
+            if missing:
+                still_open.append(combo)
+        open_combos = still_open
+    return rows
+
+
+def _parents(paths: Sequence[Path]) -> List[Optional[int]]:
+    # index of the nearest field whose path is a prefix of each path
+    index = {path: i for i, path in enumerate(paths)}
+    out: List[Optional[int]] = []
+    for path in paths:
+        parent = None
+        for depth in range(len(path) - 1, 0, -1):
+            parent = index.get(path[:depth])
+            if parent is not None:
+                break
+        out.append(parent)
+    return out
+
+
+def plan_combinations(schema, base: Any = None, strength: int = 2, seed: int = 0,
+                      spec: Optional[dict] = None) -> List[Tuple[str, Overlay]]:
+    """t-wise combined mutations of a schema, as overlays on one valid payload.
+
+    Each row of the covering array over field x mutation choices becomes an
+    Overlay mutating several fields at once, labelled with its mutations
+    joined by ``+``. The row leaving every field valid is dropped: the
+    valid payload is sent on its own anyway. A mutation of an object field
+    replaces everything below it, so a row never also mutates its nested
+    fields: the combinations covered, and the labels, are the ones actually
+    sent. Strengths above 2 fall back to pairwise on schemas with more than
+    MAX_TUPLE_COMBOS t-combinations of fields (see effective_strength).
+
+    Args:
+        schema: JSON schema dict or compiled SchemaNode
+        base: Valid payload to mutate (treated as read-only)
+        strength: t of the covering array (2 = pairwise)
+        seed: Seed of the planner
+        spec: Spec the schema belongs to, to dereference its ``$ref``s
+
+    Returns:
+        List of (label, Overlay)
+    """
+    root = schema if isinstance(schema, SchemaNode) else compile_schema(schema, spec)
+    if root.kind != "object":
+        return []
+    if base is None:
+        base = compile_generator(root)()
+    fields = field_mutations(root)
+    # level 0 of every factor keeps the valid value
+    levels = [len(choices) + 1 for _, choices in fields]
+    rows = covering_array(levels, strength=effective_strength(len(fields), strength), seed=seed,
+                          parents=_parents([path for path, _ in fields]))
+
+    plans = []
+    for row in rows:
+        # rows never mutate a field below a mutated one, so every patch takes effect
+        chosen = [(path, fields[f][1][level - 1]) for f, (path, _) in enumerate(fields) if (level := row[f])]
+        if not chosen:
+            continue
+        name = "+".join(label(kind, path) for path, (kind, _) in chosen)
+        plans.append((name, Overlay(base, [(path, value) for path, (_, value) in chosen])))
+    return plans
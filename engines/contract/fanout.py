@@ -0,0 +1,110 @@
+"""Payload generation for many operations at once, one process per operation.
+
+Each operation of a spec is generated by its own worker straight into its
+own JSONL shard: memory stays constant whatever ``n`` is, and a large spec
+keeps every core busy.
+"""
+import hashlib
+import json
+import multiprocessing
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from core import parser as core_parser
+from core.operations import get_index
+from core.schema_ir import compile_operation
+from engines.contract.compiled import compile_generator
+from storage.jsonl import JsonlWriter
+
+def list_operations(spec: dict) -> List[Tuple[str, str]]:
+    """(endpoint, method) of every operation with a JSON request body schema."""
+    return [(op.template, op.method) for op in get_index(spec) if op.schema("application/json")]
+
+
+def shard_name(endpoint: str, method: str) -> str:
+    """File name of an operation's shard, e.g. ``post_users_id.jsonl`` for POST /users/{id}."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", endpoint).strip("_") or "root"
+    return f"{method.lower()}_{slug}.jsonl"
+
+
+def shard_names(operations: List[Tuple[str, str]]) -> List[str]:
+    """Unique shard file names for ``operations``, in the same order.
+
+    Different templates can share a slug (``/a-b`` and ``/a_b``,
+    ``/users/{id}`` and ``/users/id``); those names get a short hash of the
+    method and template, so two workers never write the same file.
+    """
+    names = [shard_name(endpoint, method) for endpoint, method in operations]
+    # compared case-insensitively: the output dir may be on a case-insensitive filesystem
+    counts = Counter(name.lower() for name in names)
+    out = []
+    for name, (endpoint, method) in zip(names, operations):
+        if counts[name.lower()] > 1:
+            digest = hashlib.sha1(f"{method.upper()} {endpoint}".encode("utf-8")).hexdigest()[:8]
+            name = f"{name[:-len('.jsonl')]}_{digest}.jsonl"
+        out.append(name)
+    return out
+
+
+def generate_jsonl(schema, n: int, path, spec: Optional[dict] = None) -> int:
+    """Stream ``n`` valid payloads of ``schema`` to a JSONL file; returns how many were written."""
+    generate = compile_generator(schema, spec)
+    with JsonlWriter(path) as writer:
+        for _ in range(n):
+            writer.write(generate())
+        return writer.count
+
+
+def generate_json(schema, n: int, path, spec: Optional[dict] = None) -> int:
+    """Write ``n`` valid payloads as one indented JSON array, streamed item by item."""
+    generate = compile_generator(schema, spec)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", buffering=1 << 20) as f:
+        # same layout as json.dump(samples, f, indent=2), without holding the list
+        f.write("[")
+        for i in range(n):
+            item = json.dumps(generate(), ensure_ascii=False, indent=2)
+            f.write(("," if i else "") + "\n  " + item.replace("\n", "\n  "))
+        f.write("\n]" if n else "]")
+    return n
+
+
+def _generate_operation(spec_path: str, endpoint: str, method: str, n: int, out_dir: str, name: str) -> Dict:
+    # runs in a worker process: load the spec there instead of pickling it over
+    spec = core_parser.load_spec(spec_path)
+    operation = compile_operation(spec, endpoint, method)
+    path = Path(out_dir) / name
+    count = generate_jsonl(operation.schema if operation is not None else None, n, path)
+    return {"endpoint": endpoint, "method": method, "path": str(path), "count": count}
+
+
+def generate_all(spec_path: str, n: int, out_dir, workers: Optional[int] = None,
+                 operations: Optional[List[Tuple[str, str]]] = None) -> List[Dict]:
+    """Generate ``n`` payloads for every operation of a spec, in parallel.
+
+    Args:
+        spec_path: Path to the OpenAPI spec (each worker loads it)
+        n: Payloads per operation
+        out_dir: Directory receiving one JSONL shard per operation (see shard_names)
+        workers: Worker processes (default: one per core, at most one per operation)
+        operations: (endpoint, method) pairs to generate (default: list_operations)
+
+    Returns:
+        One dict per operation with its endpoint, method, shard path and count
+    """
+    if operations is None:
+        operations = list_operations(core_parser.load_spec(spec_path))
+    if not operations:
+        return []
+    workers = min(workers or multiprocessing.cpu_count(), len(operations))
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = [
+            pool.submit(_generate_operation, spec_path, endpoint, method, n, str(out_dir), name)
+            for (endpoint, method), name in zip(operations, shard_names(operations))
+        ]
+        return [f.result() for f in futures]
@@ -0,0 +1,159 @@
+"""Feedback-guided mutation scheduling.
+
+Responses are reduced to a fingerprint (status, shape of the body, latency
+bucket). A response with a fingerprint never seen before is a finding, and
+the mutation that caused it gets the credit. The scheduler hands out the
+remaining requests in proportion to how productive each mutation has been,
+so mutations that keep getting the same 400 fade out and the budget goes
+where the API behaves differently.
+"""
+import bisect
+import hashlib
+import json
+import random
+import re
+from collections import deque
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+# upper bounds (seconds) of the latency buckets; coarse on purpose, so that
+# jitter does not look like new behaviour
+LATENCY_BUCKETS = (0.05, 0.25, 1.0, 5.0)
+
+_KEY = re.compile(r'"((?:[^"\\]|\\.){1,64})"\s*:')
+
+
+def _shape(value, depth: int = 0) -> str:
+    if depth >= 4:
+        return "…"
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{k}:{_shape(value[k], depth + 1)}" for k in sorted(value)) + "}"
+    if isinstance(value, list):
+        return "[" + (_shape(value[0], depth + 1) if value else "") + "]"
+    if isinstance(value, bool):
+        return "b"
+    if isinstance(value, (int, float)):
+        return "n"
+    if isinstance(value, str):
+        return "s"
+    return "z"
+
+
+def body_shape(result: Dict[str, Any]) -> str:
+    """Structure of a response body, without its values.
+
+    JSON bodies are reduced to their keys and value types; a truncated body
+    (``head`` capture) to the set of keys it shows. Without a body, the
+    order of magnitude of ``body_size`` is all there is.
+    """
+    body = result.get("body")
+    if body is None:
+        size = result.get("body_size")
+        return "none" if size is None else f"size:{size.bit_length()}"
+    try:
+        shape = _shape(json.loads(body))
+    except ValueError:
+        keys = sorted(set(_KEY.findall(body)))
+        shape = "keys:" + ",".join(keys) if keys else "text"
+    return hashlib.blake2b(shape.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def latency_bucket(latency: Optional[float]) -> int:
+    return -1 if latency is None else bisect.bisect_left(LATENCY_BUCKETS, latency)
+
+
+def fingerprint(result: Dict[str, Any]) -> Tuple[Any, str, int]:
+    """(status or error kind, body shape, latency bucket) of a runner result."""
+    status = result.get("status_code")
+    if status is None:
+        status = "error:" + str(result.get("error_kind") or "unknown")
+    return status, body_shape(result), latency_bucket(result.get("latency"))
+
+
+class _Arm:
+    __slots__ = ("name", "payload", "sends", "finds")
+
+    def __init__(self, name: str, payload: Any):
+        self.name = name
+        self.payload = payload
+        self.sends = 0
+        self.finds = 0
+
+
+class FeedbackScheduler:
+    """Picks the mutation of each request from the feedback of the previous ones.
+
+    Every mutation is first tried ``min_trials`` times; after that each
+    request goes to a mutation drawn with weight ``(finds + prior) /
+    (sends + 1)``, so productive mutations get more of the budget while the
+    others keep a small chance. ``valid_ratio`` of the requests send the
+    valid payload, as a baseline.
+
+    Feedback comes in through ``observe`` while ``cases`` is being consumed;
+    with a concurrent runner it lags by the requests in flight.
+
+    Args:
+        valid: Valid payload
+        mutations: (name, payload) pairs; names must be unique
+        valid_ratio: Share of requests sending the valid payload
+        min_trials: Sends of every mutation before weighting kicks in
+        prior: Weight of a mutation that never found anything
+        seed: Seed of the scheduling rng
+    """
+
+    def __init__(self, valid: Any, mutations: Sequence[Tuple[str, Any]], valid_ratio: float = 0.1,
+                 min_trials: int = 2, prior: float = 0.1, seed: int = 0):
+        self.valid = valid
+        self.arms = [_Arm(name, payload) for name, payload in mutations]
+        self._by_name = {arm.name: arm for arm in self.arms}
+        self.valid_ratio = valid_ratio if self.arms else 1.0
+        self.min_trials = min_trials
+        self.prior = prior
+        self.rng = random.Random(seed)
+        self.seen: Dict[Tuple[Any, str, int], str] = {}  # fingerprint -> first mutation (or "valid")
+        self.requests = 0
+        self.findings = 0
+        self._warmup = deque(arm for _ in range(min_trials) for arm in self.arms)
+
+    def _pick(self) -> Optional[_Arm]:
+        if self.rng.random() < self.valid_ratio:
+            return None
+        if self._warmup:
+            return self._warmup.popleft()
+        weights = [(arm.finds + self.prior) / (arm.sends + 1) for arm in self.arms]
+        return self.rng.choices(self.arms, weights)[0]
+
+    def cases(self, n: int) -> Iterator[Tuple[str, Optional[str], Any]]:
+        """Yield ``n`` cases as (payload_type, mutation name or None, payload)."""
+        for _ in range(n):
+            arm = self._pick()
+            if arm is None:
+                yield "valid", None, self.valid
+            else:
+                arm.sends += 1
+                yield "invalid", arm.name, arm.payload
+
+    def observe(self, mutation: Optional[str], result: Dict[str, Any]) -> bool:
+        """Record the result of a case; returns True when it is a finding (new fingerprint)."""
+        self.requests += 1
+        fp = fingerprint(result)
+        if fp in self.seen:
+            return False
+        self.seen[fp] = mutation or "valid"
+        self.findings += 1
+        arm = self._by_name.get(mutation) if mutation is not None else None
+        if arm is not None:
+            arm.finds += 1
+        return True
+
+    def report(self, top: int = 10) -> Dict[str, Any]:
+        ranked = sorted(self.arms, key=lambda arm: (-arm.finds, arm.sends))
+        return {
+            "requests": self.requests,
+            "findings": self.findings,
+            "findings_per_1000": round(1000.0 * self.findings / self.requests, 2) if self.requests else 0.0,
+            "fingerprints": len(self.seen),
+            "top_mutations": [
+                {"mutation": arm.name, "finds": arm.finds, "sends": arm.sends}
+                for arm in ranked[:top] if arm.finds
+            ],
+        }
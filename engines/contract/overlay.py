@@ -0,0 +1,266 @@
+"""Copy-on-write mutations: (path, replacement) overlays on a shared payload.
+
+A mutation does not copy the payload it mutates. It is an ``Overlay``: the
+base document (shared by every mutation of an operation and never modified)
+plus a few ``(path, value)`` patches. Patches are only applied when the
+payload is needed: ``encode`` serializes base and patches in one pass, and
+``materialize`` builds a real document copying just the containers along
+the patched paths. Thousands of nested mutations cost thousands of small
+patch lists, not thousands of deep copies.
+"""
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from config.constants import LONG_STRING_LENGTH, UNICODE_TEST_STRING
+from core.schema_ir import SchemaNode, compile_schema
+from engines.contract.compiled import compile_generator
+
+Key = Union[str, int]
+Path = Tuple[Key, ...]
+
+
+class _Delete:
+    def __repr__(self):
+        return "DELETE"
+
+    def __reduce__(self):
+        return "DELETE"  # unpickles to the module singleton
+
+
+DELETE = _Delete()
+"""Patch value removing the key (or list item) at its path."""
+
+_UNSET = object()
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode
+
+
+class _Set:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+def _assign(node, path: Path, value):
+    """Copy of ``node`` with ``value`` at ``path``; only the containers on the path are copied."""
+    if not path:
+        return value
+    key, rest = path[0], path[1:]
+    if isinstance(node, list) and isinstance(key, int) and 0 <= key < len(node):
+        out = list(node)
+        if value is DELETE and not rest:
+            del out[key]
+        else:
+            out[key] = _assign(out[key], rest, value)
+        return out
+    out = dict(node) if isinstance(node, dict) else {}
+    if value is DELETE and not rest:
+        out.pop(key, None)
+    else:
+        out[key] = _assign(out.get(key), rest, value)
+    return out
+
+
+def _encode(value, tree: Dict[Key, Any]) -> str:
+    if isinstance(value, list) and all(isinstance(k, int) for k in tree):
+        parts = []
+        for i, item in enumerate(value):
+            patch = tree.get(i)
+            if patch is None:
+                parts.append(_dumps(item))
+            elif isinstance(patch, _Set):
+                if patch.value is not DELETE:
+                    parts.append(_dumps(patch.value))
+            else:
+                parts.append(_encode(item, patch))
+        return "[" + ",".join(parts) + "]"
+
+    base = value if isinstance(value, dict) else {}
+    parts = []
+    for key, item in base.items():
+        patch = tree.get(key)
+        if patch is None:
+            parts.append(_dumps(key) + ":" + _dumps(item))
+        elif isinstance(patch, _Set):
+            if patch.value is not DELETE:
+                parts.append(_dumps(key) + ":" + _dumps(patch.value))
+        else:
+            parts.append(_dumps(key) + ":" + _encode(item, patch))
+    for key, patch in tree.items():
+        if key in base:
+            continue
+        if isinstance(patch, _Set):
+            if patch.value is not DELETE:
+                parts.append(_dumps(key) + ":" + _dumps(patch.value))
+        else:
+            parts.append(_dumps(key) + ":" + _encode(None, patch))
+    return "{" + ",".join(parts) + "}"
+
+
+def _build(value, tree: Dict[Key, Any]):
+    if isinstance(value, list) and all(isinstance(k, int) for k in tree):
+        out = list(value)
+        deleted = []
+        for key, patch in tree.items():
+            if not 0 <= key < len(value):
+                continue
+            if isinstance(patch, _Set):
+                if patch.value is DELETE:
+                    deleted.append(key)
+                else:
+                    out[key] = patch.value
+            else:
+                out[key] = _build(value[key], patch)
+        for i in sorted(deleted, reverse=True):
+            del out[i]
+        return out
+    out = dict(value) if isinstance(value, dict) else {}
+    for key, patch in tree.items():
+        if isinstance(patch, _Set):
+            if patch.value is DELETE:
+                out.pop(key, None)
+            else:
+                out[key] = patch.value
+        else:
+            out[key] = _build(out.get(key), patch)
+    return out
+
+
+class Overlay:
+    """A payload defined as ``base`` plus ``(path, value)`` patches.
+
+    ``base`` is shared, never modified: build it once and keep it read-only.
+    Paths are tuples of dict keys and (non-negative) list indexes; patches
+    on list items past the end are ignored. A ``DELETE`` value
+    removes the entry. Later patches win over earlier ones on the same path.
+
+    Args:
+        base: Shared payload the patches apply to
+        patches: ``(path, value)`` pairs, applied in order
+    """
+    __slots__ = ("base", "patches", "_tree", "_value")
+
+    def __init__(self, base: Any, patches: Iterable[Tuple[Path, Any]] = ()):
+        self.base = base
+        self.patches = tuple((tuple(path), value) for path, value in patches)
+        self._tree: Optional[Dict[Key, Any]] = None
+        self._value: Any = _UNSET
+
+    def __getstate__(self):
+        return self.base, self.patches
+
+    def __setstate__(self, state):
+        self.base, self.patches = state
+        self._tree = None
+        self._value = _UNSET
+
+    def __repr__(self):
+        return f"Overlay({len(self.patches)} patches)"
+
+    def patch(self, path: Path, value: Any) -> "Overlay":
+        """New overlay on the same base with one more patch."""
+        return Overlay(self.base, self.patches + ((tuple(path), value),))
+
+    def tree(self) -> Dict[Key, Any]:
+        """Patches folded into a nested dict (``_Set`` leaves), built once."""
+        if self._tree is None:
+            tree: Dict[Key, Any] = {}
+            for path, value in self.patches:
+                if not path:
+                    raise ValueError("an overlay cannot patch the root of the payload")
+                node = tree
+                for depth, key in enumerate(path[:-1]):
+                    child = node.get(key)
+                    if isinstance(child, _Set):
+                        # patch below a replaced value: apply it to the replacement
+                        node[key] = _Set(_assign(child.value, path[depth + 1:], value))
+                        break
+                    if child is None:
+                        child = node[key] = {}
+                    node = child
+                else:
+                    node[path[-1]] = _Set(value)
+            self._tree = tree
+        return self._tree
+
+    def encode(self) -> str:
+        """Compact JSON of the patched payload, without building it."""
+        return _encode(self.base, self.tree())
+
+    def materialize(self) -> Any:
+        """The patched payload as plain data, built once (read-only: it shares subtrees with the base)."""
+        if self._value is _UNSET:
+            self._value = _build(self.base, self.tree())
+        return self._value
+
+
+def materialize(payload: Any) -> Any:
+    """Plain data for a payload that may be an Overlay."""
+    return payload.materialize() if isinstance(payload, Overlay) else payload
+
+
+def _wrong_type(node: SchemaNode):
+    if node.kind in ("string", "enum"):
+        return 12345
+    if node.kind == "number":
+        return "not-a-number"
+    if node.kind == "boolean":
+        return "true"
+    return "not-an-object"
+
+
+def field_mutations(root: SchemaNode) -> List[Tuple[Path, List[Tuple[str, Any]]]]:
+    """``(path, [(kind, value), ...])`` for every field of an object schema, nested ones included.
+
+    Kinds are missing_required (required fields only), invalid_enum,
+    long_string, weird_unicode and wrong_type, as they apply to the field.
+    """
+    required = {(): root.required}
+    fields = []
+    for path, node in root.walk():
+        required[path] = node.required
+        choices = []
+        if path[-1] in required.get(path[:-1], ()):
+            choices.append(("missing_required", DELETE))
+        if node.kind == "enum":
+            choices.append(("invalid_enum", "INVALID_ENUM"))
+        if node.kind == "string":
+            choices.append(("long_string", "A" * LONG_STRING_LENGTH))
+            choices.append(("weird_unicode", UNICODE_TEST_STRING))
+        if node.kind != "ref":
+            choices.append(("wrong_type", _wrong_type(node)))
+        if choices:
+            fields.append((path, choices))
+    return fields
+
+
+def label(kind: str, path: Path) -> str:
+    return f"{kind}:{'.'.join(map(str, path))}"
+
+
+def overlay_mutations(schema, base: Any = None, spec: Optional[dict] = None) -> List[Tuple[str, Overlay]]:
+    """Invalid mutations of every field of a schema, nested ones included.
+
+    Each mutation is an overlay on the same ``base`` payload (a fresh valid
+    payload when not given) and is labelled ``kind:dotted.path``, kind being
+    missing_required, invalid_enum, long_string, weird_unicode or wrong_type.
+
+    Args:
+        schema: JSON schema dict or compiled SchemaNode
+        base: Valid payload to mutate (treated as read-only)
+        spec: Spec the schema belongs to, to dereference its ``$ref``s
+
+    Returns:
+        List of (label, Overlay)
+    """
+    root = schema if isinstance(schema, SchemaNode) else compile_schema(schema, spec)
+    if root.kind != "object":
+        return []
+    if base is None:
+        base = compile_generator(root)()
+    return [
+        (label(kind, path), Overlay(base, ((path, value),)))
+        for path, choices in field_mutations(root)
+        for kind, value in choices
+    ]
@@ -1,2 +1,2 @@
 """storage package"""
-__all__ = ["db", "models", "repository"]
\ No newline at end of file
+__all__ = ["db", "models", "repository", "jsonl", "writer", "payloads", "migrations", "export"]
\ No newline at end of file
@@ -1,18 +1,106 @@
-from sqlalchemy import create_engine
+from dataclasses import dataclass
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from storage.models import Base
+from storage.migrations import migrate
 import os
 
 DATABASE_URL = os.getenv("DATAFUZZ_DATABASE_URL", "sqlite:///datafuzz.db")
 
-# select connect_args for sqlite only
-connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
 
-# create engine with pool_pre_ping to be resilient to dropped connections
-engine = create_engine(DATABASE_URL, connect_args=connect_args, echo=False, pool_pre_ping=True)
+@dataclass(frozen=True)
+class SqliteTuning:
+    """Pragmas applied to every SQLite connection.
+
+    The default profile trades the full fsync of every commit for WAL
+    journaling with ``synchronous=NORMAL``: a commit survives an app crash,
+    only an OS crash or power loss can lose the last ones. WAL also lets
+    readers (reports, exports) run while the writer is inserting.
+    ``DATAFUZZ_SQLITE_PROFILE=plain`` keeps SQLite's own defaults.
+    """
+    journal_mode: str = "wal"
+    synchronous: str = "normal"
+    cache_size_kb: int = 64 * 1024
+    mmap_size_mb: int = 256
+    busy_timeout_ms: int = 5000
+
+    @classmethod
+    def from_env(cls) -> "SqliteTuning | None":
+        if os.getenv("DATAFUZZ_SQLITE_PROFILE", "tuned").lower() == "plain":
+            return None
+        return cls(
+            journal_mode=os.getenv("DATAFUZZ_SQLITE_JOURNAL", cls.journal_mode),
+            synchronous=os.getenv("DATAFUZZ_SQLITE_SYNCHRONOUS", cls.synchronous),
+            cache_size_kb=int(os.getenv("DATAFUZZ_SQLITE_CACHE_KB", cls.cache_size_kb)),
+            mmap_size_mb=int(os.getenv("DATAFUZZ_SQLITE_MMAP_MB", cls.mmap_size_mb)),
+        )
+
+    def pragmas(self):
+        return [
+            f"PRAGMA journal_mode={self.journal_mode}",
+            f"PRAGMA synchronous={self.synchronous}",
+            f"PRAGMA cache_size=-{self.cache_size_kb}",  # negative: KiB instead of pages
+            f"PRAGMA mmap_size={self.mmap_size_mb * 1024 * 1024}",
+            f"PRAGMA busy_timeout={self.busy_timeout_ms}",
+            "PRAGMA temp_store=memory",
+        ]
+
+
+def build_engine(url: str, tuning: "SqliteTuning | None" = None, writer: bool = False):
+    """Create the engine for ``url``.
+
+    For SQLite, ``tuning`` pragmas are set on every new connection. A
+    ``writer`` engine holds a single connection and opens its transactions
+    with BEGIN IMMEDIATE, so all writes go through one connection, in order,
+    and never fail halfway on a lock upgrade; readers use a regular engine.
+    """
+    if not url.startswith("sqlite"):
+        # create engine with pool_pre_ping to be resilient to dropped connections
+        return create_engine(url, echo=False, pool_pre_ping=True)
+
+    kwargs = {}
+    if writer:
+        kwargs.update(pool_size=1, max_overflow=0)
+    engine = create_engine(url, connect_args={"check_same_thread": False}, echo=False, pool_pre_ping=True, **kwargs)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        if writer:
+            # let SQLAlchemy issue BEGIN itself (see the "begin" hook below)
+            dbapi_conn.isolation_level = None
+        if tuning is not None:
+            cursor = dbapi_conn.cursor()
+            for pragma in tuning.pragmas():
+                cursor.execute(pragma)
+            cursor.close()
+
+    if writer:
+        @event.listens_for(engine, "begin")
+        def _on_begin(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+def is_memory_sqlite(engine) -> bool:
+    """In-memory SQLite: each connection (i.e. each thread) sees its own empty database."""
+    return engine.dialect.name == "sqlite" and engine.url.database in (None, "", ":memory:")
+
+
+SQLITE_TUNING = SqliteTuning.from_env() if DATABASE_URL.startswith("sqlite") else None
+
+engine = build_engine(DATABASE_URL, SQLITE_TUNING)
+# bulk writes (storage.writer) go through their own connection; with WAL the
+# readers of `engine` are not blocked by them. An in-memory database only
+# exists in its thread's connection, so there the writer shares `engine` and
+# flushes on the caller's thread.
+if engine.dialect.name == "sqlite" and not is_memory_sqlite(engine):
+    writer_engine = build_engine(DATABASE_URL, SQLITE_TUNING, writer=True)
+else:
+    writer_engine = engine
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+# sessions that write (storage.repository) share the writer's connection
+WriterSession = sessionmaker(bind=writer_engine, autocommit=False, autoflush=False)
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    """Bring the database schema up to date (see storage.migrations)."""
+    migrate(writer_engine)
@@ -0,0 +1,236 @@
+"""Streaming export of run results to JSONL, CSV or a columnar binary file.
+
+Every format is written as the rows come from ``iter_results_for_run``, so
+memory stays flat whatever the size of the run, and under a temporary name
+renamed on success (like storage.jsonl).
+
+The columnar format ("dfzc") stores results in row groups (10,000 rows by
+default). Each group is a little-endian uint32 header length, a JSON header and
+then one buffer per column, in header order::
+
+    b"DFZC1\\n"
+    [u32 len][{"rows": n, "columns": [{"name", "type", "bytes", "values"?}, ...]}][buffers...]
+    ...
+    [u32 0]                                   end of file
+
+Column types:
+
+- ``int64`` / ``int32`` / ``float64``: little-endian typed arrays. NULL is
+  -1 for integers (no status code means the request failed) and NaN for
+  floats.
+- ``dict``: text, dictionary-encoded per group: uint32 codes into the
+  group's ``values`` list (NULL is a ``null`` value). Endpoint, mutation
+  and the other text columns repeat a lot, so this is also what keeps the
+  file small.
+
+``read_columnar`` loads a file back into ``array.array`` columns, and
+``numpy.frombuffer`` can read the same buffers without copying.
+"""
+import array
+import csv
+import json
+import math
+import os
+import struct
+import sys
+from datetime import timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Union
+
+from storage import repository
+from storage.jsonl import JsonlWriter
+
+EXPORT_FORMATS = ("jsonl", "csv", "columnar")
+EXTENSIONS = {"jsonl": ".jsonl", "csv": ".csv", "columnar": ".dfzc"}
+
+MAGIC = b"DFZC1\n"
+_LEN = struct.Struct("<I")
+
+# (column, type) in file order; "payload" is the compact JSON of the body
+COLUMNAR_SCHEMA = (
+    ("id", "int64"),
+    ("case_id", "int64"),
+    ("status_code", "int32"),
+    ("latency", "float64"),
+    ("created_at", "float64"),  # unix seconds, UTC
+    ("endpoint", "dict"),
+    ("method", "dict"),
+    ("payload_type", "dict"),
+    ("mutation", "dict"),
+    ("error", "dict"),
+    ("payload_hash", "dict"),
+    ("payload", "dict"),
+)
+_TYPECODES = {"int64": "q", "int32": "i", "float64": "d", "dict": "I"}
+_BIG_ENDIAN = sys.byteorder == "big"
+
+_encode_json = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def _plain(row: Dict[str, Any]) -> Dict[str, Any]:
+    created = row.get("created_at")
+    return {**row, "created_at": created.isoformat() if created is not None else None}
+
+
+def write_jsonl(rows: Iterable[Dict[str, Any]], path: Union[str, Path]) -> int:
+    with JsonlWriter(path) as writer:
+        return writer.write_many(_plain(row) for row in rows)
+
+
+def write_csv(rows: Iterable[Dict[str, Any]], path: Union[str, Path], columns: List[str]) -> int:
+    """One line per result; the payload column holds the body as compact JSON."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".part")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in rows:
+                row = _plain(row)
+                if row.get("payload") is not None:
+                    row["payload"] = _encode_json(row["payload"])
+                writer.writerow(["" if row.get(c) is None else row[c] for c in columns])
+                count += 1
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, path)
+    return count
+
+
+class ColumnarWriter:
+    """Writes results as row groups of typed columns (see module docstring).
+
+    Args:
+        path: Output file
+        rows_per_group: Rows buffered before a group is written
+    """
+
+    def __init__(self, path: Union[str, Path], rows_per_group: int = 10_000):
+        self.path = Path(path)
+        self.rows_per_group = max(1, rows_per_group)
+        self.count = 0
+        self.groups = 0
+        self._tmp = self.path.with_name(self.path.name + ".part")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self._tmp, "wb", buffering=1 << 20)
+        self._file.write(MAGIC)
+        self._reset()
+
+    def _reset(self):
+        self._rows = 0
+        self._arrays = {name: array.array(_TYPECODES[kind]) for name, kind in COLUMNAR_SCHEMA}
+        self._dicts: Dict[str, Dict[Any, int]] = {name: {} for name, kind in COLUMNAR_SCHEMA if kind == "dict"}
+
+    def write(self, row: Dict[str, Any]):
+        for name, kind in COLUMNAR_SCHEMA:
+            value = row.get(name)
+            if kind == "dict":
+                if name == "payload" and value is not None:
+                    value = _encode_json(value)
+                codes = self._dicts[name]
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(codes)
+                self._arrays[name].append(code)
+            elif kind == "float64":
+                if name == "created_at" and value is not None:
+                    value = value.replace(tzinfo=timezone.utc).timestamp()  # stored as naive UTC
+                self._arrays[name].append(math.nan if value is None else value)
+            else:
+                self._arrays[name].append(-1 if value is None else value)
+        self._rows += 1
+        self.count += 1
+        if self._rows >= self.rows_per_group:
+            self._flush_group()
+
+    def write_many(self, rows: Iterable[Dict[str, Any]]) -> int:
+        before = self.count
+        for row in rows:
+            self.write(row)
+        return self.count - before
+
+    def _flush_group(self):
+        if not self._rows:
+            return
+        columns, buffers = [], []
+        for name, kind in COLUMNAR_SCHEMA:
+            arr = self._arrays[name]
+            if _BIG_ENDIAN:
+                arr.byteswap()
+            data = arr.tobytes()
+            column = {"name": name, "type": kind, "bytes": len(data)}
+            if kind == "dict":
+                column["values"] = list(self._dicts[name])
+            columns.append(column)
+            buffers.append(data)
+        header = json.dumps({"rows": self._rows, "columns": columns}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._file.write(_LEN.pack(len(header)))
+        self._file.write(header)
+        for data in buffers:
+            self._file.write(data)
+        self.groups += 1
+        self._reset()
+
+    def close(self, discard: bool = False):
+        if self._file.closed:
+            return
+        if not discard:
+            self._flush_group()
+            self._file.write(_LEN.pack(0))
+        self._file.close()
+        if discard:
+            self._tmp.unlink(missing_ok=True)
+        else:
+            os.replace(self._tmp, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(discard=exc_type is not None)
+
+
+def read_columnar(path: Union[str, Path]) -> Dict[str, Any]:
+    """Load a columnar export: numeric columns as ``array.array``, dict columns as lists.
+
+    Payloads are returned as their JSON text (``json.loads`` the ones you need).
+    """
+    out: Dict[str, Any] = {
+        name: array.array(_TYPECODES[kind]) if kind != "dict" else [] for name, kind in COLUMNAR_SCHEMA
+    }
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a datafuzz columnar file")
+        while True:
+            (size,) = _LEN.unpack(f.read(_LEN.size))
+            if size == 0:
+                break
+            header = json.loads(f.read(size))
+            for column in header["columns"]:
+                data = f.read(column["bytes"])
+                arr = array.array(_TYPECODES[column["type"]])
+                arr.frombytes(data)
+                if _BIG_ENDIAN:
+                    arr.byteswap()
+                if column["type"] == "dict":
+                    values = column["values"]
+                    out[column["name"]].extend(values[code] for code in arr)
+                else:
+                    out[column["name"]].extend(arr)
+    return out
+
+
+def export_run(run_id: int, path: Union[str, Path], fmt: str = "jsonl", chunk_size: int = 1000) -> int:
+    """Stream every result of a run into ``path``; returns the number of rows written."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format {fmt!r} (expected one of {', '.join(EXPORT_FORMATS)})")
+    rows = repository.iter_results_for_run(run_id, chunk_size=chunk_size)
+    if fmt == "jsonl":
+        return write_jsonl(rows, path)
+    if fmt == "csv":
+        return write_csv(rows, path, list(repository.RESULT_COLUMNS))
+    with ColumnarWriter(path, rows_per_group=max(chunk_size, 10_000)) as writer:
+        return writer.write_many(rows)
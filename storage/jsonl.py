@@ -0,0 +1,53 @@
+"""Streaming JSON Lines output."""
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterable, Union
+
+
+class JsonlWriter:
+    """Writes one compact JSON document per line, as the records come.
+
+    Nothing is kept in memory besides the file buffer, so the output size is
+    only bounded by the disk. The file is written under a temporary name and
+    renamed on a clean close: readers never see a half-written shard.
+
+    Args:
+        path: Output file
+        buffer_size: Size of the write buffer in bytes
+    """
+
+    def __init__(self, path: Union[str, Path], buffer_size: int = 1 << 20):
+        self.path = Path(path)
+        self.count = 0
+        self._tmp = self.path.with_name(self.path.name + ".part")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self._tmp, "w", encoding="utf-8", buffering=buffer_size)
+        self._encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    def write(self, record: Any):
+        self._file.write(self._encode(record))
+        self._file.write("\n")
+        self.count += 1
+
+    def write_many(self, records: Iterable[Any]) -> int:
+        """Write every record of an iterable (consumed lazily); returns how many."""
+        before = self.count
+        for record in records:
+            self.write(record)
+        return self.count - before
+
+    def close(self, discard: bool = False):
+        if self._file.closed:
+            return
+        self._file.close()
+        if discard:
+            self._tmp.unlink(missing_ok=True)
+        else:
+            os.replace(self._tmp, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(discard=exc_type is not None)
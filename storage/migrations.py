@@ -0,0 +1,137 @@
+"""Versioned schema migrations.
+
+Each migration moves the schema one version forward and is applied once,
+in its own transaction; the applied versions are recorded in
+``schema_version``. Migrations are written against the tables as they were
+at that version (not against storage.models), and they are idempotent, so
+databases created with ``create_all`` before migrations existed are
+adopted as they are.
+"""
+import json
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import (
+    JSON, Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, Text, inspect, text,
+)
+
+from storage.payloads import insert_missing, payload_hash
+
+
+def _columns(conn, table: str) -> set:
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def _add_column(conn, table: str, ddl: str):
+    name = ddl.split()[0]
+    if name not in _columns(conn, table):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {ddl}"))
+
+
+def _create_index(conn, name: str, table: str, columns: str):
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+def _v1_initial(conn):
+    """runs and results, payloads stored inline."""
+    meta = MetaData()
+    Table(
+        "runs", meta,
+        Column("id", Integer, primary_key=True),
+        Column("created_at", DateTime),
+        Column("name", String, nullable=True),
+    )
+    Table(
+        "results", meta,
+        Column("id", Integer, primary_key=True),
+        Column("run_id", Integer, ForeignKey("runs.id")),
+        Column("endpoint", String),
+        Column("method", String),
+        Column("payload", JSON),
+        Column("status_code", Integer, nullable=True),
+        Column("latency", Float, nullable=True),
+        Column("error", Text, nullable=True),
+    )
+    meta.create_all(conn, checkfirst=True)
+
+
+def _v2_payloads(conn, batch_size: int = 1000):
+    """Content-addressed payloads table; results reference it by hash."""
+    meta = MetaData()
+    payloads = Table(
+        "payloads", meta,
+        Column("hash", String(32), primary_key=True),
+        Column("body", JSON),
+    )
+    meta.create_all(conn, checkfirst=True)
+    _add_column(conn, "results", "payload_hash VARCHAR(32) REFERENCES payloads(hash)")
+    if "payload" not in _columns(conn, "results"):
+        return
+    # move inline payloads out of results, one batch at a time
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text("SELECT id, payload FROM results WHERE id > :last AND payload IS NOT NULL ORDER BY id LIMIT :n"),
+            {"last": last_id, "n": batch_size},
+        ).all()
+        if not rows:
+            break
+        updates, bodies = [], {}
+        for row_id, raw in rows:
+            body = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+            key = payload_hash(body)
+            bodies[key] = body
+            updates.append({"id": row_id, "hash": key})
+        insert_missing(conn, payloads, [{"hash": k, "body": v} for k, v in bodies.items()])
+        conn.execute(text("UPDATE results SET payload_hash = :hash, payload = NULL WHERE id = :id"), updates)
+        last_id = rows[-1][0]
+
+
+def _v3_case_metadata(conn):
+    """Case id, payload type, mutation and timestamp on results; indexes for the lookup paths."""
+    _add_column(conn, "results", "case_id INTEGER")
+    _add_column(conn, "results", "payload_type VARCHAR(16)")
+    _add_column(conn, "results", "mutation VARCHAR")
+    _add_column(conn, "results", "created_at TIMESTAMP")
+    # get_results_for_run: WHERE run_id = ? ORDER BY id
+    _create_index(conn, "ix_results_run_id_id", "results", "run_id, id")
+    # get_latest_run: ORDER BY created_at DESC, optionally WHERE name = ?
+    _create_index(conn, "ix_runs_created_at", "runs", "created_at")
+    _create_index(conn, "ix_runs_name_created_at", "runs", "name, created_at")
+
+
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "initial schema", _v1_initial),
+    (2, "content-addressed payloads", _v2_payloads),
+    (3, "case metadata and indexes", _v3_case_metadata),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+_VERSION_DDL = (
+    "CREATE TABLE IF NOT EXISTS schema_version ("
+    "version INTEGER PRIMARY KEY, description VARCHAR NOT NULL, applied_at TIMESTAMP NOT NULL)"
+)
+
+
+def current_version(engine) -> int:
+    with engine.begin() as conn:
+        conn.execute(text(_VERSION_DDL))
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar_one()
+
+
+def migrate(engine, target: int = LATEST) -> List[int]:
+    """Apply the pending migrations up to ``target``; returns the versions applied."""
+    applied = []
+    version = current_version(engine)
+    for number, description, step in MIGRATIONS:
+        if number <= version or number > target:
+            continue
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": number, "d": description, "t": datetime.utcnow()},
+            )
+        applied.append(number)
+    return applied
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, JSON, DateTime
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, JSON, DateTime, Index, inspect
 from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.orm.exc import DetachedInstanceError
 from datetime import datetime
 
 Base = declarative_base()
@@ -11,14 +12,50 @@ class Run(Base):
     name = Column(String, nullable=True)
     results = relationship("Result", back_populates="run")
 
+    __table_args__ = (
+        Index("ix_runs_created_at", "created_at"),
+        Index("ix_runs_name_created_at", "name", "created_at"),
+    )
+
+class Payload(Base):
+    """A distinct request body, stored once and referenced by its content hash."""
+    __tablename__ = "payloads"
+    hash = Column(String(32), primary_key=True)
+    body = Column(JSON)
+
 class Result(Base):
     __tablename__ = "results"
     id = Column(Integer, primary_key=True)
     run_id = Column(Integer, ForeignKey("runs.id"))
     endpoint = Column(String)
     method = Column(String)
-    payload = Column(JSON)
+    payload_hash = Column(String(32), ForeignKey("payloads.hash"), nullable=True)
     status_code = Column(Integer, nullable=True)
     latency = Column(Float, nullable=True)
     error = Column(Text, nullable=True)
-    run = relationship("Run", back_populates="results")
\ No newline at end of file
+    case_id = Column(Integer, nullable=True)
+    payload_type = Column(String(16), nullable=True)
+    mutation = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    run = relationship("Run", back_populates="results")
+    # bodies are loaded on access; queries that need them use joinedload
+    payload_ref = relationship("Payload", lazy="select")
+
+    __table_args__ = (Index("ix_results_run_id_id", "run_id", "id"),)
+
+    @property
+    def payload(self):
+        """Body of the payload sent, None when the result has none.
+
+        Loaded on first access inside a session. Rows used after their session
+        is closed must have been loaded with it (``get_results_for_run``
+        does by default); otherwise this raises a DetachedInstanceError
+        saying so instead of SQLAlchemy's generic one.
+        """
+        state = inspect(self)
+        if state.detached and "payload_ref" in state.unloaded:
+            raise DetachedInstanceError(
+                "Result.payload was not loaded before its session closed; "
+                "use get_results_for_run(run_id, with_payload=True) or read it inside the session"
+            )
+        return self.payload_ref.body if self.payload_ref is not None else None
\ No newline at end of file
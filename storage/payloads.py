@@ -0,0 +1,31 @@
+"""Content addressing of payloads."""
+import hashlib
+import json
+from typing import Any, Dict, List
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def canonical_json(payload: Any) -> str:
+    """JSON text that only depends on the payload's content (sorted keys, no spaces)."""
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def payload_hash(payload: Any) -> str:
+    """Key of a payload in the ``payloads`` table: blake2b-128 of its canonical JSON."""
+    return hashlib.blake2b(canonical_json(payload).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def insert_missing(conn, table, rows: List[Dict[str, Any]]):
+    """Insert ``{"hash", "body"}`` rows into the payloads table, skipping hashes already stored."""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        conn.execute(sqlite.insert(table).on_conflict_do_nothing(), rows)
+    elif dialect == "postgresql":
+        conn.execute(postgresql.insert(table).on_conflict_do_nothing(), rows)
+    else:
+        existing = set(conn.execute(table.select().with_only_columns(table.c.hash)
+                                    .where(table.c.hash.in_([r["hash"] for r in rows]))).scalars())
+        missing = [r for r in rows if r["hash"] not in existing]
+        if missing:
+            conn.execute(table.insert(), missing)
@@ -1,9 +1,12 @@
-from storage.db import SessionLocal
-from storage.models import Run, Result
-from typing import Optional, List
+from storage.db import SessionLocal, WriterSession
+from storage.models import Payload, Run, Result
+from storage.payloads import payload_hash
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from typing import Any, Dict, Iterator, Optional, List
 
 def create_run(name: str | None = None):
-    session = SessionLocal()
+    session = WriterSession()
     try:
         r = Run(name=name)
         session.add(r)
@@ -13,17 +16,26 @@ def create_run(name: str | None = None):
     finally:
         session.close()
 
-def save_result(run_id: int, endpoint: str, method: str, payload, status_code, latency, error):
-    session = SessionLocal()
+def save_result(run_id: int, endpoint: str, method: str, payload, status_code, latency, error,
+                case_id: Optional[int] = None, payload_type: Optional[str] = None, mutation: Optional[str] = None):
+    session = WriterSession()
     try:
+        key = None
+        if payload is not None:
+            key = payload_hash(payload)
+            if session.get(Payload, key) is None:
+                session.add(Payload(hash=key, body=payload))
         res = Result(
             run_id=run_id,
             endpoint=endpoint,
             method=method,
-            payload=payload,
+            payload_hash=key,
             status_code=status_code,
             latency=latency,
             error=error,
+            case_id=case_id,
+            payload_type=payload_type,
+            mutation=mutation,
         )
         session.add(res)
         session.commit()
@@ -45,72 +57,61 @@ def get_latest_run(name: Optional[str] = None) -> Optional[Run]:
         session.close()
 
 
-def get_results_for_run(run_id: int) -> List[Result]:
+def get_run(run_id: int) -> Optional[Run]:
     session = SessionLocal()
     try:
-        q = (
-            session.query(Result)
-            .filter(Result.run_id == run_id)
-            .order_by(Result.id.asc())
-        )
-        return list(q.all())
+        return session.get(Run, run_id)
     finally:
         session.close()
-from storage.db import SessionLocal
-from storage.models import Run, Result
-from typing import Optional, List
 
-def create_run(name: str | None = None):
-    session = SessionLocal()
-    try:
-        r = Run(name=name)
-        session.add(r)
-        session.commit()
-        session.refresh(r)
-        return r
-    finally:
-        session.close()
 
-def save_result(run_id: int, endpoint: str, method: str, payload, status_code, latency, error):
+def get_results_for_run(run_id: int, with_payload: bool = True) -> List[Result]:
+    """Results of a run in id order.
+
+    The rows are detached, so ``Result.payload`` only works on them when the
+    bodies are loaded up front (``with_payload``, the default). Callers that
+    never read the payload pass ``with_payload=False`` to skip the join;
+    ``r.payload`` then raises DetachedInstanceError.
+    """
     session = SessionLocal()
     try:
-        res = Result(
-            run_id=run_id,
-            endpoint=endpoint,
-            method=method,
-            payload=payload,
-            status_code=status_code,
-            latency=latency,
-            error=error,
+        q = (
+            session.query(Result)
+            .filter(Result.run_id == run_id)
+            .order_by(Result.id.asc())
         )
-        session.add(res)
-        session.commit()
-        session.refresh(res)
-        return res
+        if with_payload:
+            q = q.options(joinedload(Result.payload_ref))
+        return list(q.all())
     finally:
         session.close()
 
 
-def get_latest_run(name: Optional[str] = None) -> Optional[Run]:
-    session = SessionLocal()
-    try:
-        q = session.query(Run)
-        if name:
-            q = q.filter(Run.name == name)
-        q = q.order_by(Run.created_at.desc())
-        return q.first()
-    finally:
-        session.close()
+# columns of an exported result, in output order
+RESULT_COLUMNS = ("id", "case_id", "endpoint", "method", "payload_type", "mutation", "status_code",
+                  "latency", "error", "created_at", "payload_hash", "payload")
+
 
+def iter_results_for_run(run_id: int, chunk_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """Stream a run's results, in id order, as plain dicts (RESULT_COLUMNS).
 
-def get_results_for_run(run_id: int) -> List[Result]:
+    Unlike get_results_for_run nothing is accumulated: rows are fetched
+    ``chunk_size`` at a time (``yield_per``, a server-side cursor on
+    Postgres), without building ORM objects, so memory does not grow with
+    the size of the run. The payload body comes from the same query.
+    """
+    table = Result.__table__
+    columns = [table.c[name] for name in RESULT_COLUMNS if name != "payload"]
+    stmt = (
+        select(*columns, Payload.__table__.c.body.label("payload"))
+        .outerjoin(Payload.__table__, table.c.payload_hash == Payload.__table__.c.hash)
+        .where(table.c.run_id == run_id)
+        .order_by(table.c.id.asc())
+        .execution_options(yield_per=chunk_size)
+    )
     session = SessionLocal()
     try:
-        q = (
-            session.query(Result)
-            .filter(Result.run_id == run_id)
-            .order_by(Result.id.asc())
-        )
-        return list(q.all())
+        for row in session.execute(stmt):
+            yield dict(row._mapping)
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
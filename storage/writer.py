@@ -0,0 +1,220 @@
+"""Batched, background persistence of run results."""
+import csv
+import io
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from storage import db as storage_db
+from storage import models
+from storage.payloads import insert_missing, payload_hash
+
+_STOP = object()
+_MAX_KNOWN = 65_536  # payload hashes remembered per writer
+
+# columns written by the bulk paths, in COPY order
+_COLUMNS = ("run_id", "endpoint", "method", "payload_hash", "status_code", "latency", "error",
+            "case_id", "payload_type", "mutation", "created_at")
+
+
+class ResultWriter:
+    """Persists results on a background thread, in batches.
+
+    ``add`` only puts the row on a bounded queue, so the caller (the event
+    loop of a run) never waits for the database unless the writer falls
+    ``max_pending`` rows behind. The thread flushes every ``batch_size`` rows
+    or ``flush_interval`` seconds, whichever comes first, in one transaction:
+    an executemany on SQLite, COPY on Postgres with psycopg2/psycopg (a
+    multi-row INSERT on other drivers).
+
+    Payloads are content-addressed (see storage.payloads): each result
+    only references its payload's hash, and every distinct payload is
+    inserted into ``payloads`` once. The writer remembers the most recent
+    hashes it inserted to skip them without a query (the insert itself is
+    idempotent, so forgetting one only costs a no-op insert). Runs send the
+    same payload objects again and again, so hashes are also memoized by
+    object identity.
+
+    A failing flush stops the writer; the error is raised by the next
+    ``add`` and by ``close``.
+
+    On in-memory SQLite there is no background thread (its connection would
+    see a different, empty database): ``add`` flushes on the caller's thread
+    every ``batch_size`` rows.
+
+    Args:
+        run_id: Run the results belong to
+        batch_size: Rows per flush
+        flush_interval: Max seconds a row waits before being flushed
+        max_pending: Bound of the queue (backpressure on the run)
+        engine: SQLAlchemy engine (default: storage.db.writer_engine)
+    """
+
+    def __init__(self, run_id: int, batch_size: int = 1000, flush_interval: float = 0.5,
+                 max_pending: int = 50_000, engine=None):
+        self.run_id = run_id
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.engine = engine if engine is not None else storage_db.writer_engine
+        self.table = models.Result.__table__
+        self.payloads_table = models.Payload.__table__
+        self.written = 0
+        self.payloads_written = 0
+        self._known: "OrderedDict[str, None]" = OrderedDict()  # recently inserted hashes (LRU)
+        self._hashes: Dict[int, Any] = {}  # id(payload) -> (payload, hash)
+        self.batches = 0
+        self.error: Optional[BaseException] = None
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._thread = None
+        self._pending: List[Dict[str, Any]] = []  # in-memory SQLite only
+        if not storage_db.is_memory_sqlite(self.engine):
+            self._thread = threading.Thread(target=self._run, name="datafuzz-result-writer", daemon=True)
+            self._thread.start()
+
+    def add(self, endpoint: str, method: str, payload, status_code, latency, error,
+            case_id: Optional[int] = None, payload_type: Optional[str] = None, mutation: Optional[str] = None):
+        """Queue one result (same fields as repository.save_result)."""
+        if self.error is not None:
+            raise RuntimeError("result writer failed") from self.error
+        row = {
+            "run_id": self.run_id,
+            "endpoint": endpoint,
+            "method": method,
+            "payload": payload,
+            "status_code": status_code,
+            "latency": latency,
+            "error": error,
+            "case_id": case_id,
+            "payload_type": payload_type,
+            "mutation": mutation,
+            "created_at": datetime.utcnow(),
+        }
+        if self._thread is None:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._flush_pending()
+        else:
+            self._queue.put(row)
+
+    def _flush_pending(self):
+        batch, self._pending = self._pending, []
+        if batch and self.error is None:
+            try:
+                self._flush(batch)
+            except BaseException as e:
+                self.error = e
+                raise RuntimeError("result writer failed") from e
+
+    def close(self):
+        """Flush what is pending and stop the thread."""
+        if not self._closed:
+            self._closed = True
+            if self._thread is None:
+                self._flush_pending()
+            else:
+                self._queue.put(_STOP)
+                self._thread.join()
+        if self.error is not None:
+            raise RuntimeError("result writer failed") from self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run(self):
+        batch: List[Dict[str, Any]] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # flush_interval elapsed
+            if item is not None and item is not _STOP:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+            if batch and self.error is None:
+                try:
+                    self._flush(batch)
+                except BaseException as e:  # keep draining so producers never block
+                    self.error = e
+            batch = []
+            deadline = None
+            if item is _STOP:
+                return
+
+    def _hash(self, payload) -> str:
+        entry = self._hashes.get(id(payload))
+        if entry is not None and entry[0] is payload:
+            return entry[1]
+        key = payload_hash(payload)
+        if len(self._hashes) >= 4096:
+            self._hashes.pop(next(iter(self._hashes)))
+        self._hashes[id(payload)] = (payload, key)  # keeps the id from being reused
+        return key
+
+    def _flush(self, rows: List[Dict[str, Any]]):
+        new_payloads = {}
+        for row in rows:
+            payload = row.pop("payload")
+            key = None
+            if payload is not None:
+                key = self._hash(payload)
+                if key in self._known:
+                    self._known.move_to_end(key)
+                else:
+                    new_payloads[key] = payload
+            row["payload_hash"] = key
+        with self.engine.begin() as conn:
+            if new_payloads:
+                insert_missing(conn, self.payloads_table, [{"hash": k, "body": v} for k, v in new_payloads.items()])
+            if self.engine.dialect.name == "postgresql" and self.engine.dialect.driver in ("psycopg2", "psycopg"):
+                _copy(conn, self.table.name, rows)
+            else:
+                conn.execute(self.table.insert(), rows)
+        for key in new_payloads:
+            self._known[key] = None
+        while len(self._known) > _MAX_KNOWN:
+            # forgotten hashes are only re-sent to insert_missing, which skips them
+            self._known.popitem(last=False)
+        self.payloads_written += len(new_payloads)
+        self.written += len(rows)
+        self.batches += 1
+
+
+def _copy(conn, table: str, rows: List[Dict[str, Any]]):
+    """COPY rows into a Postgres table through the raw DBAPI cursor."""
+    cursor = conn.connection.dbapi_connection.cursor()
+    sql = f"COPY {table} ({', '.join(_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            for row in rows:
+                writer.writerow(_csv_row(row))
+            buf.seek(0)
+            cursor.copy_expert(sql, buf)
+        else:  # psycopg 3
+            with cursor.copy(sql.replace("WITH (FORMAT csv)", "")) as copy:
+                for row in rows:
+                    copy.write_row(_text_row(row))
+    finally:
+        cursor.close()
+
+
+def _text_row(row: Dict[str, Any]) -> List[Any]:
+    return [row[c] for c in _COLUMNS]
+
+
+def _csv_row(row: Dict[str, Any]) -> List[Any]:
+    # COPY csv reads empty fields as NULL (an empty error string is stored as NULL)
+    return ["" if v is None else v for v in _text_row(row)]
@@ -0,0 +1,235 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from apps.runner import async_runner
+
+
+def _patch_client(monkeypatch, handler):
+    # route every AsyncClient created by the runner through an in-memory transport
+    real_client = httpx.AsyncClient
+
+    def fake_client(*args, **kwargs):
+        kwargs["transport"] = httpx.MockTransport(handler)
+        return real_client(*args, **kwargs)
+
+    monkeypatch.setattr(async_runner.httpx, "AsyncClient", fake_client)
+
+
+def test_stream_concurrent_consumes_generator_lazily(monkeypatch):
+    _patch_client(monkeypatch, lambda request: httpx.Response(201, json={"ok": True}))
+    pulled = []
+
+    def payloads():
+        for i in range(50):
+            pulled.append(i)
+            yield {"i": i}
+
+    async def first_result():
+        async for _, res in async_runner.stream_concurrent("post", "http://test/users", payloads(), concurrency=2, queue_size=2):
+            return res, len(pulled)
+
+    res, seen = asyncio.run(first_result())
+    assert res["status_code"] == 201
+    # the bounded queue keeps the producer from running ahead of the workers
+    assert seen < 50
+
+
+def test_results_carry_their_case(monkeypatch):
+    async def handler(request):
+        # later cases answer first, so completion order is reversed
+        i = json.loads(request.content)["i"]
+        await asyncio.sleep(0.01 * (5 - i))
+        return httpx.Response(200, text=str(i))
+
+    _patch_client(monkeypatch, handler)
+    cases = [async_runner.Case(i, {"i": i}, "invalid" if i % 2 else "valid") for i in range(5)]
+
+    async def collect():
+        return [pair async for pair in async_runner.stream_concurrent("post", "http://test/x", cases, concurrency=5)]
+
+    pairs = asyncio.run(collect())
+    assert [case.case_id for case, _ in pairs] != sorted(case.case_id for case, _ in pairs)
+    for case, res in pairs:
+        assert res["case_id"] == case.case_id
+        assert res["body"] == str(case.payload["i"])
+
+
+def test_run_concurrent_summary(monkeypatch):
+    _patch_client(monkeypatch, lambda request: httpx.Response(200 if b"ok" in request.content else 400))
+    payloads = [{"v": "ok"}, {"v": "bad"}, {"v": "ok"}]
+    out = asyncio.run(async_runner.run_concurrent("post", "http://test/users", payloads, concurrency=2, retries=0))
+    summary = out["summary"]
+    assert summary["total"] == 3
+    assert summary["successful"] == 2
+    assert summary["statuses"] == {"200": 2, "400": 1}
+    assert summary["percentiles"]["p50"] is not None
+    assert [r["case_id"] for r in out["results"]] == [0, 1, 2]
+
+
+def test_unserializable_payloads_become_error_results(monkeypatch):
+    _patch_client(monkeypatch, lambda request: httpx.Response(200))
+    payloads = [{"a": 1}, {"a": float("nan")}, {"a": {1, 2}}]
+
+    out = asyncio.run(asyncio.wait_for(
+        async_runner.run_concurrent("post", "http://test/users", payloads, concurrency=2), timeout=5))
+
+    assert out["summary"]["errors"] == 2
+    assert [r["status_code"] for r in out["results"]] == [200, None, None]
+
+
+def test_worker_errors_reach_the_caller(monkeypatch):
+    _patch_client(monkeypatch, lambda request: httpx.Response(200))
+    real_send = async_runner.send_single
+
+    async def crash_on(bad, client, method, url, payload, *args):
+        if bad(payload):
+            raise RuntimeError("worker crashed")
+        return await real_send(client, method, url, payload, *args)
+
+    async def drain(payloads):
+        stream = async_runner.stream_concurrent("post", "http://test/users", payloads, concurrency=2, queue_size=2)
+        return [res async for _, res in stream]
+
+    # one failing case: the stream must not end quietly one result short
+    monkeypatch.setattr(async_runner, "send_single", lambda *a: crash_on(lambda p: p["i"] == 50, *a))
+    with pytest.raises(RuntimeError, match="worker crashed"):
+        asyncio.run(asyncio.wait_for(drain({"i": i} for i in range(100)), timeout=5))
+
+    # every worker failing: the producer is left on a full inbox and must not hang the stream
+    monkeypatch.setattr(async_runner, "send_single", lambda *a: crash_on(lambda p: True, *a))
+    with pytest.raises(RuntimeError, match="worker crashed"):
+        asyncio.run(asyncio.wait_for(drain({"i": i} for i in range(100)), timeout=5))
+
+
+def test_parse_rate():
+    assert async_runner.parse_rate("500/s") == 500.0
+    assert async_runner.parse_rate("120/m") == 2.0
+    assert async_runner.parse_rate("25") == 25.0
+    assert async_runner.parse_rate(None) is None
+
+
+def test_open_loop_corrects_for_coordinated_omission(monkeypatch):
+    async def handler(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200)
+
+    _patch_client(monkeypatch, handler)
+    # one worker cannot keep up with 100/s of 50ms requests: later cases start late
+    out = asyncio.run(async_runner.run_concurrent("get", "http://test/x", [None] * 6, concurrency=1, retries=0, rate=100))
+    last = out["results"][-1]
+    assert last["intended_start"] < last["actual_start"]
+    assert last["corrected_latency"] > last["latency"]
+    summary = out["summary"]
+    assert summary["corrected_percentiles"]["p99"] > summary["percentiles"]["p99"]
+
+
+def test_pooled_client_reuses_connections():
+    import http.server
+    import threading
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/x"
+    try:
+        out = asyncio.run(async_runner.run_concurrent("post", url, [{"i": i} for i in range(10)], concurrency=2, retries=0))
+    finally:
+        server.shutdown()
+    conns = out["summary"]["connections"]
+    assert conns["new"] <= 2
+    assert conns["new"] + conns["reused"] == 10
+
+
+def test_adaptive_limiter_backs_off_past_the_knee(monkeypatch):
+    from apps.runner.adaptive import AdaptiveLimiter
+
+    state = {"inflight": 0}
+
+    async def handler(request):
+        # the service degrades once more than 4 requests are in flight
+        state["inflight"] += 1
+        try:
+            await asyncio.sleep(0.002)
+            return httpx.Response(503 if state["inflight"] > 4 else 200)
+        finally:
+            state["inflight"] -= 1
+
+    _patch_client(monkeypatch, handler)
+    limiter = AdaptiveLimiter(max_error_rate=0.05, initial=1, max_limit=16, min_window=10)
+    policy = async_runner.RetryPolicy(max_retries=0)
+
+    async def drain():
+        async for _ in async_runner.stream_concurrent("get", "http://test/x", [None] * 600, retry_policy=policy, limiter=limiter):
+            pass
+
+    asyncio.run(drain())
+    report = limiter.report()
+    assert report["knee"] is not None
+    assert report["knee"]["concurrency"] <= 5
+    assert report["saturated_at"] is not None and report["saturated_at"] >= 4
+
+
+def test_plan_cache_encodes_each_payload_once():
+    from apps.runner.plan import PlanCache
+
+    cache = PlanCache(max_entries=2)
+    valid = {"name": "ok", "tags": ["á"]}
+    first = cache.get(valid)
+    assert cache.get(valid) is first
+    assert json.loads(first.content) == valid
+    assert first.headers["Content-Length"] == str(len(first.content))
+    # an equal but distinct object gets its own entry; eviction keeps the cache bounded
+    cache.get(dict(valid))
+    cache.get({"other": 1})
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert len(cache._plans) == 2
+    assert cache.get(None) is None
+
+
+def test_stream_targets_caps_each_endpoint_and_shares_the_pool(monkeypatch):
+    from apps.runner.scheduler import Target, stream_targets
+
+    in_flight = {"total": 0, "slow": 0}
+    peak = {"total": 0, "slow": 0}
+
+    async def handler(request):
+        slow = request.url.path == "/slow"
+        in_flight["total"] += 1
+        in_flight["slow"] += slow
+        peak["total"] = max(peak["total"], in_flight["total"])
+        peak["slow"] = max(peak["slow"], in_flight["slow"])
+        await asyncio.sleep(0.05 if slow else 0.001)
+        in_flight["total"] -= 1
+        in_flight["slow"] -= slow
+        return httpx.Response(200, json={})
+
+    _patch_client(monkeypatch, handler)
+    targets = [
+        Target("POST /slow", "post", "http://test/slow", ({"i": i} for i in range(10))),
+        Target("POST /fast", "post", "http://test/fast", ({"i": i} for i in range(40))),
+    ]
+
+    async def collect():
+        return [(t.key, case.case_id, r["status_code"]) async for t, case, r in stream_targets(targets, concurrency=4, per_target=2)]
+
+    order = asyncio.run(collect())
+    assert len(order) == 50 and {status for _, _, status in order} == {200}
+    assert sorted(cid for key, cid, _ in order if key == "POST /slow") == list(range(10))
+    assert peak["slow"] <= 2 and peak["total"] <= 4
+    # the slow endpoint cannot hold every slot: the fast one finishes first
+    last = {key: i for i, (key, _, _) in enumerate(order)}
+    assert last["POST /fast"] < last["POST /slow"]
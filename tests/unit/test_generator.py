@@ -11,16 +11,256 @@ def test_mutations_exist():
     muts = gen.gen_invalid_mutations(schema)
     names = [name for name, _ in muts]
     assert "missing_required" in names or "invalid_enum" in names
-from engines.contract import generator as gen
 
-def test_gen_simple():
-    schema = {"type": "object", "properties": {"name": {"type": "string"}}, "required": ["name"]}
-    val = gen.gen_valid_payload(schema)
-    assert isinstance(val, dict)
-    assert "name" in val
 
-def test_mutations_exist():
-    schema = {"type": "object", "properties": {"role": {"type": "string", "enum": ["a","b"]}}, "required": ["role"]}
-    muts = gen.gen_invalid_mutations(schema)
-    names = [name for name, _ in muts]
-    assert "missing_required" in names or "invalid_enum" in names
\ No newline at end of file
+def test_compiled_generator_matches_interpreter():
+    from engines.contract.compiled import compile_generator
+
+    schema = {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "age": {"type": "integer"},
+            "role": {"enum": ["a", "b"]},
+            "tags": {"type": "array", "items": {"type": "string"}},
+            "address": {"properties": {"city": {"type": "string"}, "geo": {"type": "object", "properties": {"lat": {"type": "number"}}}}},
+        },
+    }
+    generate = compile_generator(schema)
+    first, second = generate(), generate()
+    assert first == gen.gen_valid_payload(schema)
+    # every call returns fresh containers
+    assert first is not second and first["address"] is not second["address"]
+
+
+def test_case_space_is_random_access_and_reproducible():
+    from engines.contract.case_space import CaseSpace
+
+    schema = {
+        "type": "object",
+        "required": ["name"],
+        "properties": {
+            "name": {"type": "string"},
+            "role": {"enum": ["a", "b"]},
+            "address": {"type": "object", "properties": {"city": {"type": "string"}}},
+        },
+    }
+    space = CaseSpace(schema, seed=42, invalid_ratio=0.5)
+    forward = [case for _, case in space.cases(0, 200)]
+    # case i computed on its own (another process, another order) is the same case
+    assert CaseSpace(schema, seed=42, invalid_ratio=0.5).case(137) == forward[137]
+    assert forward != [case for _, case in CaseSpace(schema, seed=43, invalid_ratio=0.5).cases(0, 200)]
+    mutations = {mutation for kind, mutation, _ in forward if kind == "invalid"}
+    assert {"missing_required:name", "long_string:name", "wrong_type:address.city"} <= mutations
+    # same catalog and labels as the unseeded runs
+    from engines.contract.overlay import overlay_mutations
+    assert mutations <= {name for name, _ in overlay_mutations(schema)}
+    # nested fields get mutated too
+    assert any(
+        kind == "invalid" and isinstance(payload.get("address"), dict) and not isinstance(payload["address"]["city"], str)
+        for kind, _, payload in forward
+    )
+
+
+def test_generate_all_writes_one_jsonl_shard_per_operation(tmp_path, monkeypatch):
+    import json
+    from engines.contract.fanout import generate_all, list_operations, shard_name
+    from core import parser
+
+    # keep the spec cache out of ~/.cache (the spawned workers inherit it)
+    monkeypatch.setenv("DATAFUZZ_CACHE_DIR", str(tmp_path / "cache"))
+    spec_path = "specs/examples/openapi.yaml"
+    operations = list_operations(parser.load_spec(spec_path))
+    assert operations
+    shards = generate_all(spec_path, 50, tmp_path, workers=2)
+    assert [(s["endpoint"], s["method"]) for s in shards] == operations
+    for shard in shards:
+        path = tmp_path / shard_name(shard["endpoint"], shard["method"])
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert shard["count"] == len(lines) == 50
+        assert isinstance(json.loads(lines[0]), dict)
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_shard_names_never_collide():
+    from engines.contract.fanout import shard_names
+
+    operations = [("/a-b", "post"), ("/a_b", "post"), ("/users/{id}", "post"), ("/users/id", "post"),
+                  ("/Users", "get"), ("/users", "get"), ("/items", "post")]
+    names = shard_names(operations)
+    assert len({name.lower() for name in names}) == len(operations)
+    assert names[-1] == "post_items.jsonl"  # unique slugs keep the plain name
+    assert names == shard_names(operations)
+
+
+def test_overlay_mutations_are_nested_and_copy_on_write():
+    import copy
+    import json
+    import pickle
+    from engines.contract.overlay import DELETE, Overlay, overlay_mutations
+
+    schema = {
+        "type": "object",
+        "required": ["name"],
+        "properties": {
+            "name": {"type": "string"},
+            "address": {
+                "type": "object",
+                "required": ["city"],
+                "properties": {"city": {"type": "string"}, "kind": {"enum": ["home", "work"]}},
+            },
+        },
+    }
+    base = gen.gen_valid_payload(schema)
+    snapshot = copy.deepcopy(base)
+    mutations = dict(overlay_mutations(schema, base=base))
+    assert {"missing_required:name", "missing_required:address.city", "invalid_enum:address.kind",
+            "long_string:address.city", "wrong_type:address"} <= set(mutations)
+
+    for label, overlay in mutations.items():
+        plain = overlay.materialize()
+        # serializing the overlay directly gives the same JSON as the built payload
+        assert overlay.encode() == json.dumps(plain, ensure_ascii=False, separators=(",", ":"))
+    assert mutations["invalid_enum:address.kind"].materialize()["address"]["kind"] == "INVALID_ENUM"
+    assert "city" not in mutations["missing_required:address.city"].materialize()["address"]
+    assert base == snapshot  # the shared base is never touched
+
+    stacked = Overlay({"a": [1, {"b": 2}]}).patch(("a", 1, "b"), DELETE).patch(("a", 0), 9).patch(("c", "d"), True)
+    assert stacked.materialize() == {"a": [9, {}], "c": {"d": True}}
+    assert json.loads(stacked.encode()) == stacked.materialize()
+    assert pickle.loads(pickle.dumps(stacked)).materialize() == stacked.materialize()
+
+
+def test_covering_array_covers_every_pair_with_few_rows():
+    import itertools
+    from engines.contract.covering import covering_array, plan_combinations
+
+    levels = [3, 4, 2, 3, 3, 2, 4, 3]
+    rows = covering_array(levels, strength=2)
+    for a, b in itertools.combinations(range(len(levels)), 2):
+        assert {(r[a], r[b]) for r in rows} == set(itertools.product(range(levels[a]), range(levels[b])))
+    assert len(rows) < 40  # exhaustive would be 20736
+    assert covering_array(levels, strength=2) == rows  # deterministic
+
+    schema = {
+        "type": "object",
+        "required": ["name"],
+        "properties": {
+            "name": {"type": "string"},
+            "role": {"enum": ["a", "b"]},
+            "address": {"type": "object", "properties": {"city": {"type": "string"}}},
+        },
+    }
+    plans = plan_combinations(schema)
+    assert plans and all("+" in name or ":" in name for name, _ in plans)
+    # every pair of (name mutation, city mutation) is sent together at least once
+    pairs = {(a, b) for name, _ in plans for a in name.split("+") for b in name.split("+")}
+    assert ("weird_unicode:address.city", "long_string:name") in pairs
+
+
+def test_covering_array_bounds_the_search_on_wide_schemas():
+    import itertools
+    from engines.contract.covering import candidates_per_row, covering_array, effective_strength
+
+    assert candidates_per_row([3] * 6, 2, 10) == 10
+    assert candidates_per_row([5] * 80, 2, 10) == 1  # one candidate per row past the work budget
+    assert effective_strength(15, 3) == 3
+    assert effective_strength(40, 3) == 2  # too many triples: planned pairwise
+
+    # wide enough to skip the greedy scoring; every pair must still be covered
+    levels = [3] * 140
+    rows = covering_array(levels, strength=2)
+    for a, b in itertools.combinations(range(len(levels)), 2):
+        assert {(r[a], r[b]) for r in rows} == set(itertools.product(range(3), range(3)))
+    assert len(rows) < 100
+
+
+def test_combined_mutations_cover_every_realizable_pair_of_a_nested_schema():
+    import itertools
+    from engines.contract.covering import plan_combinations
+    from engines.contract.overlay import DELETE, field_mutations, label
+    from core.schema_ir import compile_schema
+
+    schema = {
+        "type": "object",
+        "required": ["a", "b"],
+        "properties": {
+            "a": {
+                "type": "object",
+                "required": ["x"],
+                "properties": {
+                    "x": {"type": "string"},
+                    "y": {"type": "number"},
+                    "z": {"type": "object", "properties": {"w": {"enum": ["p", "q"]}}},
+                },
+            },
+            "b": {"type": "string"},
+            "c": {"enum": ["u", "v"]},
+        },
+    }
+    fields = field_mutations(compile_schema(schema))
+    patches = {label(kind, path): (path, value) for path, choices in fields for kind, value in choices}
+    plans = plan_combinations(schema)
+
+    sent = set()
+    for name, overlay in plans:
+        payload = overlay.materialize()
+        for mutation in name.split("+"):
+            # every mutation in the label shows up in the payload sent
+            path, value = patches[mutation]
+            parent = payload
+            for key in path[:-1]:
+                parent = parent[key]
+            if value is DELETE:
+                assert path[-1] not in parent
+            else:
+                assert parent[path[-1]] == value
+        sent.update(itertools.combinations(sorted(name.split("+")), 2))
+
+    nested = lambda p, q: p[:len(q)] == q or q[:len(p)] == p
+    realizable = {
+        tuple(sorted((label(ka, pa), label(kb, pb))))
+        for (pa, ca), (pb, cb) in itertools.combinations(fields, 2) if not nested(pa, pb)
+        for ka, _ in ca for kb, _ in cb
+    }
+    assert realizable <= sent
+
+
+def test_feedback_scheduler_spends_budget_on_productive_mutations():
+    import itertools
+    from engines.contract.feedback import FeedbackScheduler, fingerprint
+
+    assert fingerprint({"status_code": 400, "body": '{"error": "bad", "id": 1}', "latency": 0.01}) == \
+        fingerprint({"status_code": 400, "body": '{"id": 7, "error": "other"}', "latency": 0.02})
+    assert fingerprint({"status_code": 400, "body": '{"error": "bad"}'}) != fingerprint({"status_code": 400, "body": '{"detail": []}'})
+
+    mutations = [(f"dull:{i}", {"i": i}) for i in range(9)] + [("leaky", {"leak": True})]
+    scheduler = FeedbackScheduler({"ok": True}, mutations, seed=1)
+    counter = itertools.count()
+    sent = {}
+    for _, mutation, _ in scheduler.cases(2000):
+        sent[mutation] = sent.get(mutation, 0) + 1
+        if mutation == "leaky":
+            # every response of this mutation exposes a different field
+            result = {"status_code": 500, "body": '{"field_%d": 1}' % next(counter), "latency": 0.01}
+        else:
+            result = {"status_code": 400, "body": '{"error": "bad"}', "latency": 0.01}
+        scheduler.observe(mutation, result)
+
+    assert sent["leaky"] > 5 * max(v for k, v in sent.items() if k not in ("leaky", None))
+    report = scheduler.report()
+    assert report["requests"] == 2000
+    assert report["top_mutations"][0]["mutation"] == "leaky"
+    assert report["findings_per_1000"] == round(1000.0 * report["findings"] / 2000, 2)
+
+
+def test_generate_json_streams_the_same_array_as_json_dump(tmp_path):
+    import json
+    from engines.contract.compiled import compile_generator
+    from engines.contract.fanout import generate_json
+
+    schema = {"type": "object", "properties": {"name": {"type": "string"}, "tags": {"type": "array", "items": {"type": "string"}}}}
+    expected = [compile_generator(schema)() for _ in range(3)]
+    for n in (0, 3):
+        assert generate_json(schema, n, tmp_path / "payloads.json") == n
+        assert (tmp_path / "payloads.json").read_text(encoding="utf-8") == json.dumps(expected[:n], ensure_ascii=False, indent=2)
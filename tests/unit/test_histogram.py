@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from apps.runner.histogram import LatencyHistogram
+
+
+def _exact(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, int(len(ordered) * p / 100.0 + 0.999999) - 1)]
+
+
+def test_percentiles_within_precision():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(-4, 1) for _ in range(20000)]
+    hist = LatencyHistogram(precision=0.01)
+    for v in values:
+        hist.record(v)
+    for p in (50, 95, 99):
+        assert hist.percentile(p) == pytest.approx(_exact(values, p), rel=0.011)
+    assert hist.count == len(values)
+    assert hist.max == max(values)
+
+
+def test_merge_matches_single_histogram():
+    rng = random.Random(1)
+    values = [rng.uniform(0.001, 2.0) for _ in range(5000)]
+    whole, a, b = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for i, v in enumerate(values):
+        whole.record(v)
+        (a if i % 2 else b).record(v)
+    merged = LatencyHistogram.from_dict(a.to_dict()).merge(b)
+    assert merged.percentiles() == whole.percentiles()
+    assert merged.count == whole.count
+
+
+def test_merge_rejects_different_precision():
+    with pytest.raises(ValueError):
+        LatencyHistogram(precision=0.01).merge(LatencyHistogram(precision=0.001))
+
+
+def test_empty_histogram():
+    assert LatencyHistogram().percentile(99) is None
@@ -0,0 +1,165 @@
+from core import parser
+from core.schema_ir import compile_operation, compile_schema, get_compiler
+
+SPEC = {
+    "paths": {
+        "/teams": {
+            "post": {
+                "operationId": "createTeam",
+                "requestBody": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/Team"}}}},
+            }
+        }
+    },
+    "components": {
+        "schemas": {
+            "Team": {
+                "type": "object",
+                "required": ["name"],
+                "properties": {
+                    "name": {"type": "string"},
+                    "lead": {"$ref": "#/components/schemas/Member"},
+                    "members": {"type": "array", "items": {"$ref": "#/components/schemas/Member"}},
+                },
+            },
+            "Member": {
+                "type": "object",
+                "properties": {
+                    "role": {"type": "string", "enum": ["dev", "ops"]},
+                    "reports_to": {"$ref": "#/components/schemas/Member"},
+                },
+            },
+        }
+    },
+}
+
+
+def test_get_schema_for_path_dereferences_refs():
+    schema = parser.get_schema_for_path(SPEC, "/teams", "post")
+    assert schema["properties"]["name"] == {"type": "string"}
+    lead = schema["properties"]["lead"]
+    assert lead["properties"]["role"]["enum"] == ["dev", "ops"]
+    # each ref is resolved once and shared
+    assert schema["properties"]["members"]["items"] is lead
+    # the recursive reference is kept as a back-edge instead of looping
+    assert lead["properties"]["reports_to"] == {"$ref": "#/components/schemas/Member"}
+
+
+def test_compile_operation_interns_nodes():
+    op = compile_operation(SPEC, "/teams", "post")
+    assert op.operation_id == "createTeam"
+    assert op.content_type == "application/json"
+    team = op.schema
+    assert team.kind == "object" and team.required == {"name"}
+    lead = team.property("lead")
+    assert team.property("members").items is lead
+    back_edge = lead.property("reports_to")
+    assert back_edge.kind == "ref"
+    assert get_compiler(SPEC).follow(back_edge) is lead
+    assert compile_operation(SPEC, "/teams", "post").schema is team
+    paths = [path for path, _ in team.walk()]
+    assert ("lead", "role") in paths
+
+
+def test_compile_schema_matches_resolve_type():
+    node = compile_schema({"type": "object", "properties": {"n": {"type": "integer"}, "e": {"enum": [1, 2]}}})
+    assert node.property("n").kind == "number"
+    assert node.property("e").values == (1, 2)
+
+
+def test_example_spec(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATAFUZZ_CACHE_DIR", str(tmp_path / "cache"))
+    spec = parser.load_spec("specs/examples/openapi.yaml")
+    op = compile_operation(spec, "/users", "post")
+    assert [name for name, _ in op.schema.properties] == ["name", "role"]
+    assert compile_operation(spec, "/nope", "post") is None
+
+
+def test_load_spec_caches_parsed_and_resolved_spec(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATAFUZZ_CACHE_DIR", str(tmp_path / "cache"))
+    spec_path = tmp_path / "openapi.json"
+    spec_path.write_text(parser.json.dumps(SPEC), encoding="utf-8")
+
+    first = parser.load_spec(str(spec_path))
+    assert len(list((tmp_path / "cache").glob("*.pickle"))) == 1
+
+    # a cache hit must not parse the file again
+    monkeypatch.setattr(parser, "_parse", lambda *a: (_ for _ in ()).throw(AssertionError("parsed")))
+    second = parser.load_spec(str(spec_path))
+    assert second == first and second is not first
+    # refs come back already resolved and still shared
+    team = parser.get_schema_for_path(second, "/teams", "post")
+    assert team["properties"]["lead"] is team["properties"]["members"]["items"]
+
+    # an edited spec is another key
+    spec_path.write_text(parser.json.dumps(SPEC) + " ", encoding="utf-8")
+    monkeypatch.setattr(parser, "_parse", lambda path, text: parser.json.loads(text))
+    parser.load_spec(str(spec_path))
+    assert len(list((tmp_path / "cache").glob("*.pickle"))) == 2
+
+
+def test_spec_cache_is_bounded_and_never_fails_a_load(tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    monkeypatch.setenv("DATAFUZZ_CACHE_DIR", str(cache))
+    monkeypatch.setattr(parser, "CACHE_MAX_ENTRIES", 2)
+    spec_path = tmp_path / "openapi.json"
+    for edit in range(4):
+        spec_path.write_text(parser.json.dumps(SPEC) + " " * edit, encoding="utf-8")
+        parser.load_spec(str(spec_path))
+    assert len(list(cache.glob("*.pickle"))) == 2
+
+    # a spec that cannot be pickled is still loaded, and leaves no temp file behind
+    def too_deep(*args, **kwargs):
+        raise RecursionError("maximum recursion depth exceeded while pickling an object")
+
+    monkeypatch.setattr(parser.pickle, "dump", too_deep)
+    spec_path.write_text(parser.json.dumps(SPEC) + " " * 9, encoding="utf-8")
+    assert parser.load_spec(str(spec_path)) == SPEC
+    assert not list(cache.glob("*.tmp"))
+
+
+def test_operation_index_lookups_and_path_matching():
+    from core.operations import OperationIndex
+
+    spec = {
+        "paths": {
+            "/users": {"post": {"operationId": "createUser", "requestBody": {"content": {
+                "application/json": {"schema": {"type": "object"}},
+                "application/x-www-form-urlencoded": {"schema": {"type": "object"}},
+            }}}},
+            "/users/{id}": {"get": {"operationId": "getUser"}, "put": {"requestBody": {"content": {
+                "application/json; charset=utf-8": {"schema": {"$ref": "#/components/schemas/Team"}},
+            }}}},
+            "/users/me": {"get": {"operationId": "me"}},
+            "/users/{id}/posts/{postId}": {"get": {}},
+            "/files/{name}.json": {"get": {"operationId": "file"}},
+        },
+        "components": SPEC["components"],
+    }
+    index = OperationIndex(spec)
+    assert len(index) == 6
+    assert index.get("POST", "/users").operation_id == "createUser"
+    assert index.by_operation_id("getUser").template == "/users/{id}"
+    assert {op.operation_id for op in index.by_content_type("application/json")} == {"createUser", None}
+    assert index.get("put", "/users/{id}").schema()["required"] == ["name"]
+
+    op, params = index.match("get", "/users/42")
+    assert (op.operation_id, params) == ("getUser", {"id": "42"})
+    assert index.match("GET", "/users/me")[0].operation_id == "me"
+    assert index.match("get", "/users/7/posts/9?expand=1")[1] == {"id": "7", "postId": "9"}
+    assert index.match("get", "/files/report.json")[1] == {"name": "report"}
+    assert index.match("delete", "/users/42") is None
+    assert index.match("get", "/teams") is None
+
+
+def test_identity_cache_is_keyed_by_object_and_bounded():
+    from core.memo import IdentityCache
+
+    cache = IdentityCache(maxsize=2)
+    a, b, c = {"x": 1}, {"x": 1}, {"x": 2}
+    built = []
+    assert cache.get_or_build(a, lambda spec: built.append(spec) or len(built)) == 1
+    assert cache.get_or_build(a, lambda spec: 99) == 1
+    assert cache.get(b) is None  # equal content, another spec object
+    cache.put(b, 2)
+    cache.put(c, 3)
+    assert cache.get(a) is None and cache.get(b) == 2 and cache.get(c) == 3
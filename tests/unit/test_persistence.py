@@ -86,4 +86,258 @@ def test_multiple_results_same_run(tmp_path, monkeypatch):
         rows = session.query(Result).filter_by(run_id=run.id).count()
         assert rows == 3
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
+
+def test_result_writer_flushes_in_batches_from_a_background_thread(tmp_path, monkeypatch):
+    db_path = tmp_path / "test_writer.db"
+    monkeypatch.setenv("DATAFUZZ_DATABASE_URL", f"sqlite:///{db_path}")
+
+    _reload_module("storage.db")
+    _reload_module("storage.models")
+    _reload_module("storage.repository")
+    _reload_module("storage.writer")
+
+    from storage.db import init_db, SessionLocal
+    from storage.repository import create_run
+    from storage.models import Result
+    from storage.writer import ResultWriter
+
+    init_db()
+    run = create_run(name="writer-run")
+    with ResultWriter(run.id, batch_size=100, flush_interval=60) as writer:
+        for i in range(250):
+            writer.add(endpoint="/items", method="post", payload={"i": i}, status_code=201, latency=0.01, error=None)
+    # two full batches plus the remainder flushed on close
+    assert (writer.written, writer.batches) == (250, 3)
+
+    session = SessionLocal()
+    try:
+        rows = session.query(Result).filter_by(run_id=run.id).order_by(Result.id).all()
+        assert len(rows) == 250
+        assert rows[-1].payload == {"i": 249}
+    finally:
+        session.close()
+
+    # a failing flush surfaces on close instead of being lost
+    failing = ResultWriter(run.id, batch_size=1)
+    failing._flush = lambda rows: (_ for _ in ()).throw(ValueError("disk full"))
+    failing.add(endpoint="/items", method="post", payload={}, status_code=201, latency=0.01, error=None)
+    with pytest.raises(RuntimeError):
+        failing.close()
+
+
+def test_payloads_are_stored_once_and_shared_by_results(tmp_path, monkeypatch):
+    db_path = tmp_path / "test_payloads.db"
+    monkeypatch.setenv("DATAFUZZ_DATABASE_URL", f"sqlite:///{db_path}")
+
+    _reload_module("storage.db")
+    _reload_module("storage.models")
+    _reload_module("storage.repository")
+    _reload_module("storage.writer")
+
+    from storage.db import init_db, SessionLocal
+    from storage.repository import create_run, save_result, get_results_for_run
+    from storage.models import Payload, Result
+    from storage.writer import ResultWriter
+
+    init_db()
+    run = create_run(name="dedup-run")
+    valid, invalid = {"name": "alice", "role": "admin"}, {"role": "admin"}
+    with ResultWriter(run.id, batch_size=64) as writer:
+        for i in range(300):
+            # equal content, different objects / key order: still one row
+            payload = invalid if i % 4 == 0 else ({"role": "admin", "name": "alice"} if i % 2 else valid)
+            writer.add(endpoint="/users", method="post", payload=payload, status_code=201, latency=0.01, error=None)
+    assert writer.payloads_written == 2
+    save_result(run.id, "/users", "post", {"name": "alice", "role": "admin"}, 201, 0.01, None)
+
+    session = SessionLocal()
+    try:
+        assert session.query(Payload).count() == 2
+        assert session.query(Result).filter_by(run_id=run.id).count() == 301
+    finally:
+        session.close()
+    results = get_results_for_run(run.id)
+    assert results[0].payload == invalid and results[1].payload == valid
+
+    # without with_payload the bodies are not read at all, and reading one says so
+    from sqlalchemy import event
+    from sqlalchemy.orm.exc import DetachedInstanceError
+    from storage import db
+    statements = []
+    event.listen(db.engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+    results = get_results_for_run(run.id, with_payload=False)
+    assert len(results) == 301
+    assert statements and not any("payloads" in sql for sql in statements)
+    with pytest.raises(DetachedInstanceError, match="with_payload=True"):
+        results[0].payload
+
+
+def test_migrations_upgrade_a_legacy_database(tmp_path, monkeypatch):
+    db_path = tmp_path / "legacy.db"
+    # schema and data as written by create_all before migrations existed
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE runs (id INTEGER PRIMARY KEY, created_at DATETIME, name VARCHAR);
+        CREATE TABLE results (id INTEGER PRIMARY KEY, run_id INTEGER REFERENCES runs(id), endpoint VARCHAR,
+            method VARCHAR, payload JSON, status_code INTEGER, latency FLOAT, error TEXT);
+        INSERT INTO runs VALUES (1, '2024-01-01 00:00:00', 'old');
+        INSERT INTO results VALUES (1, 1, '/users', 'post', '{"name": "a"}', 201, 0.1, NULL);
+        INSERT INTO results VALUES (2, 1, '/users', 'post', '{"name": "a"}', 201, 0.1, NULL);
+        INSERT INTO results VALUES (3, 1, '/users', 'post', '{"name": "b"}', 400, 0.1, NULL);
+    """)
+    conn.commit()
+    conn.close()
+    monkeypatch.setenv("DATAFUZZ_DATABASE_URL", f"sqlite:///{db_path}")
+
+    _reload_module("storage.db")
+    _reload_module("storage.models")
+    _reload_module("storage.repository")
+
+    from storage import db, migrations
+    from storage.repository import get_latest_run, get_results_for_run, save_result
+
+    assert migrations.migrate(db.engine) == [1, 2, 3]
+    assert migrations.migrate(db.engine) == []  # applied once
+    assert migrations.current_version(db.engine) == migrations.LATEST
+
+    results = get_results_for_run(get_latest_run("old").id)
+    assert [r.payload for r in results] == [{"name": "a"}, {"name": "a"}, {"name": "b"}]
+    assert results[0].payload_type is None
+
+    save_result(1, "/users", "post", {"name": "c"}, 400, 0.1, None, case_id=4, payload_type="invalid", mutation="wrong_type:name")
+    last = get_results_for_run(1)[-1]
+    assert (last.case_id, last.payload_type, last.mutation) == (4, "invalid", "wrong_type:name")
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM payloads").fetchone()[0] == 3
+        assert conn.execute("SELECT COUNT(*) FROM results WHERE payload IS NOT NULL").fetchone()[0] == 0
+        plan = " ".join(str(r) for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM results WHERE run_id = 1 ORDER BY id").fetchall())
+        assert "ix_results_run_id_id" in plan
+    finally:
+        conn.close()
+
+
+def test_sqlite_connections_use_wal_and_a_single_writer(tmp_path, monkeypatch):
+    db_path = tmp_path / "tuned.db"
+    monkeypatch.setenv("DATAFUZZ_DATABASE_URL", f"sqlite:///{db_path}")
+    monkeypatch.setenv("DATAFUZZ_SQLITE_SYNCHRONOUS", "off")
+    monkeypatch.setenv("DATAFUZZ_SQLITE_CACHE_KB", "2048")
+
+    db = _reload_module("storage.db")
+    _reload_module("storage.models")
+    _reload_module("storage.repository")
+    writer_mod = _reload_module("storage.writer")
+    db.init_db()
+
+    from sqlalchemy import text
+    from storage.repository import create_run, get_results_for_run
+
+    with db.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 0  # off
+        assert conn.exec_driver_sql("PRAGMA cache_size").scalar() == -2048
+    assert db.writer_engine is not db.engine
+    assert db.writer_engine.pool.size() == 1
+
+    from sqlalchemy import event
+    checkouts = []
+    event.listen(db.writer_engine, "checkout", lambda *args: checkouts.append(1))
+    run = create_run(name="wal")
+    assert checkouts  # repository writes go through the writer connection too
+    with db.engine.connect() as reader:
+        # a read transaction stays open while the writer commits
+        reader.execute(text("BEGIN"))
+        assert reader.execute(text("SELECT COUNT(*) FROM results")).scalar() == 0
+        with writer_mod.ResultWriter(run.id, batch_size=10) as writer:
+            for i in range(25):
+                writer.add("/users", "post", {"i": i}, 201, 0.01, None)
+        assert reader.execute(text("SELECT COUNT(*) FROM results")).scalar() == 0  # its snapshot
+        reader.execute(text("COMMIT"))
+    assert len(get_results_for_run(run.id)) == 25
+
+
+def test_export_streams_a_run_to_jsonl_csv_and_columnar(tmp_path, monkeypatch):
+    import csv
+    import json
+    import math
+
+    monkeypatch.setenv("DATAFUZZ_DATABASE_URL", f"sqlite:///{tmp_path / 'export.db'}")
+    db = _reload_module("storage.db")
+    _reload_module("storage.models")
+    repository = _reload_module("storage.repository")
+    export = _reload_module("storage.export")
+    db.init_db()
+
+    run = repository.create_run(name="export")
+    other = repository.create_run(name="other")
+    repository.save_result(run.id, "/users", "post", {"name": "a"}, 201, 0.1, None, case_id=0, payload_type="valid")
+    repository.save_result(other.id, "/users", "post", {"name": "x"}, 201, 0.1, None)
+    repository.save_result(run.id, "/users", "post", {"name": 1}, 400, 0.2, None, case_id=1,
+                           payload_type="invalid", mutation="wrong_type:name")
+    repository.save_result(run.id, "/users", "post", {"name": "a"}, None, None, "timeout", case_id=2, payload_type="valid")
+
+    rows = list(repository.iter_results_for_run(run.id, chunk_size=2))
+    assert [r["case_id"] for r in rows] == [0, 1, 2]
+    assert rows[1]["payload"] == {"name": 1} and rows[1]["mutation"] == "wrong_type:name"
+
+    assert export.export_run(run.id, tmp_path / "run.jsonl", "jsonl", chunk_size=2) == 3
+    lines = [json.loads(line) for line in (tmp_path / "run.jsonl").read_text().splitlines()]
+    assert [line["status_code"] for line in lines] == [201, 400, None]
+    assert lines[2]["error"] == "timeout"
+
+    assert export.export_run(run.id, tmp_path / "run.csv", "csv") == 3
+    with open(tmp_path / "run.csv", newline="") as f:
+        records = list(csv.DictReader(f))
+    assert [r["status_code"] for r in records] == ["201", "400", ""]
+    assert json.loads(records[1]["payload"]) == {"name": 1}
+
+    with export.ColumnarWriter(tmp_path / "run.dfzc", rows_per_group=2) as writer:
+        writer.write_many(repository.iter_results_for_run(run.id))
+    assert writer.groups == 2
+    cols = export.read_columnar(tmp_path / "run.dfzc")
+    assert cols["status_code"].typecode == "i" and list(cols["status_code"]) == [201, 400, -1]
+    assert cols["latency"][:2].tolist() == [0.1, 0.2] and math.isnan(cols["latency"][2])
+    assert cols["mutation"] == [None, "wrong_type:name", None]
+    assert [json.loads(p) for p in cols["payload"]] == [{"name": "a"}, {"name": 1}, {"name": "a"}]
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_result_writer_on_in_memory_sqlite(monkeypatch):
+    monkeypatch.setenv("DATAFUZZ_DATABASE_URL", "sqlite://")
+    db = _reload_module("storage.db")
+    _reload_module("storage.models")
+    repository = _reload_module("storage.repository")
+    writer_mod = _reload_module("storage.writer")
+    db.init_db()
+    assert db.writer_engine is db.engine
+
+    run = repository.create_run(name="memory")
+    with writer_mod.ResultWriter(run.id, batch_size=4) as writer:
+        for i in range(10):
+            writer.add("/users", "post", {"i": i % 3}, 201, 0.01, None, case_id=i)
+    assert (writer.written, writer.batches, writer.payloads_written) == (10, 3, 3)
+    assert [r.case_id for r in repository.get_results_for_run(run.id)] == list(range(10))
+
+
+def test_result_writer_remembers_a_bounded_number_of_payloads(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATAFUZZ_DATABASE_URL", f"sqlite:///{tmp_path / 'known.db'}")
+    db = _reload_module("storage.db")
+    _reload_module("storage.models")
+    repository = _reload_module("storage.repository")
+    writer_mod = _reload_module("storage.writer")
+    monkeypatch.setattr(writer_mod, "_MAX_KNOWN", 3)
+    db.init_db()
+
+    run = repository.create_run(name="known")
+    with writer_mod.ResultWriter(run.id, batch_size=5) as writer:
+        for i in range(100):
+            writer.add("/users", "post", {"i": i % 10}, 201, 0.01, None)
+    assert len(writer._known) <= 3
+
+    from sqlalchemy import text
+    with db.engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM payloads")).scalar() == 10
+        assert conn.execute(text("SELECT COUNT(*) FROM results")).scalar() == 100
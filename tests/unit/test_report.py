@@ -0,0 +1,32 @@
+import random
+
+from apps.reporting.renderers.datafuzz import ReportTotals, _compute_totals, _normalize_items
+
+
+def _items(n):
+    rng = random.Random(3)
+    for i in range(1, n + 1):
+        yield {
+            "id": i,
+            "payload_type": rng.choice(["valid", "invalid"]),
+            "status": rng.choice(["201", "400", "500", "error"]),
+            "latency_ms": rng.choice([None, 12.5, 950.0]),
+            "note": "",
+        }
+
+
+def test_report_totals_match_the_full_list_and_keep_a_bounded_sample(tmp_path):
+    items = list(_items(500))
+    shuffled = items[:]
+    random.Random(1).shuffle(shuffled)  # results arrive in completion order
+
+    totals = ReportTotals(max_rows=20)
+    for it in shuffled:
+        totals.add(it)
+
+    assert totals.to_dict() == _compute_totals(_normalize_items(items, 900), {"slow_ms": 900})
+    assert [r["id"] for r in totals.rows()] == list(range(1, 21))
+
+    out = totals.render(str(tmp_path / "report.html"), endpoint="/users")
+    html = open(out, encoding="utf-8").read()
+    assert "primeros 20 de 500" in html
@@ -0,0 +1,79 @@
+import random
+
+import httpx
+
+from apps.runner import http_runner
+from apps.runner.retry import RetryBudget, RetryPolicy, classify_error
+
+
+def test_classify_error():
+    req = httpx.Request("GET", "http://test")
+    assert classify_error(httpx.ConnectError("refused", request=req)) == "connect"
+    assert classify_error(httpx.ReadTimeout("slow", request=req)) == "read_timeout"
+    assert classify_error(ValueError("bug")) == "other"
+
+
+def test_backoff_is_capped_and_jittered():
+    policy = RetryPolicy(backoff_base=0.1, backoff_max=0.5)
+    rng = random.Random(3)
+    delays = [policy.backoff(attempt, rng=rng) for attempt in range(8)]
+    assert all(0 <= d <= 0.5 for d in delays)
+    assert RetryPolicy(jitter=False, backoff_base=0.1, backoff_max=0.5).backoff(1) == 0.2
+
+
+def test_budget_limits_retries():
+    budget = RetryBudget(ratio=0.1, min_retries=1)
+    for _ in range(10):
+        budget.record_request()
+    assert budget.try_acquire() and budget.try_acquire()
+    assert not budget.try_acquire()
+    assert budget.denied == 1
+
+
+def test_send_request_records_every_attempt():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503 if len(calls) < 3 else 201)
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    policy = RetryPolicy(max_retries=3, backoff_base=0.001)
+    res = http_runner.send_request("post", "http://test/users", {"a": 1}, client=client, policy=policy)
+    assert res["status_code"] == 201
+    assert [a["status_code"] for a in res["attempts"]] == [503, 503, 201]
+    assert all(a["latency"] is not None for a in res["attempts"])
+    assert res["total_latency"] >= sum(a["latency"] for a in res["attempts"])
+
+
+def test_non_retryable_status_is_not_retried():
+    client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(400)))
+    res = http_runner.send_request("post", "http://test/users", {}, client=client, policy=RetryPolicy(max_retries=3))
+    assert len(res["attempts"]) == 1
+
+
+def test_unserializable_body_becomes_an_error_result():
+    client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+    for body in ({"a": {1, 2}}, {"a": float("nan")}):
+        res = http_runner.send_request("post", "http://test/users", body, client=client, retries=0)
+        assert res["status_code"] is None and res["error"]
+        assert len(res["attempts"]) == 1
+
+
+def test_capture_modes():
+    from apps.runner.capture import BodyCapture
+
+    body = "é" * 2000
+    client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=body)))
+    size = len(body.encode())
+
+    res = http_runner.send_request("get", "http://test/x", client=client, capture=BodyCapture("none"))
+    assert "body" not in res and "body_size" not in res
+    res = http_runner.send_request("get", "http://test/x", client=client, capture=BodyCapture("size"))
+    assert res["body_size"] == size and "body" not in res
+    res = http_runner.send_request("get", "http://test/x", client=client, capture=BodyCapture("hash"))
+    assert len(res["body_hash"]) == 32
+    res = http_runner.send_request("get", "http://test/x", client=client, capture=BodyCapture("head", head_bytes=10))
+    assert res["body"] == "é" * 5 and res["body_size"] == size
+    res = http_runner.send_request("get", "http://test/x", client=client)
+    assert res["body"] == body
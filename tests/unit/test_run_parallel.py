@@ -27,21 +27,19 @@ def test_run_parallel_persists_results(tmp_path, monkeypatch, capsys, n):
     # shallow mocks for parser/generator
     import apps.cli.cli as cli_mod
     from core import parser as core_parser
-    from engines import contract as contract_mod
+    from core.schema_ir import OperationIR, compile_schema
 
+    schema = compile_schema({"type": "object", "properties": {"name": {"type": "string"}, "role": {"enum": ["admin"]}}})
     monkeypatch.setattr(core_parser, "load_spec", lambda spec: {"dummy": True})
-    monkeypatch.setattr(core_parser, "get_schema_for_path", lambda spec, endpoint, method: {"type": "object"})
-    monkeypatch.setattr(contract_mod.generator, "gen_valid_payload", lambda schema: {"name": "alice", "role": "admin"})
+    monkeypatch.setattr(cli_mod, "compile_operation", lambda spec, endpoint, method: OperationIR(method, endpoint, "application/json", schema))
 
-    # fake async runner result (same length as n)
-    async def fake_run_concurrent(method, url, payloads, concurrency, timeout, retries):
-        results = []
-        for _ in payloads:
-            results.append({"status_code": 201, "latency": 0.05, "body": '{"id":0,"name":"alice","role":"admin"}'})
-        return {"summary": {"total": len(results)}, "results": results}
+    # fake streaming runner (one result per payload)
+    async def fake_stream_concurrent(method, url, payloads, concurrency, timeout, **kwargs):
+        for case in payloads:
+            yield case, {"case_id": case.case_id, "status_code": 201, "latency": 0.05, "body": '{"id":0,"name":"alice","role":"admin"}'}
 
-    # patch the run_concurrent used by cli
-    monkeypatch.setattr(cli_mod, "run_concurrent", fake_run_concurrent)
+    # patch the stream_concurrent used by cli
+    monkeypatch.setattr(cli_mod, "stream_concurrent", fake_stream_concurrent)
 
     # import DB session and models
     from storage.db import SessionLocal, init_db
@@ -59,6 +57,24 @@ def test_run_parallel_persists_results(tmp_path, monkeypatch, capsys, n):
         timeout=1.0,
         retries=0,
         run_name="test-parallel",
+        rate=None,
+        workers=1,
+        backoff=0.05,
+        retry_budget=0.2,
+        adaptive=False,
+        target_p99_ms=None,
+        max_error_rate=0.01,
+        max_concurrency=256,
+        capture="size",
+        capture_bytes=1024,
+        max_connections=None,
+        keepalive=None,
+        keepalive_expiry=5.0,
+        http2=False,
+        seed=None,
+        strength=1,
+        feedback=False,
+        batch_size=1000,
     )
 
     # capture printed summary
@@ -0,0 +1,40 @@
+import functools
+import http.server
+import threading
+
+from apps.runner.sharded import run_sharded
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_run_sharded_merges_worker_stats():
+    # looked up at call time: other tests reload apps.cli.cli
+    from apps.cli.cli import _shard_cases
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/users"
+    seen = []
+    try:
+        source = functools.partial(_shard_cases, {"name": "ok"}, [("missing_required", {})], 20)
+        stats = run_sharded("post", url, source, workers=2, concurrency=4, retries=0,
+                            on_result=lambda case, res: seen.append(case.case_id))
+    finally:
+        server.shutdown()
+
+    assert sorted(seen) == list(range(20))
+    summary = stats.summary()
+    assert summary["total"] == 20
+    assert summary["statuses"] == {"201": 20}
+    assert stats.latencies.count == 20